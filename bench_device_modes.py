@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: desktop site vs mobile-web emulation.
+
+Runs the order flow up to (but never including) payment in each device mode
+and reports per-step latency, end-to-end time, DOM size and the RSS of the
+browser process tree each run launched (other browsers on the machine don't
+count). Payment is never reached, so the last steps of a real order are not
+measured.
+
+Mobile mode is experimental: its selectors have not been checked against the
+live mobile site, and a failed step usually means one of them is wrong. Uses the saved login in zepto_firefox_data, so stop the MCP/API
+servers first (they hold the same profile).
+
+Usage:
+    python3 bench_device_modes.py                       # both modes, 3 runs each
+    python3 bench_device_modes.py --runs 5 --headless
+    python3 bench_device_modes.py --add-to-cart         # also add the item and open checkout
+
+--add-to-cart leaves the item in the cart; the next real order clears it.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from playwright.async_api import async_playwright
+
+from zepto_browser import browser_pids, context_options, process_tree_rss_mb, sel, spawned_root_pids
+
+DEFAULT_PRODUCT_URL = "https://www.zepto.com/pn/iced-americano/pvid/1f0d5ca8-8cb2-4499-b326-27654a68b6c7"
+HOME_URL = "https://www.zepto.com"
+
+
+async def _timed(timings: dict, step: str, coro):
+    start = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        print(f"   ⚠️ {step}: {e}")
+        timings[f"{step}_failed"] = True
+    timings[step] = time.perf_counter() - start
+
+
+async def run_flow(p, mode: str, user_data_dir: str, product_url: str, headless: bool, add_to_cart: bool) -> dict:
+    """One cold run of the order flow in the given mode. Returns timings (seconds) and memory."""
+    timings = {}
+    start = time.perf_counter()
+
+    launch_start = time.perf_counter()
+    pids_before = browser_pids()
+    context = await p.firefox.launch_persistent_context(
+        user_data_dir=user_data_dir,
+        headless=headless,
+        **context_options(mode),
+    )
+    timings["launch"] = time.perf_counter() - launch_start
+    browser_root_pids = spawned_root_pids(pids_before)
+
+    try:
+        page = context.pages[0] if context.pages else await context.new_page()
+
+        await _timed(timings, "home", page.goto(HOME_URL, wait_until="domcontentloaded"))
+        await _timed(timings, "home_ready", page.wait_for_selector(
+            f"{sel('cart_button', mode)}, {sel('login_button', mode)}", timeout=10000))
+
+        await _timed(timings, "product", page.goto(product_url, wait_until="domcontentloaded"))
+        await _timed(timings, "add_button", page.wait_for_selector(sel("add_or_notify", mode), timeout=10000))
+
+        if add_to_cart:
+            await _timed(timings, "add_to_cart", page.click(sel("add_to_cart", mode), timeout=5000))
+
+        await _timed(timings, "address_modal", _open_address_modal(page, mode))
+
+        await _timed(timings, "cart", _open_cart(page, mode, add_to_cart))
+
+        timings["dom_nodes"] = await page.evaluate("() => document.getElementsByTagName('*').length")
+        timings["rss_mb"] = process_tree_rss_mb(browser_root_pids)
+        timings["total"] = time.perf_counter() - start
+    finally:
+        await context.close()
+    return timings
+
+
+async def _open_address_modal(page, mode: str):
+    await page.click(sel("address_header", mode), timeout=5000)
+    await page.wait_for_selector(sel("address_modal", mode), timeout=5000)
+    await page.keyboard.press("Escape")
+
+
+async def _open_cart(page, mode: str, expect_checkout: bool):
+    await page.click(sel("cart_button", mode), timeout=5000)
+    ready = sel("checkout_ready", mode) if expect_checkout else sel("cart_loaded", mode)
+    await page.wait_for_selector(ready, timeout=5000)
+
+
+def _report(results: dict[str, list[dict]]) -> None:
+    steps = ["launch", "home", "home_ready", "product", "add_button", "add_to_cart",
+             "address_modal", "cart", "total"]
+    modes = list(results)
+    print("\n" + "=" * 60)
+    print("📊 Median over runs (seconds unless noted)")
+    print("=" * 60)
+    print(f"{'step':<16}" + "".join(f"{m:>14}" for m in modes))
+    for step in steps + ["dom_nodes", "rss_mb"]:
+        row = []
+        for mode in modes:
+            values = [r[step] for r in results[mode] if step in r]
+            row.append(f"{statistics.median(values):>14.2f}" if values else f"{'-':>14}")
+        if any(v.strip() != "-" for v in row):
+            print(f"{step:<16}" + "".join(row))
+    failures = {m: sum(1 for r in results[m] for k in r if k.endswith("_failed")) for m in modes}
+    print(f"\nFailed steps per mode: {failures}")
+    print("(A failed step in mobile mode usually means a mobile selector needs updating in zepto_browser.SELECTORS)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", default="desktop,mobile")
+    parser.add_argument("--product-url", default=DEFAULT_PRODUCT_URL)
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--add-to-cart", action="store_true")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    user_data_dir = os.path.join(script_dir, "zepto_firefox_data")
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    results = {mode: [] for mode in modes}
+    async with async_playwright() as p:
+        for run in range(1, args.runs + 1):
+            # Alternate mode order so warm OS caches don't favour one mode
+            for mode in (modes if run % 2 else list(reversed(modes))):
+                print(f"🧪 Run {run}/{args.runs} - {mode}")
+                timings = await run_flow(p, mode, user_data_dir, args.product_url, args.headless, args.add_to_cart)
+                print(f"   total {timings['total']:.2f}s, rss {timings['rss_mb']} MB, dom {timings['dom_nodes']} nodes")
+                results[mode].append(timings)
+
+    _report(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
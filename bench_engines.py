@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Firefox vs Chromium vs WebKit for the order flow.
+
+Serves a local stand-in for the Zepto pages (same selectors as the desktop
+site) and runs the order flow on each installed engine: launch, home,
+product page, add to cart, address selection, cart and checkout. Reports
+launch time, per-step latency and browser RSS. This measures the engine
+mechanics only.
+
+The stand-in pages are written to match zepto_browser.SELECTORS, so running
+the selector map against them only shows that each engine parses the
+selectors. It says nothing about whether they match the real Zepto DOM. For
+that, save real pages (page.content() from a logged-in session) into a
+directory as product.html, out_of_stock.html, address_modal.html and
+cart.html, and pass --saved-pages DIR. Each engine then checks the selector
+map against those copies, offline.
+
+No real Zepto traffic and no login needed. Install the engines first:
+    python3 -m playwright install firefox chromium webkit
+
+Usage:
+    python3 bench_engines.py                      # all engines, 3 runs each
+    python3 bench_engines.py --engines firefox,chromium --runs 5 --headed
+    python3 bench_engines.py --latency-ms 80      # add per-request server latency
+    python3 bench_engines.py --saved-pages saved_zepto_pages/   # check selectors against real pages
+
+Pick the winner for production with ZEPTO_BROWSER_ENGINE=<engine>.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from playwright.async_api import async_playwright
+
+from zepto_browser import SELECTORS, SUPPORTED_ENGINES, browser_rss_mb, context_options
+
+IN_STOCK_PATH = "/pn/iced-americano/pvid/1f0d5ca8-8cb2-4499-b326-27654a68b6c7"
+OUT_OF_STOCK_PATH = "/pn/hazelnut-latte/pvid/89ca18fd-2178-4ef6-a3e5-b9545447f181"
+ADDRESS_LABEL = "Hsr Home"
+
+# ============================================================================
+# STAND-IN SITE
+# ============================================================================
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Zepto stand-in</title>
+<style>.hidden {{ display: none; }} body {{ font-family: sans-serif; }}</style></head>
+<body>
+<header>
+  <span data-testid="login-btn" class="hidden">Login</span>
+  <h3 data-testid="user-address" class="WCHS8" onclick="show('addr')">{address}</h3>
+  <button data-testid="cart-btn" aria-label="Cart" onclick="openCart()">Cart
+    <span data-testid="cart-items-number" id="badge"></span></button>
+</header>
+<main>{main}</main>
+
+<div data-testid="address-modal" id="addr" class="hidden" role="dialog">
+  <div data-testid="saved-address-container">
+    <div class="c4ZmYS" onclick="pickAddress(this)"><span>Hsr Home</span></div>
+    <div class="c4ZmYS" onclick="pickAddress(this)"><span>Office New Cafe</span></div>
+    <div class="c4ZmYS" onclick="pickAddress(this)"><span>Hyd Home</span></div>
+  </div>
+</div>
+
+<div id="cart" class="hidden">
+  <header class="zMuMp"><div class="zzBbh MwhZN">
+    <button class="cpG2SV cm4lUI c63b8l" aria-label="Back button" onclick="hide('cart')">
+      <svg height="24" width="24" viewBox="0 0 24 24"><path d="M15.5 19L8.5 12L15.5 5" stroke="black" stroke-width="2.5"></path></svg>
+    </button></div></header>
+  <div id="lines"></div>
+  <button class="my-2.5 bg-skin-primary" onclick="placeOrder()"><span class="text-body1 text-white">Place Order</span></button>
+  <button>Click to Pay</button>
+  <div testid="nvb_cod">Pay on Delivery</div>
+  <div>Proceed to Pay</div>
+</div>
+
+<script>
+function show(id) {{ document.getElementById(id).classList.remove('hidden'); }}
+function hide(id) {{ document.getElementById(id).classList.add('hidden'); }}
+function cart() {{ return JSON.parse(localStorage.getItem('cart') || '{{}}'); }}
+function saveCart(c) {{ localStorage.setItem('cart', JSON.stringify(c)); render(); }}
+function render() {{
+  const c = cart(); const n = Object.values(c).reduce((a, b) => a + b, 0);
+  document.getElementById('badge').textContent = n ? String(n) : '';
+  document.getElementById('lines').innerHTML = Object.entries(c).map(([name, qty]) =>
+    `<div class="__6RuoF" data-testid="cart-item"><span>${{name}}</span>
+       <button aria-label="Remove" onclick="dec('${{name}}')"><svg><path d="M20 12H4"></path></svg></button>
+       <p data-testid="undefined-cart-qty">${{qty}}</p></div>`).join('')
+    || '<span>Your cart is empty</span>';
+}}
+function add(name) {{ const c = cart(); c[name] = (c[name] || 0) + 1; saveCart(c); }}
+function dec(name) {{ const c = cart(); c[name] -= 1; if (c[name] <= 0) delete c[name]; saveCart(c); }}
+function openCart() {{ setTimeout(() => {{ render(); show('cart'); }}, 30); }}
+function pickAddress(el) {{ document.querySelector("[data-testid='user-address']").textContent = el.textContent.trim(); hide('addr'); }}
+function placeOrder() {{ localStorage.removeItem('cart'); document.body.insertAdjacentHTML('beforeend', '<h2>Order Placed</h2>'); }}
+render();
+</script>
+</body></html>
+"""
+
+_IN_STOCK_MAIN = """<h1>Iced Americano</h1><p>₹149</p>
+<div aria-label="Add to Cart"><button class="WJXJe" data-testid="add-to-cart-btn" aria-label="Add to Cart"
+  onclick="add('Iced Americano')">Add To Cart</button></div>"""
+
+_OUT_OF_STOCK_MAIN = """<h1>Hazelnut Latte</h1><p>₹189</p>
+<button class="SVCWV" aria-label="Notify Me"><span>Notify Me</span></button>"""
+
+
+def _make_handler(latency_ms: int):
+    class StandInHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            if self.path.startswith(IN_STOCK_PATH):
+                main = _IN_STOCK_MAIN
+            elif self.path.startswith(OUT_OF_STOCK_PATH):
+                main = _OUT_OF_STOCK_MAIN
+            else:
+                main = "<h1>Zepto Cafe</h1>"
+            body = _PAGE.format(address="Office New Cafe", main=main).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StandInHandler
+
+
+def start_standin_site(latency_ms: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ============================================================================
+# FLOW
+# ============================================================================
+
+async def run_flow(p, engine: str, base_url: str, headless: bool) -> dict:
+    """One cold run: fresh persistent profile, full flow up to the Place Order click."""
+    s = SELECTORS["desktop"]
+    timings = {}
+    profile_dir = tempfile.mkdtemp(prefix=f"zepto_bench_{engine}_")
+    start = time.perf_counter()
+    try:
+        step_start = time.perf_counter()
+        context = await getattr(p, engine).launch_persistent_context(
+            user_data_dir=profile_dir, headless=headless, **context_options("desktop", engine))
+        page = context.pages[0] if context.pages else await context.new_page()
+        timings["launch"] = time.perf_counter() - step_start
+
+        async def step(name, *actions):
+            step_start = time.perf_counter()
+            for action in actions:
+                await action
+            timings[name] = time.perf_counter() - step_start
+
+        try:
+            await step("home", page.goto(base_url, wait_until="domcontentloaded"),
+                       page.wait_for_selector(s["cart_button"]))
+            await step("product", page.goto(base_url + IN_STOCK_PATH, wait_until="domcontentloaded"),
+                       page.wait_for_selector(s["add_or_notify"]))
+            await step("add_to_cart", page.click(s["add_to_cart"]),
+                       page.wait_for_function("() => document.getElementById('badge').textContent === '1'"))
+            await step("address", page.click(s["address_header"]),
+                       page.wait_for_selector(s["address_modal"]),
+                       page.click(s["address_item"].format(label=ADDRESS_LABEL)))
+            await step("cart", page.click(s["cart_button"]), page.wait_for_selector(s["checkout_ready"]))
+            await step("checkout", page.click(s["place_order"]), page.wait_for_selector("text=Order Placed"))
+            timings["rss_mb"] = browser_rss_mb()
+        finally:
+            await context.close()
+        timings["total"] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    return timings
+
+
+# Which page state each selector key can be checked in
+_VALIDATION_STATES = {
+    "product": ["login_button", "cart_button", "add_to_cart", "add_to_cart_any", "add_or_notify", "address_header"],
+    "out_of_stock": ["notify_me", "add_or_notify"],
+    "address_modal": ["address_modal", "address_item"],
+    "cart": ["cart_badge", "cart_line_item", "cart_item_qty", "cart_loaded", "place_order",
+             "checkout_ready", "click_to_pay", "pay_on_delivery", "proceed_to_pay"],
+}
+
+
+async def validate_selectors(p, engine: str, base_url: str, mode: str) -> dict:
+    """
+    Return {selector_key: error} for every selector that fails to resolve on
+    this engine against the stand-in site. The stand-in mirrors the selector
+    map, so this only checks that the engine accepts the selector syntax.
+    """
+    selectors = SELECTORS[mode]
+    failures = {}
+    browser = await getattr(p, engine).launch(headless=True)
+    try:
+        page = await (await browser.new_context(**context_options(mode, engine))).new_page()
+
+        async def check(state):
+            failures.update(await _check_state(page, selectors, state))
+
+        await page.goto(base_url + OUT_OF_STOCK_PATH)
+        await check("out_of_stock")
+        await page.goto(base_url + IN_STOCK_PATH)
+        await check("product")
+        await page.click(selectors["address_header"].split(",")[0])
+        await check("address_modal")
+        await page.keyboard.press("Escape")
+        await page.evaluate("() => { add('Iced Americano'); openCart(); }")
+        await page.wait_for_timeout(100)
+        await check("cart")
+
+        covered = {k for keys in _VALIDATION_STATES.values() for k in keys}
+        for key in selectors:
+            if key not in covered:
+                failures[key] = "not covered by stand-in site"
+    finally:
+        await browser.close()
+    return failures
+
+
+async def _check_state(page, selectors: dict, state: str) -> dict:
+    failures = {}
+    for key in _VALIDATION_STATES[state]:
+        selector = selectors[key].format(label=ADDRESS_LABEL)
+        try:
+            if await page.locator(selector).count() == 0:
+                failures[key] = "no match"
+        except Exception as e:
+            failures[key] = str(e).splitlines()[0]
+    return failures
+
+
+async def validate_saved_pages(p, engine: str, pages_dir: str, mode: str) -> dict:
+    """
+    Return {selector_key: error} for the selectors that don't match saved
+    copies of real Zepto pages (<state>.html in pages_dir), loaded offline.
+    States without a saved page are reported as not checked.
+    """
+    selectors = SELECTORS[mode]
+    failures = {}
+    browser = await getattr(p, engine).launch(headless=True)
+    try:
+        context = await browser.new_context(**context_options(mode, engine))
+        await context.route("**/*", lambda route: route.abort())  # Saved pages stay offline
+        page = await context.new_page()
+        for state, keys in _VALIDATION_STATES.items():
+            path = os.path.join(pages_dir, f"{state}.html")
+            if not os.path.exists(path):
+                failures.update({key: f"not checked (no {state}.html)" for key in keys if key not in failures})
+                continue
+            with open(path, encoding="utf-8") as f:
+                await page.set_content(f.read(), wait_until="domcontentloaded")
+            for key, error in (await _check_state(page, selectors, state)).items():
+                failures[key] = f"{error} in {state}.html"
+        covered = {k for keys in _VALIDATION_STATES.values() for k in keys}
+        for key in selectors:
+            if key not in covered:
+                failures[key] = "not covered by any saved page state"
+    finally:
+        await browser.close()
+    return failures
+
+
+def _report(results: dict[str, list[dict]], validation: dict[str, dict], against_real_pages: bool) -> None:
+    steps = ["launch", "home", "product", "add_to_cart", "address", "cart", "checkout", "total", "rss_mb"]
+    engines = [e for e in results if results[e]]
+    print("\n" + "=" * 72)
+    print("📊 Median over runs (seconds; rss in MB)")
+    print("=" * 72)
+    print(f"{'step':<14}" + "".join(f"{e:>14}" for e in engines))
+    for step in steps:
+        row = ""
+        for engine in engines:
+            values = [r[step] for r in results[engine] if step in r]
+            row += f"{statistics.median(values):>14.3f}" if values else f"{'-':>14}"
+        print(f"{step:<14}" + row)
+
+    if against_real_pages:
+        print("\n🔎 Selector validation against saved Zepto pages")
+    else:
+        print("\n🔎 Selector syntax check against the stand-in site (not the real Zepto DOM; see --saved-pages)")
+    for engine, failures in validation.items():
+        if not failures:
+            print(f"   ✅ {engine}: all selectors resolve")
+        for key, error in failures.items():
+            print(f"   ❌ {engine}: {key} - {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default=",".join(SUPPORTED_ENGINES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--mode", default="desktop", help="selector map to validate (desktop/mobile)")
+    parser.add_argument("--saved-pages", help="directory of saved real Zepto pages to validate the selectors against")
+    args = parser.parse_args()
+
+    server, base_url = start_standin_site(args.latency_ms)
+    print(f"🌐 Stand-in site at {base_url}")
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    results = {engine: [] for engine in engines}
+    validation = {}
+
+    try:
+        async with async_playwright() as p:
+            for engine in engines:
+                print(f"\n🧪 {engine}")
+                try:
+                    for run in range(1, args.runs + 1):
+                        timings = await run_flow(p, engine, base_url, headless=not args.headed)
+                        print(f"   run {run}: launch {timings['launch']:.2f}s, total {timings['total']:.2f}s, "
+                              f"rss {timings.get('rss_mb', 0)} MB")
+                        results[engine].append(timings)
+                    if args.saved_pages:
+                        validation[engine] = await validate_saved_pages(p, engine, args.saved_pages, args.mode)
+                    else:
+                        validation[engine] = await validate_selectors(p, engine, base_url, args.mode)
+                except Exception as e:
+                    print(f"   ⚠️ {engine} unavailable: {str(e).splitlines()[0]}")
+    finally:
+        server.shutdown()
+
+    _report(results, validation, against_real_pages=bool(args.saved_pages))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
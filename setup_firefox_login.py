@@ -6,6 +6,7 @@ Run this once to save your login session, then future orders will use the saved
 import asyncio
 import os
 from playwright.async_api import async_playwright
+from zepto_profile import ProfileBusyError, ProfileLease
 
 async def setup_firefox_login():
     """Launch Firefox, navigate to Zepto, and wait for user to log in manually."""
@@ -25,6 +26,14 @@ async def setup_firefox_login():
     print("4. Save your login session for future orders")
     print("\n" + "=" * 60)
     
+    # Don't pull the profile out from under a running MCP/API server
+    lease = ProfileLease(firefox_data_dir, wait_seconds=0)
+    try:
+        lease.acquire()
+    except ProfileBusyError as e:
+        print(f"\n❌ {e}")
+        return
+    
     # Clean up old directory if it exists
     if os.path.exists(firefox_data_dir):
         import shutil
@@ -123,6 +132,7 @@ async def setup_firefox_login():
         print("\n✅ Closing browser...")
         await context.close()
         await p.stop()
+        lease.release()
         print("✅ Setup complete!")
         
     except Exception as e:
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""BrowserLauncher cleanup of failed and timed-out launch attempts, with a fake Playwright."""
+
+import asyncio
+
+import pytest
+
+import zepto_browser
+from zepto_browser import BrowserLauncher
+from zepto_profile import ProfileLease
+
+
+class FakeContext:
+    def __init__(self, fail_new_page=False):
+        self.pages = []
+        self.closed = False
+        self.fail_new_page = fail_new_page
+
+    async def new_page(self):
+        if self.fail_new_page:
+            raise RuntimeError("new_page failed")
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+    def on(self, event, callback):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    async def new_context(self, **kwargs):
+        raise RuntimeError("new_context failed")
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserType:
+    def __init__(self, delay=0.0, context=None):
+        self.delay = delay
+        self.context = context or FakeContext()
+        self.browser = FakeBrowser()
+
+    async def launch_persistent_context(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self.context
+
+    async def launch(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self.browser
+
+
+class FakePlaywright:
+    def __init__(self, firefox):
+        self.firefox = firefox
+
+
+@pytest.fixture
+def launcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(zepto_browser, "UNPROVEN_LAUNCH_TIMEOUT", 0.1)
+    return BrowserLauncher(base_dir=str(tmp_path), strategies=["firefox_persistent"], engine="firefox")
+
+
+def lease_free(launcher) -> bool:
+    lease = ProfileLease(launcher.profile_dir("firefox"), wait_seconds=0)
+    try:
+        lease.acquire()
+    except Exception:
+        return False
+    lease.release()
+    return True
+
+
+def test_timed_out_persistent_launch_is_closed_before_the_lease_is_released(launcher):
+    firefox = FakeBrowserType(delay=0.3)
+
+    async def scenario():
+        with pytest.raises(Exception, match="All browser launch strategies failed"):
+            await launcher.launch(FakePlaywright(firefox))
+        assert not lease_free(launcher)  # The late browser still holds the profile
+        await asyncio.sleep(0.4)
+        assert firefox.context.closed
+        assert lease_free(launcher)
+
+    asyncio.run(scenario())
+
+
+def test_context_is_closed_when_a_later_step_fails(launcher):
+    firefox = FakeBrowserType(context=FakeContext(fail_new_page=True))
+
+    async def scenario():
+        with pytest.raises(Exception, match="new_page failed"):
+            await launcher.launch(FakePlaywright(firefox))
+        assert firefox.context.closed
+        assert lease_free(launcher)
+
+    asyncio.run(scenario())
+
+
+def test_plain_browser_is_closed_when_new_context_fails(tmp_path):
+    launcher = BrowserLauncher(base_dir=str(tmp_path), strategies=["firefox"], engine="firefox")
+    firefox = FakeBrowserType()
+
+    with pytest.raises(Exception, match="new_context failed"):
+        asyncio.run(launcher.launch(FakePlaywright(firefox)))
+    assert firefox.browser.closed
+
+
+def test_failed_relaunch_is_recorded_and_re_raised(launcher):
+    recycler = zepto_browser.ContextRecycler(launcher, max_orders=1, max_rss_mb=0)
+    recycler.order_finished()
+    context = FakeContext()
+    handle = {"context": context, "browser": context, "pids": [], "persistent": True}
+
+    async def failing_launch(playwright, **kwargs):
+        raise RuntimeError("no browser")
+
+    launcher.launch = failing_launch
+    with pytest.raises(RuntimeError, match="no browser"):
+        asyncio.run(recycler.maybe_recycle(handle, None))
+    assert context.closed
+    stats = recycler.stats()
+    assert stats["failed_recycles"] == 1 and stats["recycle_count"] == 0
+    assert stats["recent_recycles"][-1]["failed"]
+    assert recycler.orders_since_launch == 0
+
+
+def test_browser_closed_by_the_caller_counts_as_a_recycle_only_with_a_reason(launcher):
+    recycler = zepto_browser.ContextRecycler(launcher, max_orders=2, max_rss_mb=0)
+    handle = {"pids": []}
+    recycler.order_finished()
+    assert recycler.due(handle) is None
+    recycler.order_finished()
+    reason = recycler.due(handle)
+    assert reason == "2 orders"
+
+    recycler.closed(handle, reason)
+    assert recycler.orders_since_launch == 0 and recycler.recycle_count == 1
+    assert recycler.events[-1]["strategy"] == "closed"
+
+    recycler.order_finished()
+    recycler.closed(handle)  # An ordinary teardown
+    assert recycler.orders_since_launch == 0 and recycler.recycle_count == 1
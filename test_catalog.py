@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Catalog search, aliases, the mmap artifact, hot reload and the stock table."""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+import zepto_catalog
+from zepto_catalog import stock, storage
+from zepto_catalog import CatalogFile, MappedCatalog, ProductStore, StockCache, address_matches, build_artifact
+from zepto_catalog.artifact import artifact_path, source_signature
+from zepto_catalog.storage import publish_products, write_catalog_file
+
+AMERICANO = "https://www.zepto.com/pn/iced-americano/pvid/11111111-1111-1111-1111-111111111111"
+COKE = "https://www.zepto.com/pn/coca-cola-zero-sugar/pvid/22222222-2222-2222-2222-222222222222"
+LATTE = "https://www.zepto.com/pn/hazelnut-latte/pvid/33333333-3333-3333-3333-333333333333"
+POHA = "https://www.zepto.com/pn/poha/pvid/44444444-4444-4444-4444-444444444444"
+
+ENTRIES = {
+    "iced americano": AMERICANO,
+    "coca cola zero sugar": COKE,
+    "coke zero": COKE,
+    "hazelnut latte": LATTE,
+    "poha": POHA,
+}
+QUERIES = ["iced americano", "americano iced", "amerikano", "coke", "coke zero", "hazlenut latte", "poha", "latte"]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    write_catalog_file(path, ENTRIES)
+    return path
+
+
+def test_aliases_resolve_to_one_product():
+    store = ProductStore(ENTRIES)
+    assert len(store) == 4
+    assert store.lookup("Coke Zero") == store.lookup("coca cola zero sugar") == "22222222-2222-2222-2222-222222222222"
+    assert sorted(store.get(store.lookup("coke zero"))["names"]) == ["coca cola zero sugar", "coke zero"]
+    assert store.lookup("hazelnut-latte") == "33333333-3333-3333-3333-333333333333"  # by slug
+    assert store.lookup("flat white") is None
+
+
+def test_ranked_search():
+    matches = ProductStore(ENTRIES).search("americano iced", limit=3)
+    assert matches[0]["name"] == "iced americano"
+    assert matches[0]["pvid"] == "11111111-1111-1111-1111-111111111111"
+    assert all(a["score"] >= b["score"] for a, b in zip(matches, matches[1:]))
+
+
+def test_mapped_catalog_matches_the_in_memory_store(catalog_path):
+    store = ProductStore(ENTRIES)
+    build_artifact(store, artifact_path(catalog_path), source_signature(catalog_path))
+    mapped = MappedCatalog(artifact_path(catalog_path))
+
+    assert len(mapped) == len(store)
+    assert sorted(mapped.names()) == sorted(store.names())
+    for query in QUERIES:
+        assert mapped.search(query, limit=5) == store.search(query, limit=5), query
+    for name in ENTRIES:
+        assert mapped.lookup(name) == store.lookup(name)
+        assert mapped.url(mapped.lookup(name)) == store.url(store.lookup(name))
+    assert mapped.prefixed("co") == store.prefixed("co")
+
+
+def bump_mtime(path: str) -> None:
+    # Filesystem timestamps can be coarse; make sure the change is visible
+    later = time.time_ns() + 5_000_000_000
+    os.utime(path, ns=(later, later))
+
+
+def test_catalog_file_reloads_when_it_changes(catalog_path, monkeypatch):
+    monkeypatch.setattr(storage, "CATALOG_CHECK_SECONDS", 0)
+    catalog = CatalogFile(catalog_path)
+    assert catalog.current().lookup("poha") is not None
+    assert catalog.current().lookup("flat white") is None
+
+    publish_products({"flat white": "https://www.zepto.com/pn/flat-white/pvid/55555555-5555-5555-5555-555555555555"},
+                     catalog_path)
+    bump_mtime(catalog_path)
+    assert catalog.current().lookup("flat white") == "55555555-5555-5555-5555-555555555555"
+
+    publish_products({"poha": POHA}, catalog_path, replace=True)
+    bump_mtime(catalog_path)
+    store = catalog.current()
+    assert store.lookup("flat white") is None and len(store) == 1
+
+
+def test_catalog_file_uses_a_fresh_artifact_only(catalog_path, monkeypatch):
+    monkeypatch.setattr(storage, "CATALOG_CHECK_SECONDS", 0)
+    build_artifact(ProductStore(ENTRIES), artifact_path(catalog_path), source_signature(catalog_path))
+    catalog = CatalogFile(catalog_path)
+    assert isinstance(catalog.current(), MappedCatalog)
+
+    # The JSON changes without the artifact being rebuilt: fall back to parsing it
+    write_catalog_file(catalog_path, {**ENTRIES, "masala chai": "https://www.zepto.com/pn/masala-chai/pvid/"
+                                                                "66666666-6666-6666-6666-666666666666"})
+    bump_mtime(catalog_path)
+    store = catalog.current()
+    assert isinstance(store, ProductStore)
+    assert store.lookup("masala chai") == "66666666-6666-6666-6666-666666666666"
+
+
+def test_replaced_artifacts_are_unmapped(catalog_path, monkeypatch):
+    monkeypatch.setattr(storage, "CATALOG_CHECK_SECONDS", 0)
+    build_artifact(ProductStore(ENTRIES), artifact_path(catalog_path), source_signature(catalog_path))
+    catalog = CatalogFile(catalog_path)
+    first = catalog.current()
+    fds = len(os.listdir("/proc/self/fd"))
+
+    for n in range(5):
+        publish_products({f"item {n}": f"https://www.zepto.com/pn/item-{n}/pvid/{n}{'0' * 7}-0000-0000-0000-000000000000"},
+                         catalog_path)
+        bump_mtime(catalog_path)
+        build_artifact(ProductStore(storage.read_catalog_file(catalog_path)), artifact_path(catalog_path),
+                       source_signature(catalog_path))
+        assert isinstance(catalog.current(), MappedCatalog)
+
+    assert first.mm.closed
+    assert len(os.listdir("/proc/self/fd")) <= fds
+    assert catalog.current().lookup("item 4") is not None
+
+
+def test_address_matches():
+    assert address_matches("Hsr Home", "HSR Home - 3rd floor, 27th Main")
+    assert address_matches("hsr home", "Hsr Home")
+    assert not address_matches("Office", "Hsr Home")
+    assert not address_matches("", "Hsr Home")
+    assert not address_matches("Hsr Home", None)
+
+
+def age(cache: StockCache, seconds: float) -> None:
+    for entry in cache.entries.values():
+        entry["checked_at"] -= seconds
+
+
+def test_stock_entries_go_stale_then_expire():
+    cache = StockCache(ttl=60, stale_for=600)
+    pvid = "44444444-4444-4444-4444-444444444444"
+    cache.record(pvid, "Hsr Home - 3rd floor", in_stock=False, name="Poha", price=49.0)
+
+    assert cache.get(pvid, "hsr home")["in_stock"] is False
+    assert cache.get(pvid, "Office") is None
+    assert [e["pvid"] for e in cache.likely_out_of_stock([pvid], "Hsr Home")] == [pvid]
+    assert not cache.needs_refresh(pvid, "Hsr Home")
+
+    age(cache, 120)
+    assert cache.get(pvid, "hsr home") is None
+    stale = cache.get(pvid, "hsr home", allow_stale=True)
+    assert stale["stale"] and stale["in_stock"] is False
+    assert cache.likely_out_of_stock([pvid], "Hsr Home") == []
+    assert cache.likely_out_of_stock([pvid], "Hsr Home", allow_stale=True)
+    assert cache.needs_refresh(pvid, "Hsr Home")
+
+    age(cache, 600)
+    assert cache.get(pvid, "hsr home", allow_stale=True) is None
+    cache.prune()
+    assert cache.entries == {}
+
+
+def test_record_keeps_fields_it_did_not_learn():
+    cache = StockCache(ttl=60, stale_for=0)
+    pvid = "11111111-1111-1111-1111-111111111111"
+    cache.record(pvid, "Hsr Home", in_stock=True, name="Iced Americano", price=150.0)
+    entry = cache.record(pvid, "Hsr Home", in_stock=False)
+    assert (entry["in_stock"], entry["name"], entry["price"]) == (False, "Iced Americano", 150.0)
+
+
+def test_stock_table_survives_a_restart(tmp_path):
+    path = str(tmp_path / "stock.json")
+    pvid = "22222222-2222-2222-2222-222222222222"
+    StockCache(ttl=60, stale_for=600, path=path).record(pvid, "Office", in_stock=True, price=40.0)
+
+    reloaded = StockCache(ttl=60, stale_for=600, path=path)
+    assert reloaded.get(pvid, "office")["price"] == 40.0
+
+
+def test_a_visit_that_could_not_tell_the_stock_does_not_refresh_the_entry():
+    cache = StockCache(ttl=60, stale_for=600)
+    pvid = "44444444-4444-4444-4444-444444444444"
+    cache.record(pvid, "Hsr Home", in_stock=False)
+    age(cache, 120)
+
+    entry = cache.record(pvid, "Hsr Home", in_stock=None, price=52.0)
+    assert entry["in_stock"] is False and entry["price"] == 52.0
+    assert cache.get(pvid, "Hsr Home") is None  # Still as old as the last real check
+    assert cache.needs_refresh(pvid, "Hsr Home")
+
+    assert cache.record(pvid, "Office", in_stock=None)["in_stock"] is None
+    assert cache.needs_refresh(pvid, "Office")
+    assert cache.likely_out_of_stock([pvid], "Office") == []
+
+
+def test_records_in_an_event_loop_share_one_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock, "STOCK_SAVE_DELAY_SECONDS", 0.05)
+    path = tmp_path / "stock.json"
+    cache = StockCache(ttl=60, stale_for=600, path=str(path))
+    writes = []
+    save = cache.save
+    monkeypatch.setattr(cache, "save", lambda: (writes.append(1), save()))
+
+    async def scenario():
+        for n in range(5):
+            cache.record(f"{n}1111111-1111-1111-1111-111111111111", "Office", in_stock=True)
+        assert not path.exists()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert len(writes) == 1
+    assert len(StockCache(ttl=60, stale_for=600, path=str(path)).entries) == 5
+
+
+def test_near_misses_rank_first_but_are_only_suggested(monkeypatch):
+    store = ProductStore({
+        "cappuccino": "https://www.zepto.com/pn/cappuccino/pvid/77777777-7777-7777-7777-777777777777",
+        "hazelnut cappuccino": "https://www.zepto.com/pn/hazelnut-cappuccino/pvid/88888888-8888-8888-8888-888888888888",
+        "dal makhani": "https://www.zepto.com/pn/dal-makhani/pvid/99999999-9999-9999-9999-999999999999",
+        "paneer makhani": "https://www.zepto.com/pn/paneer-makhani/pvid/aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+    })
+    assert store.search("capuchino")[0]["name"] == "cappuccino"
+    assert {m["name"] for m in store.search("makhni")[:2]} == {"dal makhani", "paneer makhani"}
+
+    monkeypatch.setattr(zepto_catalog, "product_store", lambda: store)
+    capuchino, makhni = zepto_catalog.resolve_names(["capuchino", "makhni"])
+    assert not capuchino["resolved"] and capuchino["suggestions"][0]["name"] == "cappuccino"
+    assert not makhni["resolved"]  # Two dishes fit equally well
+    assert {m["name"] for m in makhni["suggestions"]} >= {"dal makhani", "paneer makhani"}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""OTP line parsing and the inline providers' wait()."""
+
+import asyncio
+import os
+import time
+
+import zepto_otp
+from zepto_otp import FileOtpProvider, OtpProvider, parse_otp_lines
+
+
+def test_parse_otp_lines():
+    text = "123456\nlogin: 4321\nPayment 98765432\nhello 123\n12\n"
+    assert parse_otp_lines(text) == [(None, "123456"), ("login", "4321"), ("payment", "98765432")]
+
+
+class InboxProvider(OtpProvider):
+    inline = True
+
+
+def test_tool_provider_never_waits():
+    assert asyncio.run(OtpProvider().wait("login", timeout=1)) is None
+
+
+def test_wait_takes_a_code_delivered_before_it_was_called():
+    provider = InboxProvider()
+    requested = time.time()
+    provider.deliver("111111", "login")
+    assert asyncio.run(provider.wait("login", timeout=0.1, since=requested)) == "111111"
+    assert provider.inbox == []
+
+
+def test_wait_ignores_old_codes_and_codes_for_the_other_otp(monkeypatch):
+    monkeypatch.setattr(zepto_otp, "OTP_POLL_SECONDS", 0.01)
+    provider = InboxProvider()
+    provider.deliver("111111", "login", at=time.time() - 60)
+    provider.deliver("222222", "payment")
+    assert asyncio.run(provider.wait("login", timeout=0.05, since=time.time() - 1)) is None
+    assert asyncio.run(provider.wait("payment", timeout=0.05, since=time.time() - 1)) == "222222"
+
+
+def test_wait_stops_when_the_tool_path_takes_over():
+    provider = InboxProvider()
+    assert asyncio.run(provider.wait("login", timeout=5, still_waiting=lambda: False)) is None
+
+
+def test_file_is_kept_until_a_code_from_it_is_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(zepto_otp, "OTP_POLL_SECONDS", 0.01)
+    path = tmp_path / "otp"
+    path.write_text("login 123456\n")
+    provider = FileOtpProvider(str(path))
+
+    # Too old for this wait: the file must survive for the wait that wants it
+    assert asyncio.run(provider.wait("login", timeout=0.05, since=time.time() + 60)) is None
+    assert path.exists()
+
+    assert asyncio.run(provider.wait("login", timeout=0.05, since=os.path.getmtime(path))) == "123456"
+    assert not path.exists()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""parse_product_html on server-rendered product page fixtures."""
+
+import json
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("playwright")
+
+from zepto_probe import ProductProbe, parse_product_html
+
+PVID = "11111111-1111-1111-1111-111111111111"
+OTHER = "22222222-2222-2222-2222-222222222222"
+
+
+def page(*scripts: str) -> str:
+    return "<html><head>" + "".join(scripts) + "</head><body><div id='__next'></div></body></html>"
+
+
+def json_ld(availability: str, price="149.00") -> str:
+    block = {"@context": "https://schema.org", "@type": "Product", "name": "Iced Americano",
+             "offers": {"@type": "Offer", "price": price, "availability": f"https://schema.org/{availability}"}}
+    return f'<script type="application/ld+json">{json.dumps(block)}</script>'
+
+
+def next_data(*products: dict) -> str:
+    state = {"props": {"pageProps": {"product": products[0], "recommended": list(products[1:])}}}
+    return f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script>'
+
+
+def flight(text: str) -> str:
+    return f"<script>self.__next_f.push([1,{json.dumps(text)}])</script>"
+
+
+def test_next_data_wins_and_ignores_recommended_products():
+    html = page(
+        json_ld("InStock"),
+        next_data({"id": PVID, "productName": "Iced Americano 250ml", "outOfStock": True, "sellingPrice": 14900},
+                  {"id": OTHER, "name": "Cold Brew", "inStock": True, "sellingPrice": 19900}),
+    )
+    assert parse_product_html(html, PVID) == {"in_stock": False, "name": "Iced Americano 250ml",
+                                             "price": 14900.0, "via": "next-data"}
+    assert parse_product_html(html, OTHER)["in_stock"] is True
+
+
+def test_streamed_chunks_are_read_after_the_pvid():
+    html = page(
+        flight(f'0:["$","div",null,{{"id":"{OTHER}","inStock":true}}]\n'),
+        flight(f'1:{{"productVariant":{{"id":"{PVID}","availableQuantity":0,"discountedSellingPrice":"9900"}}}}\n'),
+    )
+    result = parse_product_html(html, PVID)
+    assert (result["in_stock"], result["price"], result["via"]) == (False, 9900.0, "next-flight")
+
+
+def test_json_ld_is_the_fallback_and_fills_in_the_name():
+    result = parse_product_html(page(json_ld("OutOfStock")), PVID)
+    assert result == {"in_stock": False, "name": "Iced Americano", "price": 149.0, "via": "json-ld",
+                      "price_unit": "rupees"}
+
+    html = page(json_ld("InStock"), next_data({"id": PVID, "isAvailable": True}))
+    assert parse_product_html(html, PVID)["name"] == "Iced Americano"
+
+
+def test_page_without_a_stock_state():
+    assert parse_product_html(page(json_ld("PreOrder")), PVID) is None
+    assert parse_product_html("<html><body>Something went wrong</body></html>", PVID) is None
+
+
+def test_verify_learns_the_price_unit():
+    probe = ProductProbe()
+    assert probe.verify({"in_stock": True, "price": 149.0}, {"in_stock": True, "raw_price": 14900.0})
+    assert probe.verified and probe.price_scale == 0.01
+    assert not probe.verify({"in_stock": True, "price": 149.0}, {"in_stock": False, "raw_price": 14900.0})
+    assert not probe.verify({"in_stock": True}, None)
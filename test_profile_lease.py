@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""ProfileLease exclusivity and stale browser lock cleanup."""
+
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from zepto_profile import ProfileBusyError, ProfileLease
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def profile(tmp_path):
+    return str(tmp_path / "firefox_profile")
+
+
+def test_lease_is_exclusive_until_released(profile):
+    first = ProfileLease(profile, wait_seconds=0).acquire()
+    assert first.held and first.owner() == os.getpid()
+
+    with pytest.raises(ProfileBusyError, match=f"leased by pid {os.getpid()}"):
+        ProfileLease(profile, wait_seconds=0).acquire()
+
+    first.release()
+    assert not first.held
+    with ProfileLease(profile, wait_seconds=0) as second:
+        assert second.held
+
+
+def test_acquire_async_waits_for_the_holder(profile):
+    first = ProfileLease(profile, wait_seconds=0).acquire()
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(0.2, first.release)
+        second = await ProfileLease(profile).acquire_async(wait_seconds=5)
+        assert second.held
+        second.release()
+
+    asyncio.run(scenario())
+
+
+def test_stale_browser_lock_is_cleared(profile):
+    os.makedirs(profile)
+    os.symlink(f"127.0.0.1:+{dead_pid()}", os.path.join(profile, "lock"))
+    with ProfileLease(profile, wait_seconds=0):
+        assert not os.path.lexists(os.path.join(profile, "lock"))
+
+
+def test_live_browser_lock_keeps_the_profile_busy(profile):
+    os.makedirs(profile)
+    os.symlink(f"127.0.0.1:+{os.getpid()}", os.path.join(profile, "lock"))
+    lease = ProfileLease(profile, wait_seconds=0)
+    with pytest.raises(ProfileBusyError, match="still open in a browser"):
+        lease.acquire()
+    assert not lease.held  # The lease file is let go when giving up
+    assert os.path.islink(os.path.join(profile, "lock"))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""StepGraph ordering, gates and failure handling."""
+
+import asyncio
+
+import pytest
+
+from zepto_scheduler import StepGraph
+
+
+def test_steps_run_as_soon_as_their_dependencies_are_met():
+    ran = []
+
+    def step(name, value=None):
+        async def fn():
+            ran.append(name)
+            return value
+        return fn
+
+    async def scenario():
+        graph = StepGraph("order")
+        graph.gate("login")
+        graph.add("product", step("product", {"in_stock": True}))
+        graph.add("cart", step("cart", "cart"), deps=["login", "product"])
+        graph.start()
+
+        assert await graph.result("product", timeout=1) == {"in_stock": True}
+        assert ran == ["product"]
+        assert not graph.done("cart")
+
+        await asyncio.sleep(0.05)
+        graph.open("login")
+        assert await graph.result("cart", timeout=1) == "cart"
+        assert ran == ["product", "cart"]
+        rows = {row["step"]: row for row in graph.timeline()}
+        assert rows["product"]["end"] < rows["gate:login"]["start"] <= rows["cart"]["start"]
+
+    asyncio.run(scenario())
+
+
+def test_a_failed_step_yields_none_and_does_not_block_dependents():
+    async def broken():
+        raise RuntimeError("page didn't load\nstack trace")
+
+    async def after():
+        return "ran"
+
+    async def scenario():
+        graph = StepGraph()
+        graph.add("broken", broken)
+        graph.add("after", after, deps=["broken"])
+        graph.start()
+        assert await graph.result("broken", timeout=1) is None
+        assert await graph.result("after", timeout=1) == "ran"
+        assert graph.steps["broken"]["error"] == "page didn't load"
+        assert "(page didn't load)" in graph.summary()
+
+    asyncio.run(scenario())
+
+
+def test_result_is_none_on_timeout_cancel_or_unknown_step():
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        graph = StepGraph()
+        graph.add("slow", slow)
+        graph.start()
+        assert await graph.result("slow", timeout=0.01) is None
+        assert not graph.done("slow")  # A timed-out wait leaves the step running
+        graph.cancel()
+        assert await graph.result("slow") is None
+        assert graph.steps["slow"]["error"] == "cancelled"
+        assert await graph.result("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_bad_graphs_are_rejected():
+    async def noop():
+        pass
+
+    graph = StepGraph()
+    graph.add("a", noop)
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add("a", noop)
+    graph.add("b", noop, deps=["nowhere"])
+    with pytest.raises(ValueError, match="nowhere"):
+        graph.start()
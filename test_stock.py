@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""StockRefresher keeps revalidate requests until their products are checked."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("playwright")
+
+from zepto_browser import BrowserLauncher
+from zepto_catalog import StockCache
+from zepto_stock import StockRefresher
+
+CHECKED = "11111111-1111-1111-1111-111111111111"
+FAILED = "22222222-2222-2222-2222-222222222222"
+
+
+def url(pvid: str) -> str:
+    return f"https://www.zepto.com/pn/item/pvid/{pvid}"
+
+
+@pytest.fixture
+def refresher(tmp_path):
+    refresher = StockRefresher(BrowserLauncher(base_dir=str(tmp_path)), cache=StockCache(ttl=60, stale_for=600),
+                               hot_items=0, history_path=str(tmp_path / "orders.json"))
+    refresher.note_order([url(CHECKED), url(FAILED)], "Hsr Home")
+    refresher.revalidate([CHECKED, FAILED])
+    return refresher
+
+
+def test_requests_stay_queued_when_no_browser_is_available(refresher, monkeypatch):
+    async def no_browser(playwright, items):
+        return None
+
+    monkeypatch.setattr(refresher, "_check_parked", no_browser)
+    asyncio.run(refresher.refresh())
+    assert refresher.pending == {CHECKED, FAILED}
+
+
+def test_only_checked_products_leave_the_queue(refresher, monkeypatch):
+    async def one_fails(playwright, items):
+        results = []
+        for item in items:
+            if item["pvid"] == FAILED:
+                results.append(False)
+                continue
+            refresher.cache.record(item["pvid"], "Hsr Home", in_stock=None)
+            results.append({"in_stock": None, "address": "Hsr Home", "via": "browser"})
+        return results
+
+    monkeypatch.setattr(refresher, "_check_parked", one_fails)
+    asyncio.run(refresher.refresh())
+    assert refresher.pending == {FAILED}
+    assert (refresher.last_pass["checked"], refresher.last_pass["out_of_stock"], refresher.last_pass["failed"]) == (1, 0, 1)
+
+
+def test_fresh_requests_are_dropped(refresher, monkeypatch):
+    refresher.cache.record(CHECKED, "Hsr Home", in_stock=True)
+    refresher.cache.record(FAILED, "Hsr Home", in_stock=False)
+
+    async def unused(playwright, items):
+        raise AssertionError("nothing is due")
+
+    monkeypatch.setattr(refresher, "_check_parked", unused)
+    asyncio.run(refresher.refresh())
+    assert refresher.pending == set()
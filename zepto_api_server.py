@@ -10,6 +10,11 @@ Endpoints:
 - GET /status - Get current order status
 - POST /stop - Stop current order
 - GET /catalog - Get available products
+- GET /launcher - Browser launch strategy stats and timings
+- GET /metrics - Browser memory, order count and context recycle events
+- GET /profile - Browser profile size, maintenance results and launch-time history
+- GET /session - Saved login state, predicted expiry and keep-alive status
+- GET /stock - Background stock refresh: hot products and the last pass
 - POST /stock-decision - Handle out-of-stock decisions
 """
 
@@ -28,6 +33,14 @@ from pydantic import BaseModel, Field
 # Import the core automation logic
 # We'll refactor to import from zepto_mcp_server or duplicate the logic
 from playwright.async_api import async_playwright
+from zepto_browser import BrowserLauncher, ContextRecycler, read_product_page, sel
+from zepto_catalog import (
+    catalog_names, get_product_url, merge_order_items, parse_pvid, product_info, product_key, resolve_names,
+    stock_cache,
+)
+from zepto_profile import ProfileJanitor
+from zepto_session import SessionKeeper
+from zepto_stock import StockRefresher
 
 # Load environment variables
 try:
@@ -47,46 +60,6 @@ except ImportError:
 DEFAULT_PHONE = os.getenv("ZEPTO_PHONE_NUMBER", "")
 DEFAULT_ADDRESS = os.getenv("ZEPTO_DEFAULT_ADDRESS", "")
 
-# Product catalog - same as MCP server
-PRODUCT_CATALOG = {
-    "almond croissant": "https://www.zepto.com/pn/almond-croissant/pvid/c8a1a8c8-fc8b-4ca9-8e57-4305fa9e0b79",
-    "black forest shake": "https://www.zepto.com/pn/black-forest-shake/pvid/1d5a86f0-2565-432a-98c8-2dbad94cb470",
-    "hazelnut latte": "https://www.zepto.com/pn/hazelnut-latte/pvid/89ca18fd-2178-4ef6-a3e5-b9545447f181",
-    "mac and cheese": "https://www.zepto.com/pn/mac-and-cheese/pvid/b1cdf31f-4f53-45e9-bc73-360bc8d4707c",
-    "strawberry lemonade": "https://www.zepto.com/pn/strawberry-lemonade/pvid/0adbb1a8-79df-4c2b-af11-6442999138f2",
-    "angoori gulab jamun": "https://www.zepto.com/pn/angoori-gulab-jamun/pvid/3402b965-23f9-4070-b8c4-7ceae35bc82b",
-    "desi ghee aloo paratha with dahi": "https://www.zepto.com/pn/desi-ghee-aloo-paratha-with-dahi/pvid/f58ccd8c-e532-4e4e-b261-79b6290017e5",
-    "veg puff": "https://www.zepto.com/pn/veg-puff/pvid/362ac747-d438-4b80-916e-e074651e53bf",
-    "adrak chai": "https://www.zepto.com/pn/adrak-chai/pvid/959a5253-e580-4f44-8236-07ac7ba96bbf",
-    "iced americano": "https://www.zepto.com/pn/iced-americano/pvid/1f0d5ca8-8cb2-4499-b326-27654a68b6c7",
-    "spanish coffee": "https://www.zepto.com/pn/spanish-coffee/pvid/2c41692c-dd57-44d3-bfb7-ef61a12eb257",
-    "poha": "https://www.zepto.com/pn/poha/pvid/4426f6a8-ad91-4f21-a52a-823c8e659835",
-    "bun maska": "https://www.zepto.com/pn/bun-maska/pvid/606354e0-f4be-477e-a18e-6b54c474f51d",
-    "chicken puff": "https://www.zepto.com/pn/chicken-puff/pvid/de23bbb3-a07f-46f1-91a2-a8171b514a33",
-    "cheese maggi": "https://www.zepto.com/pn/cheese-maggi/pvid/b6a09671-d52a-440e-a4ac-7c9dda740a34",
-    "plain maggi": "https://www.zepto.com/pn/plain-maggi/pvid/ab252815-7562-465a-8abf-04ecc585c752",
-    "masala peanuts": "https://www.zepto.com/pn/masala-peanuts/pvid/36a9acbc-6e07-4261-9e74-d3770a1508cd",
-    "tiramisu": "https://www.zepto.com/pn/tiramisu/pvid/2d01c0d0-125f-42e3-980c-679859fc7d0d",
-    "chicken classic burger": "https://www.zepto.com/pn/chicken-classic-burger/pvid/f41c7bce-33c4-4cfa-9647-5f38c634ee57",
-    "vietnamese cold coffee": "https://www.zepto.com/pn/vietnamese-cold-coffee/pvid/6a09750b-2bb7-4d1b-90f9-cd2a66269bfd",
-    "butter croissant": "https://www.zepto.com/pn/butter-croissant/pvid/37732d9c-b578-461e-9bd2-54bdd92b74d9",
-    "garlic bread with cheese dip": "https://www.zepto.com/pn/garlic-bread-with-cheese-dip/pvid/5b265566-61a3-4660-9e76-5e40643fe81f",
-    "cappuccino": "https://www.zepto.com/pn/cappuccino/pvid/27fbad73-4154-406c-a864-80127d4f8642",
-    "latte": "https://www.zepto.com/pn/latte/pvid/88f6afb3-d80e-4e91-ba6f-e38c8a024713",
-    "hot chocolate": "https://www.zepto.com/pn/hot-chocolate/pvid/a00691fc-b863-43fd-96be-f1ea08ab194e",
-    "masala chai": "https://www.zepto.com/pn/masala-chai/pvid/7132f0c7-a233-4881-b310-ece3bb35ab9c",
-    "classic cold coffee": "https://www.zepto.com/pn/classic-cold-coffee/pvid/6ebe42de-266c-4639-ae7b-b8517ccd52b3",
-    "choco lava cake": "https://www.zepto.com/pn/choco-lava-cake/pvid/edf76459-7bbf-4ee6-9af4-507c7234368e",
-    "samosa 2 pieces": "https://www.zepto.com/pn/samosa-2-pieces/pvid/5d385a24-313a-43f8-90f0-dd20eede55a0",
-    "idli sambar dip": "https://www.zepto.com/pn/idli-sambar-dip/pvid/aa9a9c36-d6a1-42a5-8135-17d56ab8c7a5",
-    "medu vada sambar dip": "https://www.zepto.com/pn/medu-vada-sambar-dip/pvid/32f6f992-141d-449b-bcc0-4e0366e838da",
-    "chole kulche": "https://www.zepto.com/pn/chole-kulche/pvid/56a84353-e390-420b-a34b-c0d12c7aea5c",
-    "dal makhani rice": "https://www.zepto.com/pn/dal-makhani-rice/pvid/0e8c050f-7b7f-4308-92a5-5366f08fcfff",
-    "paneer makhani rice": "https://www.zepto.com/pn/paneer-makhani-rice/pvid/2019670e-219c-453a-88f8-35a7e7a90134",
-    "butter chicken rice": "https://www.zepto.com/pn/butter-chicken-rice/pvid/dbc1404e-c8c4-4198-9c49-513bdf5b7bd6",
-    "rajma masala rice": "https://www.zepto.com/pn/rajma-masala-rice/pvid/08abb94e-438d-4d42-b914-2130c3a9fcd8",
-    "chole rice": "https://www.zepto.com/pn/chole-rice/pvid/ea55f3d8-ae96-4b08-86e9-fa508805e637",
-}
 
 # ============================================================================
 # PYDANTIC MODELS
@@ -150,11 +123,40 @@ order_state = {
 # Global persistent browser - keep alive across requests
 persistent_browser = {
     "playwright": None,
+    "browser": None,  # Persistent context, or a regular browser if the launcher fell back
     "context": None,
     "page": None,
+    "handle": None,  # Launcher handle, used to measure this browser's RSS
     "initialized": False
 }
 
+# Shared launcher - remembers which launch strategy works on this host
+browser_launcher = BrowserLauncher()
+
+# Profile maintenance - runs at startup and whenever the recycler has the profile closed
+profile_janitor = ProfileJanitor(browser_launcher.profile_dir())
+
+# Relaunches the persistent browser between orders before it grows too big
+context_recycler = ContextRecycler(browser_launcher, janitor=profile_janitor)
+
+# Statuses in which no background flow is using the browser
+IDLE_STATUSES = ("idle", "completed", "error", "cancelled")
+
+# Keeps the saved login fresh; borrows the long-lived browser when it is open
+session_keeper = SessionKeeper(
+    browser_launcher,
+    get_context=lambda: persistent_browser["context"] if persistent_browser["initialized"] else None,
+    is_busy=lambda: order_state["status"] not in IDLE_STATUSES,
+)
+
+# Re-checks the stock of the most ordered products between orders, in the same browser
+stock_refresher = StockRefresher(
+    browser_launcher,
+    get_context=lambda: persistent_browser["context"] if persistent_browser["initialized"] else None,
+    is_busy=lambda: order_state["status"] not in IDLE_STATUSES,
+)
+PERSISTENT_LAUNCH_OPTIONS = {"headless": True, "args": ["--no-sandbox"]}
+
 async def get_browser_page():
     """Get or create a persistent browser page."""
     global persistent_browser
@@ -163,67 +165,100 @@ async def get_browser_page():
         try:
             # Test if page is still alive
             await persistent_browser["page"].title()
-            return persistent_browser["page"], persistent_browser["context"]
         except:
             # Page died, reinitialize
             persistent_browser["initialized"] = False
+        else:
+            # Between orders: relaunch if the context has served too many orders or grown too big
+            try:
+                handle = await context_recycler.maybe_recycle(
+                    persistent_browser["handle"], persistent_browser["playwright"], **PERSISTENT_LAUNCH_OPTIONS
+                )
+            except Exception:
+                # The old browser was closed before the relaunch failed - forget it and cold-launch below
+                _clear_persistent_handle()
+            else:
+                if handle is not persistent_browser["handle"]:
+                    _store_persistent_handle(handle)
+                return persistent_browser["page"], persistent_browser["context"]
 
     # Initialize browser
     if not persistent_browser["playwright"]:
         persistent_browser["playwright"] = await async_playwright().start()
 
     p = persistent_browser["playwright"]
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    user_data_dir = os.path.join(script_dir, "zepto_firefox_data")
 
-    # Clean up lock files
-    for f in ["lock", ".parentlock"]:
-        lock_path = os.path.join(user_data_dir, f)
-        if os.path.exists(lock_path):
-            try:
-                os.remove(lock_path)
-            except:
-                pass
-
-    # Create persistent context
-    context = await p.firefox.launch_persistent_context(
-        user_data_dir,
-        headless=True,
-        viewport={"width": 1280, "height": 720},
-        args=["--no-sandbox"]
-    )
-
-    page = context.pages[0] if context.pages else await context.new_page()
+    # Create persistent context (launcher falls back to other strategies if needed).
+    # Its ProfileLease clears lock files only when the browser that left them is dead.
+    handle = await browser_launcher.launch(p, **PERSISTENT_LAUNCH_OPTIONS)
+    _store_persistent_handle(handle)
+
+    return handle["page"], handle["context"]
+
+
+def resolve_order_items(items: List[OrderItem]) -> list[dict]:
+    """
+    Order items as {"pvid", "url", "qty"}, one per product. Names are
+    resolved in one batch; any misses are all reported in a single 400 with
+    their suggestions.
+    """
+    for item in items:
+        if not item.item_url and not item.product_name:
+            raise HTTPException(status_code=400, detail="Either product_name or item_url must be provided for every item")
+    results = iter(resolve_names([i.product_name for i in items if not i.item_url]))
+    resolved_items, unresolved = [], []
+    for item in items:
+        if item.item_url:
+            resolved_items.append({"url": item.item_url, "qty": item.quantity})
+            continue
+        result = next(results)
+        if result["resolved"]:
+            resolved_items.append({"url": result["url"], "qty": item.quantity})
+        else:
+            unresolved.append({"product_name": result["query"], "suggestions": result["suggestions"]})
+    if unresolved:
+        raise HTTPException(status_code=400, detail={
+            "message": f"Could not match {len(unresolved)} of {len(items)} item(s) to the catalog",
+            "unresolved": unresolved,
+        })
+    return merge_order_items(resolved_items)
+
+def consult_stock(urls: list[str], address: str) -> list[dict]:
+    """
+    Stock table entries (stale ones marked) saying these products were out of
+    stock at address. Stale or missing entries are queued for the stock
+    refresher, and the order joins the history that picks what it checks.
+    """
+    pvids = [product_key(url) for url in urls]
+    stock_refresher.note_order(urls, address)
+    stock_refresher.revalidate([pvid for pvid in pvids if stock_cache().needs_refresh(pvid, address)])
+    return stock_cache().likely_out_of_stock(pvids, address, allow_stale=True)
+
+async def record_visit(page, in_stock: bool) -> None:
+    """Store the open product page's price and stock for the delivery address it shows."""
+    pvid = parse_pvid(page.url)
+    if not pvid:
+        return
+    try:
+        info = await read_product_page(page)
+        stock_cache().record(pvid, info["address"], in_stock=in_stock, price=info["price"])
+    except Exception as e:
+        print(f"⚠️ Could not record product visit: {e}")
 
-    persistent_browser["context"] = context
-    persistent_browser["page"] = page
+def _store_persistent_handle(handle: dict) -> None:
+    persistent_browser["browser"] = handle["browser"]
+    persistent_browser["context"] = handle["context"]
+    persistent_browser["page"] = handle["page"]
+    persistent_browser["handle"] = handle
     persistent_browser["initialized"] = True
 
-    return page, context
 
-# ============================================================================
-# HELPER FUNCTIONS
-# ============================================================================
-
-def get_product_url(product_name: Optional[str] = None, item_url: Optional[str] = None) -> str:
-    """Get product URL from catalog by name or return direct URL."""
-    if item_url:
-        return item_url
-
-    if product_name:
-        key = product_name.lower().strip()
-        url = PRODUCT_CATALOG.get(key)
-
-        if not url:
-            # Try fuzzy matching
-            for catalog_name, catalog_url in PRODUCT_CATALOG.items():
-                if key in catalog_name or catalog_name in key:
-                    return catalog_url
-
-            raise ValueError(f"Product '{product_name}' not found in catalog")
-        return url
-
-    raise ValueError("Either product_name or item_url must be provided")
+def _clear_persistent_handle() -> None:
+    persistent_browser["browser"] = None
+    persistent_browser["context"] = None
+    persistent_browser["page"] = None
+    persistent_browser["handle"] = None
+    persistent_browser["initialized"] = False
 
 # ============================================================================
 # FASTAPI APP
@@ -233,7 +268,12 @@ def get_product_url(product_name: Optional[str] = None, item_url: Optional[str]
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     print("🚀 Zepto Cafe API Server starting...")
+    await profile_janitor.run_if_due()
+    session_keeper.start()
+    stock_refresher.start()
     yield
+    await session_keeper.stop()
+    await stock_refresher.stop()
     # Cleanup on shutdown
     print("🛑 Shutting down, cleaning up browser...")
     if order_state.get("context"):
@@ -290,12 +330,48 @@ async def get_screenshot(name: str):
 
     return FileResponse(path, media_type="image/png")
 
+@app.get("/launcher")
+async def get_launcher_stats():
+    """Browser launch strategy preferences and timings learned on this host."""
+    return browser_launcher.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Memory of the long-lived browser, orders served and context recycle events."""
+    return {
+        "browser_initialized": persistent_browser["initialized"],
+        **context_recycler.stats(persistent_browser["handle"]),
+    }
+
+@app.get("/profile")
+async def get_profile_report():
+    """Profile size, last maintenance run and size/launch-time history."""
+    return profile_janitor.report()
+
+@app.get("/session")
+async def get_session_status():
+    """Whether the saved login is alive, when it is predicted to expire and the last keep-alive run."""
+    return session_keeper.status()
+
+@app.get("/stock")
+async def get_stock_refresh_status():
+    """Products the background stock refresh keeps checked, and what its last pass found."""
+    return stock_refresher.status()
+
 @app.get("/catalog", response_model=CatalogResponse)
 async def get_catalog():
     """Get list of available products."""
-    products = list(PRODUCT_CATALOG.keys())
+    products = catalog_names()
     return CatalogResponse(products=products, count=len(products))
 
+@app.get("/catalog/{pvid}")
+async def get_catalog_product(pvid: str):
+    """Catalog record of a product plus its last seen price and stock per delivery address."""
+    info = product_info(pvid)
+    if not info:
+        raise HTTPException(status_code=404, detail=f"Unknown product: {pvid}")
+    return info
+
 @app.get("/status", response_model=OrderStatus)
 async def get_status():
     """Get current order status."""
@@ -343,7 +419,8 @@ async def start_order(request: SingleOrderRequest, background_tasks: BackgroundT
     return {
         "message": "Order started",
         "status": "starting",
-        "product_url": item_url
+        "product_url": item_url,
+        "stock_warnings": consult_stock([item_url], address)
     }
 
 @app.post("/order/multi")
@@ -361,13 +438,7 @@ async def start_multi_order(request: MultiOrderRequest, background_tasks: Backgr
         raise HTTPException(status_code=400, detail="No items provided")
 
     # Resolve all items to URLs
-    resolved_items = []
-    for item in request.items:
-        try:
-            url = get_product_url(item.product_name, item.item_url)
-            resolved_items.append({"url": url, "qty": item.quantity})
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid item: {e}")
+    resolved_items = resolve_order_items(request.items)
 
     phone = request.phone_number or DEFAULT_PHONE
     address = request.address or DEFAULT_ADDRESS
@@ -387,7 +458,8 @@ async def start_multi_order(request: MultiOrderRequest, background_tasks: Backgr
     return {
         "message": "Multi-item order started",
         "status": "starting",
-        "items_count": len(resolved_items)
+        "items_count": len(resolved_items),
+        "stock_warnings": consult_stock([item["url"] for item in resolved_items], address)
     }
 
 class LoginRequest(BaseModel):
@@ -490,12 +562,10 @@ async def handle_stock_decision(request: StockDecisionRequest):
             detail=f"Not waiting for stock decision. Current status: {order_state['status']}"
         )
 
+    replacement_items = resolve_order_items(request.replacement_items) if request.replacement_items else None
     order_state["stock_decision"] = request.decision
-    if request.replacement_items:
-        order_state["replacement_items"] = [
-            {"url": get_product_url(i.product_name, i.item_url), "qty": i.quantity}
-            for i in request.replacement_items
-        ]
+    if replacement_items:
+        order_state["replacement_items"] = replacement_items
     order_state["status"] = "processing_stock_decision"
 
     return {"message": f"Stock decision '{request.decision}' submitted", "status": "processing"}
@@ -531,7 +601,7 @@ async def run_login_flow(phone: str):
         print(f"Screenshot saved to {screenshot_path}")
 
         # Find and click login button
-        login_btn = await page.query_selector("span[data-testid='login-btn']")
+        login_btn = await page.query_selector(sel("login_button"))
         if not login_btn:
             login_btn = await page.query_selector("button:has-text('Login')")
         if not login_btn:
@@ -644,6 +714,9 @@ async def run_login_flow(phone: str):
         order_state["last_message"] = f"Login error: {str(e)}"
         print(f"Login error: {e}")
         # DON'T close browser on error either
+    finally:
+        # Login pages count towards the recycle limit too
+        context_recycler.order_finished()
 
 async def run_single_order(item_url: str, phone: str, address: str):
     """Run single order in background - calls the MCP server logic."""
@@ -657,25 +730,10 @@ async def run_single_order(item_url: str, phone: str, address: str):
         order_state["status"] = "launching_browser"
         order_state["last_message"] = "Launching browser..."
 
-        # Launch browser
-        p = await async_playwright().start()
-        order_state["playwright"] = p
-
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        user_data_dir = os.path.join(script_dir, "zepto_firefox_data")
-
-        # Launch Firefox with persistent context
-        # Use headed mode with Xvfb for better compatibility
-        context = await p.firefox.launch_persistent_context(
-            user_data_dir,
-            headless=False,  # Use headed mode - Railway has display support
-            viewport={"width": 1280, "height": 720},
-            args=["--no-sandbox"],
-            slow_mo=100  # Slow down for stability
-        )
+        # Use persistent browser (same one used for login), so it is recycled like multi-item orders.
+        # A second, headed launch of the same profile would wait on the ProfileLease this one holds.
+        page, context = await get_browser_page()
         order_state["context"] = context
-
-        page = context.pages[0] if context.pages else await context.new_page()
         order_state["page"] = page
 
         # Navigate to product
@@ -688,7 +746,7 @@ async def run_single_order(item_url: str, phone: str, address: str):
         await asyncio.sleep(1)
 
         # Check for login button
-        login_btn = await page.query_selector("span[data-testid='login-btn']")
+        login_btn = await page.query_selector(sel("login_button"))
         if login_btn and await login_btn.is_visible():
             # Need to login
             order_state["status"] = "waiting_for_login_otp"
@@ -736,7 +794,7 @@ async def run_single_order(item_url: str, phone: str, address: str):
         order_state["status"] = "checkout"
         order_state["last_message"] = "Proceeding to checkout..."
 
-        cart_btn = await page.query_selector("button[data-testid='cart-btn']")
+        cart_btn = await page.query_selector(sel("cart_button"))
         if cart_btn:
             await cart_btn.click()
             await asyncio.sleep(1)
@@ -775,6 +833,8 @@ async def run_single_order(item_url: str, phone: str, address: str):
         order_state["status"] = "error"
         order_state["last_message"] = f"Error: {str(e)}"
         print(f"Order error: {e}")
+    finally:
+        context_recycler.order_finished()
 
 async def run_multi_order(items: list, phone: str, address: str):
     """Run multi-item order in background."""
@@ -805,7 +865,7 @@ async def run_multi_order(items: list, phone: str, address: str):
         await asyncio.sleep(2)
 
         # Try to find login button with multiple selectors
-        login_btn = await page.query_selector("span[data-testid='login-btn']")
+        login_btn = await page.query_selector(sel("login_button"))
         if not login_btn:
             login_btn = await page.query_selector("button:has-text('Login')")
         if not login_btn:
@@ -816,7 +876,7 @@ async def run_multi_order(items: list, phone: str, address: str):
             login_btn = await page.query_selector("div:has-text('Login'):not(:has(div))")
 
         # Check if cart button exists (means logged in)
-        cart_btn_check = await page.query_selector("button[data-testid='cart-btn']")
+        cart_btn_check = await page.query_selector(sel("cart_button"))
 
         # Also check for user profile/account indicator
         profile_btn = await page.query_selector("[data-testid='profile-btn']")
@@ -912,19 +972,29 @@ async def run_multi_order(items: list, phone: str, address: str):
             order_state["status"] = "adding_to_cart"
             order_state["last_message"] = f"Adding item {i+1}/{len(items)}..."
 
+            # A fresh "out of stock" in the stock table saves the page load
+            cached = stock_cache().get(product_key(item["url"]), address)
+            if cached and cached["in_stock"] is False:
+                print(f"Item {i+1} is OUT OF STOCK (stock table: {stock_cache().describe(cached)})")
+                out_of_stock.append(item["url"])
+                continue
+
             # Always navigate to item URL (even first one - we need to be on product page)
             print(f"Navigating to item {i+1}: {item['url']}")
             await page.goto(item["url"], wait_until="domcontentloaded")
 
             # Wait for Add To Cart or Notify Me button to appear
             try:
-                await page.wait_for_selector("button.WJXJe:has-text('Add To Cart'), button[aria-label='Notify Me']", timeout=5000)
+                await page.wait_for_selector(sel("add_or_notify"), timeout=5000)
             except:
                 print(f"Waiting longer for buttons to load...")
                 await asyncio.sleep(3)
 
             # Check stock
-            notify_btn = await page.query_selector("button[aria-label='Notify Me']")
+            notify_btn = await page.query_selector(sel("notify_me"))
+            # Only what the page shows is recorded: neither button means the stock is unknown
+            in_stock = False if notify_btn else True if await page.query_selector(sel("add_to_cart_any")) else None
+            await record_visit(page, in_stock=in_stock)
             if notify_btn:
                 print(f"Item {i+1} is OUT OF STOCK")
                 out_of_stock.append(item["url"])
@@ -945,7 +1015,7 @@ async def run_multi_order(items: list, phone: str, address: str):
                 successfully_added.append(item["url"])
             else:
                 # Item not in cart - look for Add To Cart button
-                add_btn = await page.query_selector("button.WJXJe:has-text('Add To Cart')")
+                add_btn = await page.query_selector(sel("add_to_cart"))
                 if not add_btn:
                     add_btn = await page.query_selector("button:has-text('Add To Cart')")
                 if not add_btn:
@@ -984,7 +1054,7 @@ async def run_multi_order(items: list, phone: str, address: str):
         order_state["last_message"] = "Proceeding to checkout..."
 
         # Click cart button
-        cart_btn = await page.query_selector("button[data-testid='cart-btn']")
+        cart_btn = await page.query_selector(sel("cart_button"))
         if cart_btn:
             try:
                 await cart_btn.click(force=True, timeout=5000)
@@ -1129,6 +1199,8 @@ async def run_multi_order(items: list, phone: str, address: str):
         order_state["status"] = "error"
         order_state["last_message"] = f"Error: {str(e)}"
         print(f"Multi-order error: {e}")
+    finally:
+        context_recycler.order_finished()
 
 # ============================================================================
 # MAIN
@@ -0,0 +1,988 @@
+"""
+Shared browser setup for the Zepto MCP server and the REST API server.
+
+Holds the device-emulation profiles (desktop vs mobile web), the selector map
+for each DOM variant, a helper for reading the RSS of the browser process
+tree so benchmarks and long-running servers can see how much memory a context
+is holding, the BrowserLauncher both servers use to start a browser, the
+BrowserWatchdog that replaces a browser that dies mid-order, and the
+ContextRecycler that relaunches a long-lived context before it grows too big.
+
+Configuration (environment variables):
+- ZEPTO_DEVICE_MODE: "desktop" (default) or "mobile"
+- ZEPTO_BROWSER_ENGINE: "firefox", "chromium" or "webkit" to try that engine
+  first (default: Firefox persistent, then Chromium, then plain Firefox)
+- ZEPTO_HOT_SPARE: "1" to keep a warm spare browser for crash recovery
+- ZEPTO_RECYCLE_AFTER_ORDERS / ZEPTO_RECYCLE_RSS_MB: relaunch a long-lived
+  context after this many orders / above this RSS (0 disables)
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import time
+
+from zepto_profile import ProfileJanitor, ProfileLease
+from zepto_util import env_float, print
+
+
+# ============================================================================
+# DEVICE EMULATION
+# ============================================================================
+
+DEFAULT_DEVICE_MODE = "desktop"
+
+# Mobile user agents per engine. Zepto decides between the desktop and the
+# mobile-web bundle from the UA and viewport, so the UA has to look like a
+# phone build of the engine that is actually running.
+MOBILE_USER_AGENTS = {
+    "firefox": "Mozilla/5.0 (Android 14; Mobile; rv:128.0) Gecko/128.0 Firefox/128.0",
+    "chromium": (
+        "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36"
+    ),
+    "webkit": (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1"
+    ),
+}
+
+DEVICE_PROFILES = {
+    "desktop": {
+        "viewport": {"width": 1280, "height": 720},
+    },
+    "mobile": {
+        "viewport": {"width": 390, "height": 844},
+        "device_scale_factor": 3,
+        "is_mobile": True,
+        "has_touch": True,
+    },
+}
+
+
+# Modes whose selector map has not been checked against the live site yet
+EXPERIMENTAL_DEVICE_MODES = ("mobile",)
+_warned_modes = set()
+
+
+def get_device_mode(mode: str = None) -> str:
+    """Return the active device mode ("desktop" or "mobile")."""
+    mode = (mode or os.getenv("ZEPTO_DEVICE_MODE") or DEFAULT_DEVICE_MODE).strip().lower()
+    if mode not in DEVICE_PROFILES:
+        print(f"⚠️ Unknown ZEPTO_DEVICE_MODE '{mode}', falling back to {DEFAULT_DEVICE_MODE}")
+        return DEFAULT_DEVICE_MODE
+    if mode in EXPERIMENTAL_DEVICE_MODES and mode not in _warned_modes:
+        _warned_modes.add(mode)
+        print(f"⚠️ Device mode '{mode}' is experimental: its selectors have not been checked against the "
+              f"live mobile site (run bench_device_modes.py and look for failed steps)")
+    return mode
+
+
+def context_options(mode: str = None, engine: str = "firefox") -> dict:
+    """
+    Keyword arguments for launch_persistent_context()/new_context() that
+    apply the requested device profile on the given engine.
+
+    Firefox does not support Playwright's `is_mobile` flag, so it only gets
+    the viewport, touch and UA parts of the mobile profile.
+    """
+    mode = get_device_mode(mode)
+    options = dict(DEVICE_PROFILES[mode])
+    if mode == "mobile":
+        options["user_agent"] = MOBILE_USER_AGENTS.get(engine, MOBILE_USER_AGENTS["chromium"])
+        if engine == "firefox":
+            options.pop("is_mobile", None)
+    return options
+
+
+# ============================================================================
+# SELECTOR MAP
+# ============================================================================
+
+# The desktop selectors are the ones the servers have always used. The mobile
+# bundle drops most of the hashed utility classes (WJXJe, c4ZmYS, __6RuoF...),
+# so the mobile map leans on data-testid, aria-label and visible text instead.
+# The mobile map is experimental: it was written from the desktop one and has
+# not been checked against the live mobile DOM (see EXPERIMENTAL_DEVICE_MODES).
+SELECTORS = {
+    "desktop": {
+        "login_button": "span[data-testid='login-btn']",
+        "cart_button": "button[data-testid='cart-btn']",
+        "cart_badge": "span[data-testid='cart-items-number']",
+        "cart_line_item": "div.__6RuoF",
+        "cart_item_qty": "p[data-testid='undefined-cart-qty']",
+        "cart_item_add": "button[aria-label='Add'], button[aria-label*='Increase' i]",
+        "cart_item_remove": "button[aria-label='Remove']",
+        "cart_loaded": "div.__6RuoF, span:has-text('Your cart is empty')",
+        "add_to_cart": "button.WJXJe:has-text('Add To Cart')",
+        "add_to_cart_any": "button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart')",
+        "add_or_notify": "button.WJXJe:has-text('Add To Cart'), button[aria-label='Notify Me']",
+        "notify_me": "button[aria-label='Notify Me']",
+        "address_header": "h3[data-testid='user-address']",
+        "address_modal": "div[data-testid='address-modal'], div[data-testid='saved-address-container']",
+        "address_item": "div.c4ZmYS:has-text('{label}')",
+        "place_order": "button.bg-skin-primary:has-text('Place Order')",
+        "checkout_ready": "button:has-text('Place Order'), button:has-text('Click to Pay')",
+        "click_to_pay": "button:has-text('Click to Pay')",
+        "pay_on_delivery": "div[testid='nvb_cod']",
+        "proceed_to_pay": "div:has-text('Proceed to Pay')",
+    },
+    "mobile": {
+        "login_button": "span[data-testid='login-btn'], button:has-text('Login')",
+        "cart_button": "button[data-testid='cart-btn'], a[href*='/cart'], button[aria-label*='cart' i]",
+        "cart_badge": "span[data-testid='cart-items-number']",
+        "cart_line_item": "div.__6RuoF, div[data-testid='cart-item']",
+        "cart_item_qty": "p[data-testid='undefined-cart-qty'], [data-testid*='cart-qty']",
+        "cart_item_add": "button[aria-label='Add'], button[aria-label*='Increase' i], button:text-is('+')",
+        "cart_item_remove": "button[aria-label='Remove'], button[aria-label*='Decrease' i], button:text-is('-')",
+        "cart_loaded": "div.__6RuoF, div[data-testid='cart-item'], span:has-text('Your cart is empty')",
+        "add_to_cart": "button:has-text('Add To Cart'), button[aria-label='Add to Cart'], button:text-is('ADD')",
+        "add_to_cart_any": "button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart'), button:text-is('ADD')",
+        "add_or_notify": "button:has-text('Add To Cart'), button:text-is('ADD'), button[aria-label='Notify Me']",
+        "notify_me": "button[aria-label='Notify Me'], button:has-text('Notify Me')",
+        "address_header": "[data-testid='user-address'], button[aria-label*='address' i]",
+        "address_modal": "div[data-testid='address-modal'], div[data-testid='saved-address-container'], div[role='dialog']",
+        "address_item": "div[data-testid='saved-address-container'] :text('{label}'), div[role='dialog'] :text('{label}')",
+        "place_order": "button:has-text('Place Order')",
+        "checkout_ready": "button:has-text('Place Order'), button:has-text('Click to Pay')",
+        "click_to_pay": "button:has-text('Click to Pay')",
+        "pay_on_delivery": "div[testid='nvb_cod'], div:has-text('Pay on Delivery'):not(:has(div))",
+        "proceed_to_pay": "div:has-text('Proceed to Pay'), button:has-text('Proceed to Pay')",
+    },
+}
+
+
+def sel(key: str, mode: str = None, **fmt) -> str:
+    """
+    Look up a selector for the active device mode.
+
+    Template selectors (e.g. "address_item") are filled from keyword args:
+        sel("address_item", label="Hsr Home")
+    """
+    selector = SELECTORS[get_device_mode(mode)][key]
+    return selector.format(**fmt) if fmt else selector
+
+
+# ============================================================================
+# PROCESS MEMORY
+# ============================================================================
+
+# Everything below the Playwright driver is browser (Firefox content processes
+# show up as "Web Content", "Isolated Web Co", "RDD Process"...), so count the
+# whole tree except the Node driver itself.
+DRIVER_PROCESS_NAMES = ("node",)
+
+
+def _list_processes() -> list[tuple[int, int, int, str]]:
+    """Return (pid, ppid, rss_kb, name) for every visible process."""
+    processes = []
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/status") as f:
+                    fields = dict(
+                        line.split(":", 1) for line in f.read().splitlines() if ":" in line
+                    )
+                rss_kb = int(fields.get("VmRSS", "0 kB").split()[0])
+                processes.append((int(entry), int(fields["PPid"].strip()), rss_kb, fields["Name"].strip()))
+            except (OSError, KeyError, ValueError):
+                continue
+        return processes
+
+    # macOS / BSD: no /proc, fall back to ps
+    try:
+        output = subprocess.run(
+            ["ps", "-A", "-o", "pid=,ppid=,rss=,comm="],
+            capture_output=True, text=True, timeout=5,
+        ).stdout
+    except Exception:
+        return processes
+    for line in output.splitlines():
+        parts = line.split(None, 3)
+        if len(parts) == 4 and parts[0].isdigit():
+            processes.append((int(parts[0]), int(parts[1]), int(parts[2]), os.path.basename(parts[3])))
+    return processes
+
+
+def browser_rss_mb(root_pid: int = None) -> float:
+    """
+    Resident memory (MB) of every browser process descended from root_pid
+    (defaults to this Python process). Returns 0.0 when it cannot be measured.
+    """
+    root_pid = root_pid or os.getpid()
+    processes = _list_processes()
+    children: dict[int, list] = {}
+    for pid, ppid, rss_kb, name in processes:
+        children.setdefault(ppid, []).append((pid, rss_kb, name))
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        for pid, rss_kb, name in children.get(stack.pop(), []):
+            if name.lower() not in DRIVER_PROCESS_NAMES:
+                total_kb += rss_kb
+            stack.append(pid)
+    return round(total_kb / 1024, 1)
+
+
+def browser_pids(root_pid: int = None) -> set[int]:
+    """PIDs of every browser process descended from root_pid (defaults to this Python process)."""
+    root_pid = root_pid or os.getpid()
+    children: dict[int, list] = {}
+    for pid, ppid, _, name in _list_processes():
+        children.setdefault(ppid, []).append((pid, name))
+
+    pids = set()
+    stack = [root_pid]
+    while stack:
+        for pid, name in children.get(stack.pop(), []):
+            if name.lower() not in DRIVER_PROCESS_NAMES:
+                pids.add(pid)
+            stack.append(pid)
+    return pids
+
+
+def spawned_root_pids(pids_before: set[int]) -> list[int]:
+    """Top-level browser processes that appeared since browser_pids() returned pids_before."""
+    parents = {pid: ppid for pid, ppid, _, _ in _list_processes()}
+    new_pids = browser_pids() - pids_before
+    return sorted(pid for pid in new_pids if parents.get(pid) not in new_pids)
+
+
+def process_tree_rss_mb(root_pids) -> float:
+    """Resident memory (MB) of the given processes and everything they spawned."""
+    processes = _list_processes()
+    rss = {pid: rss_kb for pid, _, rss_kb, _ in processes}
+    children: dict[int, list] = {}
+    for pid, ppid, _, _ in processes:
+        children.setdefault(ppid, []).append(pid)
+
+    total_kb = 0
+    seen = set()
+    stack = [pid for pid in root_pids if pid in rss]
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total_kb += rss[pid]
+        stack.extend(children.get(pid, []))
+    return round(total_kb / 1024, 1)
+
+
+# ============================================================================
+# BROWSER LAUNCHER
+# ============================================================================
+
+# Launch strategies are "<engine>" (plain browser, no saved session) or
+# "<engine>_persistent" (persistent profile, keeps the login).
+DEFAULT_LAUNCH_STRATEGIES = ["firefox_persistent", "chromium", "firefox"]
+
+SUPPORTED_ENGINES = ("firefox", "chromium", "webkit")
+
+PROFILE_DIRS = {
+    "firefox": "zepto_firefox_data",
+    "chromium": "zepto_chromium_data",
+    "webkit": "zepto_webkit_data",
+}
+
+LAUNCHER_STATE_FILE = ".zepto_launcher.json"
+
+# A strategy that has worked on this host gets the full timeout; one that has
+# never worked only gets a short probe so a hang can't eat 30s every order.
+LAUNCH_TIMEOUT = 30.0
+UNPROVEN_LAUNCH_TIMEOUT = 12.0
+
+# After this many failures in a row a strategy is skipped until the cooldown
+# expires (unless every strategy is cooling down).
+MAX_CONSECUTIVE_FAILURES = 2
+FAILURE_COOLDOWN_SECONDS = 6 * 3600
+
+LAUNCH_HISTORY_SIZE = 20
+
+
+def get_browser_engine() -> str:
+    """Engine chosen via ZEPTO_BROWSER_ENGINE, or None to use the default strategy order."""
+    engine = (os.getenv("ZEPTO_BROWSER_ENGINE") or "").strip().lower()
+    if not engine:
+        return None
+    if engine not in SUPPORTED_ENGINES:
+        print(f"⚠️ Unknown ZEPTO_BROWSER_ENGINE '{engine}', using default launch order")
+        return None
+    return engine
+
+
+def default_launch_strategies(engine: str = None) -> list[str]:
+    """
+    Strategy order for a configured engine: its persistent profile, then the
+    plain browser, then the usual fallbacks.
+    """
+    if not engine:
+        return list(DEFAULT_LAUNCH_STRATEGIES)
+    preferred = [f"{engine}_persistent", engine]
+    return preferred + [s for s in DEFAULT_LAUNCH_STRATEGIES if s not in preferred]
+
+
+def _parse_strategy(name: str) -> tuple[str, bool]:
+    engine, _, kind = name.partition("_")
+    return engine, kind == "persistent"
+
+
+async def _close_quietly(target) -> None:
+    try:
+        await target.close()
+    except Exception:
+        pass
+
+
+def _close_late_launch(launching: asyncio.Future, then=None) -> None:
+    """
+    Close the browser (or persistent context) of a launch we stopped waiting
+    for as soon as it arrives, then call then() (e.g. to release the profile
+    lease). then() runs right away if the launch fails instead.
+    """
+    async def close(opened):
+        await _close_quietly(opened)
+        if then:
+            then()
+
+    def done(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            asyncio.ensure_future(close(future.result()))
+        elif then:
+            then()
+
+    launching.add_done_callback(done)
+
+
+class BrowserLauncher:
+    """
+    Launches the browser for both servers and remembers which strategy works
+    on this host.
+
+    The outcome and duration of every attempt is written to
+    .zepto_launcher.json next to the scripts, so the next launch (in either
+    server, or after a restart) tries the last successful strategy first and
+    skips strategies that keep failing.
+    """
+
+    def __init__(self, base_dir: str = None, strategies: list[str] = None, state_path: str = None,
+                 engine: str = None):
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.engine = engine or get_browser_engine()
+        self.strategies = strategies or default_launch_strategies(self.engine)
+        self.state_path = state_path or os.path.join(self.base_dir, LAUNCHER_STATE_FILE)
+        self.state = self._load_state()
+        self.history: list[dict] = []
+
+    def profile_dir(self, engine: str = None) -> str:
+        """Persistent profile directory for an engine (default: the configured one, else Firefox)."""
+        return os.path.join(self.base_dir, PROFILE_DIRS[engine or self.engine or "firefox"])
+
+    # ------------------------------------------------------------------ state
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if isinstance(state, dict):
+                state.setdefault("strategies", {})
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"preferred": None, "strategies": {}}
+
+    def _save_state(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"⚠️ Could not save launcher state: {e}")
+
+    def _record(self, name: str, ok: bool, elapsed: float, error: str = None) -> None:
+        entry = self.state["strategies"].setdefault(name, {
+            "successes": 0, "failures": 0, "consecutive_failures": 0,
+            "last_success": None, "last_failure": None,
+            "last_launch_s": None, "avg_launch_s": None, "last_error": None,
+        })
+        now = time.time()
+        if ok:
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["last_success"] = now
+            entry["last_launch_s"] = round(elapsed, 2)
+            prev = entry["avg_launch_s"]
+            entry["avg_launch_s"] = round(elapsed if prev is None else 0.7 * prev + 0.3 * elapsed, 2)
+            self.state["preferred"] = name
+        else:
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            entry["last_failure"] = now
+            entry["last_error"] = (error or "")[:300]
+        self.history.append({
+            "strategy": name, "ok": ok, "seconds": round(elapsed, 2), "at": now,
+            **({} if ok else {"error": (error or "")[:300]}),
+        })
+        del self.history[:-LAUNCH_HISTORY_SIZE]
+        self._save_state()
+
+    # --------------------------------------------------------------- ordering
+
+    def _cooling_down(self, name: str) -> bool:
+        entry = self.state["strategies"].get(name)
+        if not entry or entry["consecutive_failures"] < MAX_CONSECUTIVE_FAILURES:
+            return False
+        return time.time() - (entry["last_failure"] or 0) < FAILURE_COOLDOWN_SECONDS
+
+    def ordered_strategies(self) -> list[str]:
+        """Strategies in the order they will be tried: last success first, cooling-down ones dropped."""
+        preferred = self.state.get("preferred")
+        if self.engine and preferred and _parse_strategy(preferred)[0] != self.engine:
+            # An explicitly configured engine beats what was learned for another one
+            preferred = None
+        ordered = sorted(self.strategies, key=lambda s: (s != preferred, self.strategies.index(s)))
+        available = [s for s in ordered if not self._cooling_down(s)]
+        return available or ordered
+
+    def _timeout_for(self, name: str) -> float:
+        entry = self.state["strategies"].get(name)
+        if entry and entry["successes"] and entry["avg_launch_s"]:
+            return min(LAUNCH_TIMEOUT, max(UNPROVEN_LAUNCH_TIMEOUT, 4 * entry["avg_launch_s"]))
+        return UNPROVEN_LAUNCH_TIMEOUT
+
+    # ----------------------------------------------------------------- launch
+
+    async def _launch_one(self, playwright, name: str, headless: bool, args: list, slow_mo: float, mode: str,
+                          pending: list) -> dict:
+        """
+        One launch attempt. Whatever it opened is closed again if a later
+        step fails or the attempt is cancelled (the launch timeout). A
+        launch still in flight when that happens is appended to pending, so
+        the caller can close it when it arrives.
+        """
+        engine, persistent = _parse_strategy(name)
+        browser_type = getattr(playwright, engine)
+        launch_kwargs = {"headless": headless}
+        if args:
+            launch_kwargs["args"] = args
+        if slow_mo:
+            launch_kwargs["slow_mo"] = slow_mo
+
+        user_data_dir = None
+        if persistent:
+            user_data_dir = self.profile_dir(engine)
+            os.makedirs(user_data_dir, exist_ok=True)
+            launching = asyncio.ensure_future(browser_type.launch_persistent_context(
+                user_data_dir=user_data_dir,
+                **launch_kwargs,
+                **context_options(mode, engine),
+            ))
+        else:
+            launching = asyncio.ensure_future(browser_type.launch(**launch_kwargs))
+        try:
+            # Shielded, so a timeout doesn't lose track of a browser that is still starting
+            opened = await asyncio.shield(launching)
+        except asyncio.CancelledError:
+            pending.append(launching)
+            raise
+
+        try:
+            if persistent:
+                context = opened
+                page = context.pages[0] if context.pages else await context.new_page()
+            else:
+                context = await opened.new_context(**context_options(mode, engine))
+                page = await context.new_page()
+        except BaseException:
+            await _close_quietly(opened)
+            raise
+        return {"strategy": name, "engine": engine, "persistent": persistent, "user_data_dir": user_data_dir,
+                "browser": opened, "context": context, "page": page}
+
+    async def launch(self, playwright, headless: bool = False, args: list = None,
+                     slow_mo: float = None, mode: str = None) -> dict:
+        """
+        Launch a browser, trying strategies in learned order.
+
+        Returns a dict with: strategy, engine, persistent, user_data_dir,
+        browser (what to close), context, page, launch_s and pids (root
+        processes of this browser, for handle_rss_mb()).
+
+        Persistent strategies first take the profile's ProfileLease, which is
+        released when the context closes. A profile held by another live
+        process raises ProfileBusyError rather than falling back to a
+        browser without the saved session. A failed or timed-out attempt
+        closes whatever it started before the lease is given back, so the
+        next strategy (or order) waits for the lease instead of finding the
+        profile locked by a half-started browser.
+        """
+        errors = []
+        for name in self.ordered_strategies():
+            engine, persistent = _parse_strategy(name)
+            lease = None
+            if persistent:
+                # Waiting for the profile doesn't count against the launch timeout
+                lease = await ProfileLease(self.profile_dir(engine)).acquire_async()
+
+            timeout = self._timeout_for(name)
+            print(f"🚀 Launching browser ({name}, timeout {timeout:.0f}s)...")
+            start = time.perf_counter()
+            pids_before = browser_pids()
+            pending = []
+            try:
+                handle = await asyncio.wait_for(
+                    self._launch_one(playwright, name, headless, args, slow_mo, mode, pending),
+                    timeout=timeout,
+                )
+            except BaseException as e:
+                release = lease.release if lease else None
+                if pending:
+                    # The browser may still come up: close it when it does, and only then free the profile
+                    _close_late_launch(pending[0], then=release)
+                elif release:
+                    release()
+                if not isinstance(e, Exception):
+                    raise
+                elapsed = time.perf_counter() - start
+                error = str(e) or type(e).__name__
+                print(f"⚠️ Launch strategy {name} failed after {elapsed:.1f}s: {error.splitlines()[0] if error else ''}")
+                self._record(name, ok=False, elapsed=elapsed, error=error)
+                errors.append(f"{name}: {error.splitlines()[0] if error else ''}")
+                continue
+
+            elapsed = time.perf_counter() - start
+            self._record(name, ok=True, elapsed=elapsed)
+            handle["launch_s"] = round(elapsed, 2)
+            # Processes this launch started (their children come later), so its RSS
+            # can be told apart from other browsers this server has open
+            handle["pids"] = spawned_root_pids(pids_before)
+            handle["lease"] = lease
+            if lease:
+                handle["context"].on("close", lambda *_: lease.release())
+                ProfileJanitor(handle["user_data_dir"]).record_launch(elapsed)
+            print(f"✅ Browser ready via {name} in {elapsed:.1f}s")
+            return handle
+
+        raise Exception(
+            "All browser launch strategies failed:\n" + "\n".join(f"- {e}" for e in errors) +
+            "\n\nTroubleshooting:\n1. Close ALL browser windows\n2. Restart your machine\n"
+            "3. Reinstall Playwright: python3 -m playwright install chromium firefox\n"
+            "4. Delete .zepto_launcher.json to forget learned launch preferences"
+        )
+
+    def stats(self) -> dict:
+        """Learned preferences, per-strategy counters/timings and recent launches."""
+        return {
+            "engine": self.engine,
+            "preferred": self.state.get("preferred"),
+            "order": self.ordered_strategies(),
+            "strategies": self.state["strategies"],
+            "recent": list(self.history),
+        }
+
+
+# ============================================================================
+# CRASH WATCHDOG
+# ============================================================================
+
+# Errors Playwright raises once the page, context or browser process is gone
+_BROWSER_GONE_MARKERS = (
+    "target closed",
+    "has been closed",
+    "browser closed",
+    "connection closed",
+    "page crashed",
+)
+
+RECOVERY_HISTORY_SIZE = 10
+
+
+def hot_spare_enabled() -> bool:
+    """ZEPTO_HOT_SPARE=1 keeps a second, session-cloned browser warm for crash recovery."""
+    return os.getenv("ZEPTO_HOT_SPARE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def is_browser_gone(error: Exception) -> bool:
+    """True if a Playwright error means the page/context/browser died rather than a selector failing."""
+    text = str(error).lower()
+    return any(marker in text for marker in _BROWSER_GONE_MARKERS)
+
+
+async def read_product_page(page) -> dict:
+    """
+    Delivery address (header text) and selling price of the open product
+    page, for the stock cache. Either is None if it can't be read.
+    """
+    try:
+        header = await page.query_selector(sel("address_header"))  # No waiting: this runs on the order path
+        address = ((await header.inner_text()).strip() or None) if header else None
+    except Exception:
+        address = None
+    try:
+        price = await page.evaluate("""
+            () => {
+                const title = document.querySelector('h1');
+                const leaves = Array.from(document.querySelectorAll('span, p, h4, div')).filter(el => el.children.length === 0);
+                for (const el of leaves) {
+                    const text = (el.textContent || '').trim();
+                    if (!/^₹\\s*[\\d,]+(\\.\\d+)?$/.test(text)) continue;
+                    // The selling price follows the title; a struck-through amount is the MRP
+                    if (title && !(title.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING)) continue;
+                    if (getComputedStyle(el).textDecorationLine.includes('line-through')) continue;
+                    return parseFloat(text.replace(/[^\\d.]/g, ''));
+                }
+                return null;
+            }
+        """)
+    except Exception:
+        price = None
+    return {"address": address, "price": price}
+
+
+async def apply_storage_state(context, state: dict) -> None:
+    """
+    Copy a storage_state() snapshot into a running context: cookies directly,
+    localStorage through an init script that runs once per tab and origin.
+    """
+    if state.get("cookies"):
+        await context.add_cookies(state["cookies"])
+    for origin in state.get("origins", []):
+        items = {item["name"]: item["value"] for item in origin.get("localStorage", [])}
+        if not items:
+            continue
+        await context.add_init_script(
+            f"if (location.origin === {json.dumps(origin['origin'])} && !sessionStorage.getItem('__zepto_restored')) {{"
+            f" const items = {json.dumps(items)};"
+            f" for (const key in items) localStorage.setItem(key, items[key]);"
+            f" sessionStorage.setItem('__zepto_restored', '1'); }}"
+        )
+
+
+class BrowserWatchdog:
+    """
+    Notices when the order browser dies and swaps in a replacement.
+
+    attach() listens for the page crashing and the context/browser closing;
+    a close announced with expect_close() is not a crash. With
+    ZEPTO_HOT_SPARE enabled a second headless browser of the same engine is
+    kept warm with a copy of the session (cookies + localStorage, refreshed
+    at every checkpoint()), so recovery is a context swap instead of a cold
+    launch of the persistent profile.
+    """
+
+    def __init__(self, launcher: BrowserLauncher, hot_spare: bool = None, spare_headless: bool = True):
+        self.launcher = launcher
+        self.hot_spare = hot_spare_enabled() if hot_spare is None else hot_spare
+        self.spare_headless = spare_headless
+        self.handle = None
+        self.crash_reason = None
+        self.snapshot = None
+        self.spare = None
+        self.recoveries: list[dict] = []
+        self._spare_task = None
+        self._expect_close = False
+
+    @property
+    def crashed(self) -> bool:
+        return self.crash_reason is not None
+
+    def attach(self, handle: dict) -> None:
+        """Watch the browser/context/page of a launcher handle."""
+        self.handle = handle
+        self.crash_reason = None
+        self._expect_close = False
+        handle["page"].on("crash", lambda *_: self._mark("page crashed"))
+        handle["context"].on("close", lambda *_: self._mark("context closed"))
+        if handle["browser"] is not handle["context"]:
+            handle["browser"].on("disconnected", lambda *_: self._mark("browser disconnected"))
+
+    def _mark(self, reason: str) -> None:
+        if self._expect_close or self.crash_reason:
+            return
+        self.crash_reason = reason
+        print(f"💥 Watchdog: {reason}")
+
+    def expect_close(self) -> None:
+        """Call before closing the browser on purpose so the close isn't reported as a crash."""
+        self._expect_close = True
+
+    # -------------------------------------------------------------- hot spare
+
+    async def checkpoint(self) -> None:
+        """Snapshot the live session so a swapped-in spare starts where the order is now."""
+        if not self.hot_spare or not self.handle or self.crashed:
+            return
+        try:
+            self.snapshot = await self.handle["context"].storage_state()
+        except Exception as e:
+            print(f"⚠️ Watchdog could not snapshot session: {e}")
+
+    def warm_spare(self, playwright, mode: str = None) -> None:
+        """Start launching the hot spare in the background (no-op unless ZEPTO_HOT_SPARE is set)."""
+        if not self.hot_spare or self.spare or (self._spare_task and not self._spare_task.done()):
+            return
+        self._spare_task = asyncio.create_task(self._launch_spare(playwright, mode))
+
+    async def _launch_spare(self, playwright, mode: str) -> None:
+        engine = self.handle["engine"] if self.handle else (self.launcher.engine or "firefox")
+        start = time.perf_counter()
+        browser = None
+        try:
+            if self.snapshot is None and self.handle:
+                self.snapshot = await self.handle["context"].storage_state()
+            browser = await getattr(playwright, engine).launch(headless=self.spare_headless)
+            context = await browser.new_context(storage_state=self.snapshot, **context_options(mode, engine))
+            page = await context.new_page()
+        except Exception as e:
+            print(f"⚠️ Hot spare launch failed: {e}")
+            if browser:
+                await self._close_quietly({"browser": browser})
+            return
+        self.spare = {
+            "strategy": f"{engine}_spare", "engine": engine, "persistent": False, "user_data_dir": None,
+            "browser": browser, "context": context, "page": page,
+            "launch_s": round(time.perf_counter() - start, 2),
+        }
+        print(f"🔥 Hot spare ready ({engine}, {self.spare['launch_s']}s)")
+
+    # --------------------------------------------------------------- recovery
+
+    async def recover(self, playwright, headless: bool = False, mode: str = None) -> dict:
+        """
+        Replace the dead browser and return a launcher-style handle.
+
+        Cheapest first: a new tab if only the page crashed, then the hot spare,
+        then a cold launch through the launcher.
+        """
+        start = time.perf_counter()
+        reason = self.crash_reason or "browser call failed"
+        old = self.handle
+        handle = None
+        source = None
+
+        if old and reason == "page crashed":
+            try:
+                handle = {**old, "page": await old["context"].new_page()}
+                source = "new_page"
+            except Exception:
+                handle = None
+
+        if handle is None and self._spare_task and not self.spare:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._spare_task), timeout=UNPROVEN_LAUNCH_TIMEOUT)
+            except Exception:
+                pass
+        if handle is None and self.spare:
+            handle, self.spare = self.spare, None
+            if self.snapshot:
+                try:
+                    await apply_storage_state(handle["context"], self.snapshot)
+                except Exception as e:
+                    print(f"⚠️ Could not refresh hot spare session: {e}")
+            source = "hot_spare"
+
+        if old and (handle is None or handle["context"] is not old["context"]):
+            self._expect_close = True
+            await self._close_quietly(old)
+
+        if handle is None:
+            handle = await self.launcher.launch(playwright, headless=headless, mode=mode)
+            source = "cold_launch"
+
+        elapsed = time.perf_counter() - start
+        self.recoveries.append({"reason": reason, "source": source, "seconds": round(elapsed, 2), "at": time.time()})
+        del self.recoveries[:-RECOVERY_HISTORY_SIZE]
+        print(f"🩹 Recovered from '{reason}' via {source} in {elapsed:.1f}s")
+        self.attach(handle)
+        return handle
+
+    async def _close_quietly(self, handle: dict) -> None:
+        try:
+            await asyncio.wait_for(handle["browser"].close(), timeout=5)
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """Stop watching and shut down the hot spare."""
+        self._expect_close = True
+        if self._spare_task and not self._spare_task.done():
+            self._spare_task.cancel()
+        self._spare_task = None
+        if self.spare:
+            await self._close_quietly(self.spare)
+            self.spare = None
+        self.handle = None
+        self.snapshot = None
+
+    def stats(self) -> dict:
+        return {
+            "hot_spare": self.hot_spare,
+            "spare_ready": self.spare is not None,
+            "crashed": self.crash_reason,
+            "recoveries": list(self.recoveries),
+        }
+
+
+# ============================================================================
+# CONTEXT RECYCLING
+# ============================================================================
+
+# A long-lived context is relaunched between orders once it has served this
+# many orders or its browser processes hold this much memory. 0 disables a limit.
+DEFAULT_RECYCLE_AFTER_ORDERS = 25
+DEFAULT_RECYCLE_RSS_MB = 1200.0
+
+RECYCLE_HISTORY_SIZE = 20
+
+
+def handle_rss_mb(handle: dict) -> float:
+    """RSS (MB) of the browser behind a launcher handle, or of all browsers if its PIDs are unknown."""
+    if handle and handle.get("pids"):
+        return process_tree_rss_mb(handle["pids"])
+    return browser_rss_mb()
+
+
+class ContextRecycler:
+    """
+    Decides when a long-lived browser context should be relaunched and does
+    it without losing the session.
+
+    Firefox grows with every page it loads, so a context kept open across
+    hundreds of orders is eventually OOM-killed. Call order_finished() after
+    each order and maybe_recycle() before the next one; when the order count
+    or RSS limit is reached the browser is closed and relaunched through the
+    BrowserLauncher, with cookies and localStorage carried over. A
+    ProfileJanitor, if given, gets to run while the profile is closed.
+
+    Limits come from ZEPTO_RECYCLE_AFTER_ORDERS and ZEPTO_RECYCLE_RSS_MB.
+    """
+
+    def __init__(self, launcher: BrowserLauncher, max_orders: int = None, max_rss_mb: float = None,
+                 janitor: ProfileJanitor = None):
+        self.launcher = launcher
+        self.janitor = janitor
+        self.max_orders = int(max_orders if max_orders is not None
+                              else env_float("ZEPTO_RECYCLE_AFTER_ORDERS", DEFAULT_RECYCLE_AFTER_ORDERS))
+        self.max_rss_mb = float(max_rss_mb if max_rss_mb is not None
+                                else env_float("ZEPTO_RECYCLE_RSS_MB", DEFAULT_RECYCLE_RSS_MB))
+        self.orders_since_launch = 0
+        self.total_orders = 0
+        self.events: list[dict] = []
+        self.recycle_count = 0
+        self.failed_count = 0
+
+    def order_finished(self) -> None:
+        self.orders_since_launch += 1
+        self.total_orders += 1
+
+    def due(self, handle: dict) -> str:
+        """Why the context behind handle should be recycled now, or None."""
+        if self.max_orders and self.orders_since_launch >= self.max_orders:
+            return f"{self.orders_since_launch} orders"
+        if self.max_rss_mb:
+            rss = handle_rss_mb(handle)
+            if rss >= self.max_rss_mb:
+                return f"RSS {rss} MB"
+        return None
+
+    def closed(self, handle: dict, reason: str = None) -> None:
+        """
+        The caller closed (or is about to close) the browser behind handle
+        itself, and the next launch starts fresh. With a reason from due(),
+        it counts as a recycle; call this before closing, so RSS is measured.
+        """
+        if reason:
+            self.events.append({
+                "reason": reason,
+                "orders": self.orders_since_launch,
+                "rss_before_mb": handle_rss_mb(handle),
+                "strategy": "closed",
+                "at": time.time(),
+            })
+            del self.events[:-RECYCLE_HISTORY_SIZE]
+            self.recycle_count += 1
+        self.orders_since_launch = 0
+
+    async def maybe_recycle(self, handle: dict, playwright, **launch_kwargs) -> dict:
+        """Return handle unchanged, or a freshly launched one if a limit was hit."""
+        reason = self.due(handle)
+        if not reason:
+            return handle
+        return await self.recycle(handle, playwright, reason, **launch_kwargs)
+
+    async def recycle(self, handle: dict, playwright, reason: str = "manual", **launch_kwargs) -> dict:
+        """
+        Close the browser behind handle and relaunch it with the same session.
+        If the relaunch fails the error is re-raised and handle stays closed.
+        """
+        start = time.perf_counter()
+        rss_before = handle_rss_mb(handle)
+        print(f"♻️ Recycling browser context ({reason}, {rss_before} MB)...")
+
+        state = None
+        try:
+            state = await handle["context"].storage_state()
+        except Exception as e:
+            print(f"⚠️ Could not snapshot session before recycling: {e}")
+        try:
+            # Closing a persistent context flushes cookies/localStorage to the profile
+            await asyncio.wait_for(handle["browser"].close(), timeout=10)
+        except Exception:
+            pass
+        if self.janitor:
+            # The profile is closed right now - the one chance a long-lived server gets to clean it
+            await self.janitor.run_if_due()
+
+        try:
+            new_handle = await self.launcher.launch(playwright, **launch_kwargs)
+        except Exception as e:
+            # The old browser is already closed: the caller must drop its handle and cold-launch
+            self.events.append({
+                "reason": reason,
+                "orders": self.orders_since_launch,
+                "rss_before_mb": rss_before,
+                "seconds": round(time.perf_counter() - start, 2),
+                "failed": True,
+                "error": str(e),
+                "at": time.time(),
+            })
+            del self.events[:-RECYCLE_HISTORY_SIZE]
+            self.failed_count += 1
+            self.orders_since_launch = 0
+            print(f"❌ Relaunch after recycling failed: {e}")
+            raise
+        if state and not new_handle["persistent"]:
+            await apply_storage_state(new_handle["context"], state)
+
+        event = {
+            "reason": reason,
+            "orders": self.orders_since_launch,
+            "rss_before_mb": rss_before,
+            "rss_after_mb": handle_rss_mb(new_handle),
+            "seconds": round(time.perf_counter() - start, 2),
+            "strategy": new_handle["strategy"],
+            "at": time.time(),
+        }
+        self.events.append(event)
+        del self.events[:-RECYCLE_HISTORY_SIZE]
+        self.recycle_count += 1
+        self.orders_since_launch = 0
+        print(f"✅ Context recycled in {event['seconds']}s ({rss_before} → {event['rss_after_mb']} MB)")
+        return new_handle
+
+    def stats(self, handle: dict = None) -> dict:
+        return {
+            "max_orders": self.max_orders,
+            "max_rss_mb": self.max_rss_mb,
+            "orders_since_launch": self.orders_since_launch,
+            "total_orders": self.total_orders,
+            "current_rss_mb": handle_rss_mb(handle) if handle else None,
+            "recycle_count": self.recycle_count,
+            "failed_recycles": self.failed_count,
+            "recent_recycles": list(self.events),
+        }
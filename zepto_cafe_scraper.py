@@ -1,6 +1,8 @@
 from playwright.sync_api import sync_playwright
 import time
 
+from zepto_catalog import get_catalog_path, publish_product_links
+
 
 def scrape_cafe_product_links(
     category_url: str = "https://www.zepto.com/pip/zepto-cafe/12830",
@@ -232,7 +234,10 @@ if __name__ == "__main__":
         "https://www.zepto.com/uncl/italian/1e43d3c1-8268-4fc7-bdcd-61c32f1231bb?scid=1e43d3c1-8268-4fc7-bdcd-61c32f1231bb&columns=1&cardType=V1_LARGE&hidePassStrip=true",
     ]
     
-    # Run the multi-page scraper
-    scrape_category_pages(category_urls)
+    # Run the multi-page scraper and publish new products to the catalog file;
+    # running servers pick them up without a restart
+    links = scrape_category_pages(category_urls)
+    added = publish_product_links(links)
+    print(f"\n📦 Published {added} new product(s) to {get_catalog_path()}")
 
 
@@ -0,0 +1,253 @@
+"""
+Product catalog shared by the MCP and API servers.
+
+    from zepto_catalog import get_product_url, search_products
+
+    get_product_url(product_name="iced americano")   # exact name
+    get_product_url(product_name="americano iced")    # confident fuzzy match
+    search_products("hazlenut", limit=3)              # ranked, with scores
+
+Names resolve through an inverted token/trigram index (see index.py). A
+fuzzy match is only accepted when it is both strong and clearly ahead of the
+next different product; otherwise get_product_url raises ValueError with
+the closest names so the caller can ask the user.
+
+Products are identified by pvid (see store.py): aliases of one product share
+a record, and caches and carts key on product_key(url).
+
+What the servers saw on product pages (name, price, stock per delivery
+address) is kept in stock_cache(), a table saved to .zepto_stock.json that
+both servers share; see stock.py.
+
+The catalog itself is the JSON file described in storage.py; it loads on
+first use and reloads when the file changes, so publishing products (see
+publish_products, or zepto_cafe_scraper.py) needs no restart.
+"""
+
+from zepto_catalog.artifact import MappedCatalog, build_artifact
+from zepto_catalog.index import CatalogIndex, normalize, tokenize, trigrams
+from zepto_catalog.stock import DEFAULT_STOCK_TABLE_PATH, StockCache, address_matches
+from zepto_catalog.storage import CatalogFile, get_catalog_path, publish_product_links, publish_products
+from zepto_catalog.store import ProductStore, parse_pvid, product_key
+
+# A fuzzy match is used without asking when it scores at least this much...
+AUTO_MATCH_SCORE = 0.75
+# ...and beats the best match for a different product by this margin
+AUTO_MATCH_MARGIN = 0.1
+# A weaker match is still used when no other product matches at all ("gulab jamoon")
+SOLE_MATCH_SCORE = 0.6
+
+# Largest page browse_catalog returns
+MAX_PAGE_SIZE = 50
+
+_catalog = None
+_stock_cache = None
+
+
+def product_store() -> ProductStore:
+    """
+    The shared store, loaded from the catalog file on first use and kept in
+    sync with it: a MappedCatalog when a fresh catalog.idx exists, otherwise
+    a ProductStore built from the JSON.
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = CatalogFile()
+    return _catalog.current()
+
+
+def catalog_names() -> list[str]:
+    """Every product name (aliases included) in the current catalog."""
+    return product_store().names()
+
+
+def stock_cache() -> StockCache:
+    """The process-wide cache of product name, price and stock per delivery address."""
+    global _stock_cache
+    if _stock_cache is None:
+        _stock_cache = StockCache(path=DEFAULT_STOCK_TABLE_PATH)
+    return _stock_cache
+
+
+def product_info(product: str) -> dict:
+    """
+    Catalog record and stock entries (stale ones marked so) for a pvid,
+    product URL or product name: {"pvid", "url", "names", "stock": [...]}.
+    None if the name doesn't resolve; a URL outside the catalog still gets
+    its stock.
+    """
+    store = product_store()
+    pvid = parse_pvid(product) or (product if store.get(product) else None)
+    if not pvid:
+        result = resolve_names([product])[0]
+        if not result["resolved"]:
+            return None
+        pvid = result["pvid"]
+        store = product_store()  # resolve_names may have reloaded (and unmapped) the catalog
+    record = store.get(pvid) or {"pvid": pvid, "url": product if "/" in product else None, "names": []}
+    return {"pvid": pvid, "url": record["url"], "names": record["names"],
+            "stock": stock_cache().for_product(pvid, allow_stale=True)}
+
+
+def catalog_index() -> CatalogIndex:
+    return product_store().index
+
+
+def search_products(query: str, limit: int = 5) -> list[dict]:
+    """Ranked catalog matches for query: [{"name", "pvid", "url", "score"}]."""
+    return product_store().search(query, limit=limit)
+
+
+def browse_catalog(query: str = "", match: str = "fuzzy", offset: int = 0, limit: int = 20) -> dict:
+    """
+    One page of catalog names for discovery (the search_catalog tool and the
+    catalog resource). match="prefix" lists names starting with query
+    alphabetically (an empty query lists everything); "fuzzy" ranks by
+    search score. Returns {"items", "total", "next_offset"}; next_offset is
+    None on the last page. A fuzzy total only counts the ranked window.
+    """
+    store = product_store()
+    offset = max(0, int(offset))
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    if match == "prefix" or not normalize(query):
+        names, total = store.prefixed(query, offset, limit)
+        items = [{"name": name, "pvid": store.lookup(name)} for name in names]
+    else:
+        ranked = store.search(query, limit=offset + limit + 1)
+        total = len(ranked) if len(ranked) <= offset + limit else offset + limit + 1
+        items = [{"name": m["name"], "pvid": m["pvid"], "score": m["score"]}
+                 for m in ranked[offset:offset + limit]]
+    next_offset = offset + len(items) if offset + len(items) < total else None
+    return {"items": items, "total": total, "next_offset": next_offset}
+
+
+def merge_order_items(items: list[dict]) -> list[dict]:
+    """
+    {"url", "qty"} order items as {"pvid", "url", "qty"}, one per product:
+    two aliases of the same product add up instead of becoming two lines.
+    """
+    merged: dict[str, dict] = {}
+    for item in items:
+        pvid = product_key(item["url"])
+        if pvid in merged:
+            merged[pvid]["qty"] += item["qty"]
+        else:
+            merged[pvid] = {**item, "pvid": pvid}
+    return list(merged.values())
+
+
+def _confident(matches: list[dict]) -> bool:
+    """True if the best match is exact, strong and clearly ahead of the best other product, or the only product."""
+    if not matches:
+        return False
+    best = matches[0]
+    runner_up = next((m for m in matches[1:] if m["pvid"] != best["pvid"]), None)
+    if runner_up is None:
+        return best["score"] >= SOLE_MATCH_SCORE
+    return best["score"] >= 1.0 or (
+        best["score"] >= AUTO_MATCH_SCORE and best["score"] - runner_up["score"] >= AUTO_MATCH_MARGIN
+    )
+
+
+def resolve_names(names: list[str], suggestions: int = 3) -> list[dict]:
+    """
+    Resolve every requested name in one pass over one catalog snapshot (a
+    hot reload can't land halfway through an order; repeated names are
+    scored once). One result per name, in order:
+
+        {"query", "resolved", "name", "pvid", "url", "score", "suggestions"}
+
+    resolved is False when there is no confident match; suggestions then
+    holds the top distinct products ({"name", "pvid", "url", "score"}), so
+    the caller can report every miss at once.
+    """
+    store = product_store()
+    by_query: dict[str, dict] = {}
+    results = []
+    for query in names:
+        key = normalize(query)
+        if key not in by_query:
+            matches = store.search(key, limit=max(5, suggestions * 2)) if key else []
+            distinct = []
+            for match in matches:
+                if all(match["pvid"] != seen["pvid"] for seen in distinct):
+                    distinct.append(match)
+            best = matches[0] if _confident(matches) else None
+            by_query[key] = {
+                "resolved": best is not None,
+                "name": best["name"] if best else None,
+                "pvid": best["pvid"] if best else None,
+                "url": best["url"] if best else None,
+                "score": best["score"] if best else (matches[0]["score"] if matches else 0.0),
+                "suggestions": [] if best else distinct[:suggestions],
+            }
+        results.append({"query": query, **by_query[key]})
+    return results
+
+
+def describe_unresolved(results: list[dict]) -> str:
+    """One line per unresolved name with its suggestions, for tool and API errors."""
+    lines = []
+    for result in results:
+        if result["resolved"]:
+            continue
+        if result["suggestions"]:
+            options = ", ".join(f"'{m['name']}' ({m['score']:.2f})" for m in result["suggestions"])
+            lines.append(f"- '{result['query']}': did you mean {options}?")
+        else:
+            lines.append(f"- '{result['query']}': no similar product in the catalog")
+    return "\n".join(lines)
+
+
+def get_product_url(product_name: str = None, item_url: str = None) -> str:
+    """
+    Get product URL from catalog by name or return direct URL.
+    Raises ValueError if product not found or the name is ambiguous.
+    """
+    if item_url:
+        return item_url
+
+    if product_name:
+        result = resolve_names([product_name], suggestions=5)[0]
+        if result["resolved"]:
+            return result["url"]
+        if result["suggestions"]:
+            suggestions = ", ".join(f"'{m['name']}'" for m in result["suggestions"])
+            raise ValueError(f"Product '{product_name}' not found in catalog. Did you mean: {suggestions}?")
+        raise ValueError(f"Product '{product_name}' not found in catalog ({len(product_store())} products).")
+
+    raise ValueError("Either product_name or item_url must be provided")
+
+
+__all__ = [
+    "AUTO_MATCH_MARGIN",
+    "AUTO_MATCH_SCORE",
+    "CatalogIndex",
+    "CatalogFile",
+    "MAX_PAGE_SIZE",
+    "MappedCatalog",
+    "ProductStore",
+    "SOLE_MATCH_SCORE",
+    "StockCache",
+    "address_matches",
+    "browse_catalog",
+    "build_artifact",
+    "catalog_index",
+    "catalog_names",
+    "describe_unresolved",
+    "get_catalog_path",
+    "get_product_url",
+    "merge_order_items",
+    "normalize",
+    "parse_pvid",
+    "product_info",
+    "product_key",
+    "product_store",
+    "publish_product_links",
+    "publish_products",
+    "resolve_names",
+    "search_products",
+    "stock_cache",
+    "tokenize",
+    "trigrams",
+]
@@ -0,0 +1,18 @@
+"""
+Build the memory-mapped catalog artifact (catalog.idx) from the catalog file.
+
+    python -m zepto_catalog [path/to/catalog.json]
+"""
+
+import sys
+
+from zepto_catalog.artifact import artifact_path, build_artifact, source_signature
+from zepto_catalog.storage import get_catalog_path, read_catalog_file
+from zepto_catalog.store import ProductStore
+
+if __name__ == "__main__":
+    catalog_path = sys.argv[1] if len(sys.argv) > 1 else get_catalog_path()
+    store = ProductStore(read_catalog_file(catalog_path))
+    size = build_artifact(store, artifact_path(catalog_path), source_signature(catalog_path))
+    print(f"✅ Wrote {artifact_path(catalog_path)}: {len(store)} products, "
+          f"{len(store.aliases)} names, {size / 1024:.0f} KB")
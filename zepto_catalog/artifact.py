@@ -0,0 +1,279 @@
+"""
+Precompiled, memory-mapped catalog index.
+
+Building the search index from catalog.json costs time proportional to the
+catalog, and the MCP server is respawned often. This module serializes the
+store and its index into one binary file (catalog.idx next to catalog.json)
+that the servers mmap and query in place: opening it reads only the header,
+and a search touches only the posting lists of the query's own terms.
+
+    python -m zepto_catalog                     # (re)build catalog.idx
+
+publish_products() rebuilds an existing artifact after every publish. The
+header records the mtime and size of the catalog.json it was built from; a
+stale artifact is ignored and the catalog is loaded from JSON as before.
+
+Layout (little-endian; offsets are absolute, string refs are (offset, length)
+into the string blob):
+
+    header    HEADER
+    names     NAME record per alias, sorted by name      -> binary search
+    products  PRODUCT record per pvid, sorted by pvid    -> binary search
+    slugs     SLUG record per product slug, sorted       -> binary search
+    terms     TERM record per "g"+trigram / "t"+token / "p"+phonetic key
+              (postings: name ids) and "d"+deletion bucket (postings: key ids), sorted
+    keys      KEY record per phonetic key, sorted
+    postings  uint32 ids (each product's names, then term postings)
+    strings   UTF-8 blob
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+from zepto_catalog.index import normalize, rank
+from zepto_catalog.store import ProductStore
+from zepto_util import print
+
+MAGIC = b"ZCATIDX2"
+HEADER = struct.Struct("<8sqq5I7I")  # magic, source mtime_ns, source size, counts, section offsets
+NAME = struct.Struct("<IIIHH")       # name ref, product id, trigram count, token count
+PRODUCT = struct.Struct("<IIIIIIII")  # pvid ref, url ref, slug ref, names (postings offset, count)
+SLUG = struct.Struct("<III")         # slug ref, product id
+TERM = struct.Struct("<IIII")        # term ref, postings (offset, count)
+KEY = struct.Struct("<II")           # phonetic key ref
+
+
+def artifact_path(catalog_path: str) -> str:
+    return os.path.splitext(catalog_path)[0] + ".idx"
+
+
+def source_signature(catalog_path: str) -> tuple[int, int]:
+    stat = os.stat(catalog_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Strings:
+    def __init__(self):
+        self.blob = bytearray()
+        self.refs: dict[str, tuple[int, int]] = {}
+
+    def ref(self, text: str) -> tuple[int, int]:
+        if text not in self.refs:
+            data = (text or "").encode("utf-8")
+            self.refs[text] = (len(self.blob), len(data))
+            self.blob += data
+        return self.refs[text]
+
+
+def build_artifact(store: ProductStore, out_path: str, source: tuple[int, int] = (0, 0)) -> int:
+    """Serialize store to out_path (atomically); returns the artifact size in bytes."""
+    index = store.index
+    names = sorted(index.urls, key=lambda n: n.encode("utf-8"))
+    name_ids = {name: i for i, name in enumerate(names)}
+    pvids = sorted(store.products, key=lambda p: p.encode("utf-8"))
+    product_ids = {pvid: i for i, pvid in enumerate(pvids)}
+    slugs = sorted(store.slugs, key=lambda s: s.encode("utf-8"))
+    keys = sorted({sound for bucket in index.near.values() for sound in bucket}, key=lambda k: k.encode("utf-8"))
+    key_ids = {sound: i for i, sound in enumerate(keys)}
+    terms = sorted([(term, [name_ids[n] for n in posting]) for term, posting in index.postings.items()]
+                   + [("d" + bucket, [key_ids[k] for k in bucket_keys]) for bucket, bucket_keys in index.near.items()],
+                   key=lambda pair: pair[0].encode("utf-8"))
+
+    strings = _Strings()
+    postings = array("I")
+    name_records = b"".join(
+        NAME.pack(*strings.ref(name), product_ids[store.aliases[name]],
+                  index.gram_counts[name], index.token_counts[name])
+        for name in names)
+    product_records = bytearray()
+    for pvid in pvids:
+        product = store.products[pvid]
+        start = len(postings)
+        postings.extend(sorted(name_ids[n] for n in product["names"]))
+        product_records += PRODUCT.pack(*strings.ref(pvid), *strings.ref(product["url"]),
+                                        *strings.ref(product["slug"] or ""), start, len(postings) - start)
+    slug_records = b"".join(SLUG.pack(*strings.ref(slug), product_ids[store.slugs[slug]]) for slug in slugs)
+    term_records = bytearray()
+    for term, ids in terms:
+        start = len(postings)
+        postings.extend(sorted(ids))
+        term_records += TERM.pack(*strings.ref(term), start, len(postings) - start)
+    key_records = b"".join(KEY.pack(*strings.ref(sound)) for sound in keys)
+    if sys.byteorder != "little":
+        postings.byteswap()
+
+    offset = HEADER.size
+    sections = []
+    body = (name_records, product_records, slug_records, term_records, key_records, postings.tobytes(), strings.blob)
+    for data in body:
+        sections.append(offset)
+        offset += len(data)
+    header = HEADER.pack(MAGIC, source[0], source[1], len(names), len(pvids), len(slugs), len(terms), len(keys),
+                         *sections)
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for data in (header, *body):
+            f.write(data)
+    os.replace(tmp_path, out_path)
+    return offset
+
+
+class MappedCatalog:
+    """
+    Read-only ProductStore over an mmap'ed artifact. Same lookups (get,
+    lookup, url, search, names, len) without building anything in memory.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.postings = None
+        try:
+            self._open(path)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, path: str) -> None:
+        (magic, mtime_ns, size, self.name_count, self.product_count, self.slug_count, self.term_count,
+         self.key_count, self.names_at, self.products_at, self.slugs_at, self.terms_at, self.keys_at,
+         postings_at, self.strings_at) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog artifact")
+        self.path = path
+        self.source = (mtime_ns, size)
+        self.postings = memoryview(self.mm)[postings_at:self.strings_at].cast("I")
+        self.index = self
+
+    def close(self) -> None:
+        """Unmap the artifact. The catalog can't be used afterwards."""
+        if self.postings is not None:
+            self.postings.release()  # mmap refuses to close while a view is exported
+            self.postings = None
+        self.mm.close()
+
+    def __len__(self) -> int:
+        return self.product_count
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self.strings_at + offset
+        return self.mm[start:start + length].decode("utf-8")
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self.strings_at + offset
+        return self.mm[start:start + length]
+
+    def _posting(self, start: int, count: int) -> list[int]:
+        ids = self.postings[start:start + count]
+        if sys.byteorder == "little":
+            return ids.tolist()
+        swapped = array("I", ids.tobytes())
+        swapped.byteswap()
+        return swapped.tolist()
+
+    def _find(self, at: int, record: struct.Struct, count: int, key: bytes) -> tuple:
+        """Binary search a sorted section whose records start with a string ref."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            fields = record.unpack_from(self.mm, at + mid * record.size)
+            probe = self._bytes(fields[0], fields[1])
+            if probe == key:
+                return fields
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _name(self, name_id: int) -> tuple:
+        return NAME.unpack_from(self.mm, self.names_at + name_id * NAME.size)
+
+    def _product_dict(self, fields: tuple) -> dict:
+        names = [self._text(*self._name(i)[:2]) for i in self._posting(fields[6], fields[7])]
+        return {"pvid": self._text(fields[0], fields[1]), "url": self._text(fields[2], fields[3]),
+                "slug": self._text(fields[4], fields[5]) or None, "names": names}
+
+    def get(self, pvid: str) -> dict:
+        fields = self._find(self.products_at, PRODUCT, self.product_count, (pvid or "").encode("utf-8"))
+        return self._product_dict(fields) if fields else None
+
+    def url(self, pvid: str) -> str:
+        fields = self._find(self.products_at, PRODUCT, self.product_count, (pvid or "").encode("utf-8"))
+        return self._text(fields[2], fields[3]) if fields else None
+
+    def lookup(self, name: str) -> str:
+        """pvid of an exact alias or product slug, or None."""
+        key = normalize(name).encode("utf-8")
+        fields = self._find(self.names_at, NAME, self.name_count, key)
+        if not fields:
+            found = self._find(self.slugs_at, SLUG, self.slug_count, key)
+            fields = (None, None, found[2]) if found else None
+        if not fields:
+            return None
+        product = PRODUCT.unpack_from(self.mm, self.products_at + fields[2] * PRODUCT.size)
+        return self._text(product[0], product[1])
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.name_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(*self._name(mid)[:2]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefixed(self, prefix: str, offset: int = 0, limit: int = 20) -> tuple[list[str], int]:
+        """A page of the names starting with prefix, alphabetically, and how many there are in total."""
+        key = normalize(prefix).encode("utf-8")
+        start = self._lower_bound(key)
+        end = self._lower_bound(key + b"\xff") if key else self.name_count
+        page = range(start + offset, min(start + offset + limit, end))
+        return [self._text(*self._name(i)[:2]) for i in page], end - start
+
+    def names(self) -> list[str]:
+        return [self._text(*self._name(i)[:2]) for i in range(self.name_count)]
+
+    def _term(self, term: str) -> list[int]:
+        fields = self._find(self.terms_at, TERM, self.term_count, term.encode("utf-8"))
+        return self._posting(fields[2], fields[3]) if fields else []
+
+    def _near(self, bucket: str) -> list[str]:
+        return [self._text(*KEY.unpack_from(self.mm, self.keys_at + i * KEY.size))
+                for i in self._term("d" + bucket)]
+
+    def _stats(self, name_id: int) -> tuple[str, int, int]:
+        name_ref, name_len, _, gram_count, token_count = self._name(name_id)
+        return self._text(name_ref, name_len), gram_count, token_count
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.3) -> list[dict]:
+        """Ranked matches as [{"name", "pvid", "url", "score"}], scored exactly like CatalogIndex."""
+        matches = []
+        for score, name, name_id in rank(query, self._term, self._near, self._stats, limit, min_score):
+            product = PRODUCT.unpack_from(self.mm, self.products_at + self._name(name_id)[2] * PRODUCT.size)
+            matches.append({"name": name, "url": self._text(product[2], product[3]), "score": score,
+                            "pvid": self._text(product[0], product[1])})
+        return matches
+
+
+def open_artifact(catalog_path: str) -> MappedCatalog:
+    """The mapped catalog for catalog_path if a fresh artifact exists, else None."""
+    path = artifact_path(catalog_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        mapped = MappedCatalog(path)
+        if mapped.source != source_signature(catalog_path):
+            print(f"⚠️ {path} is older than {catalog_path} - rebuild it with: python -m zepto_catalog")
+            mapped.close()
+            return None
+        return mapped
+    except (OSError, ValueError, struct.error) as e:
+        print(f"⚠️ Could not open catalog artifact {path}: {e}")
+        return None
+
@@ -0,0 +1,179 @@
+"""
+Inverted token and trigram index over catalog names.
+
+A query only touches the posting lists of its own tokens and trigrams, so
+lookups stay fast as the catalog grows to thousands of scraped products.
+Candidates are ranked by a blend of trigram similarity (typos, partial
+words) and token overlap (word order, extra words such as "please").
+
+Tokens also match through their phonetic key ("chay" finds "chai",
+"parantha" finds "paratha") and through keys one edit apart ("capuchino"
+ranks "cappuccino" first), at a lower weight than an exact token; see
+phonetic.py. All keys and their near-match buckets are posted when a name
+is added. A near match usually scores below AUTO_MATCH_SCORE, so name
+resolution offers it as a suggestion rather than ordering it unasked.
+"""
+
+from collections import Counter, defaultdict
+import re
+
+from zepto_catalog.phonetic import MIN_NEAR_KEY_LENGTH, deletions, phonetic_key, within_one_edit
+
+# Weights of the ranking signals; an exact name match always scores 1.0
+TRIGRAM_WEIGHT = 0.5
+QUERY_TOKEN_WEIGHT = 0.3
+NAME_TOKEN_WEIGHT = 0.2
+# How much a token counts when it matches by sound or one edit away rather than exactly
+PHONETIC_TOKEN_MATCH = 0.9
+NEAR_TOKEN_MATCH = 0.75
+
+
+def normalize(text: str) -> str:
+    """Lowercase, with every run of non-alphanumerics collapsed to one space."""
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+def tokenize(text: str) -> list[str]:
+    return normalize(text).split()
+
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of the normalized text, padded so short words and word starts count."""
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_terms(name: str) -> tuple[set[str], set[str]]:
+    """
+    Posting terms of a normalized name - "g"+trigram, "t"+token and
+    "p"+phonetic key - and the phonetic keys themselves.
+    """
+    words = set(name.split())
+    keys = {phonetic_key(word) for word in words}
+    terms = {"g" + gram for gram in trigrams(name)} | {"t" + word for word in words} | {"p" + key for key in keys}
+    return terms, keys
+
+
+def match_score(query: str, name: str, shared_grams: int, query_grams: int, name_grams: int,
+                shared_tokens: float, query_tokens: int, name_tokens: int) -> float:
+    """Blend of trigram Dice similarity and token coverage in both directions; 1.0 only for an exact name."""
+    if name == query:
+        return 1.0
+    score = (TRIGRAM_WEIGHT * 2 * shared_grams / (query_grams + name_grams)
+             + QUERY_TOKEN_WEIGHT * min(shared_tokens / query_tokens, 1.0)
+             + NAME_TOKEN_WEIGHT * min(shared_tokens / name_tokens, 1.0))
+    return min(score, 0.99)  # Only an exact name is a certain match
+
+
+def rank(query: str, postings, near, stats, limit: int, min_score: float) -> list[tuple[float, str, object]]:
+    """
+    Score query against an index given as accessors, so the in-memory and
+    the memory-mapped index rank identically:
+
+        postings(term)  -> ids of the names posted under term
+        near(bucket)    -> phonetic keys in a deletion bucket
+        stats(id)       -> (name, trigram count, token count)
+
+    Returns the best (score, name, id) triples, highest score first, then the shorter name.
+    """
+    key = normalize(query)
+    if not key:
+        return []
+    query_tokens = set(key.split())
+    query_grams = trigrams(key)
+
+    shared_grams = Counter()
+    for gram in query_grams:
+        shared_grams.update(postings("g" + gram))
+    shared_tokens = Counter()
+    for token in query_tokens:
+        weights = dict.fromkeys(postings("t" + token), 1.0)
+        sound = phonetic_key(token)
+        for name_id in postings("p" + sound):
+            weights.setdefault(name_id, PHONETIC_TOKEN_MATCH)
+        if len(sound) >= MIN_NEAR_KEY_LENGTH:
+            close = {other for bucket in deletions(sound) for other in near(bucket)
+                     if other != sound and within_one_edit(sound, other)}
+            for other in close:
+                for name_id in postings("p" + other):
+                    weights.setdefault(name_id, NEAR_TOKEN_MATCH)
+        shared_tokens.update(weights)
+
+    scored = []
+    for name_id in shared_grams.keys() | shared_tokens.keys():
+        name, gram_count, token_count = stats(name_id)
+        score = match_score(key, name, shared_grams[name_id], len(query_grams), gram_count,
+                            shared_tokens[name_id], len(query_tokens), token_count)
+        if score >= min_score:
+            scored.append((score, name, name_id))
+    scored.sort(key=lambda entry: (-entry[0], len(entry[1]), entry[1]))
+    return [(round(score, 3), name, name_id) for score, name, name_id in scored[:limit]]
+
+
+class CatalogIndex:
+    """Name -> URL map with trigram, token and phonetic posting lists for ranked search."""
+
+    def __init__(self, entries: dict[str, str] = None):
+        self.urls: dict[str, str] = {}
+        self.postings: dict[str, set] = defaultdict(set)
+        self.near: dict[str, set] = defaultdict(set)
+        self.gram_counts: dict[str, int] = {}
+        self.token_counts: dict[str, int] = {}
+        for name, url in (entries or {}).items():
+            self.add(name, url)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize(name) in self.urls
+
+    def get(self, name: str) -> str:
+        return self.urls.get(normalize(name))
+
+    def names(self) -> list[str]:
+        return list(self.urls)
+
+    def add(self, name: str, url: str) -> None:
+        key = normalize(name)
+        if not key:
+            return
+        if key in self.urls:
+            self.remove(key)
+        self.urls[key] = url
+        terms, sounds = name_terms(key)
+        for term in terms:
+            self.postings[term].add(key)
+        for sound in sounds:
+            for bucket in deletions(sound):
+                self.near[bucket].add(sound)
+        self.gram_counts[key] = len(trigrams(key))
+        self.token_counts[key] = len(set(key.split()))
+
+    def remove(self, name: str) -> None:
+        key = normalize(name)
+        if self.urls.pop(key, None) is None:
+            return
+        terms, sounds = name_terms(key)
+        for term in terms:
+            self._unpost(self.postings, term, key)
+        for sound in sounds:
+            if "p" + sound not in self.postings:  # No other name has this key any more
+                for bucket in deletions(sound):
+                    self._unpost(self.near, bucket, sound)
+        self.gram_counts.pop(key, None)
+        self.token_counts.pop(key, None)
+
+    @staticmethod
+    def _unpost(postings: dict, term: str, key: str) -> None:
+        names = postings.get(term)
+        if names is not None:
+            names.discard(key)
+            if not names:
+                del postings[term]
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.3) -> list[dict]:
+        """Best matches for query as [{"name", "url", "score"}], highest score first."""
+        ranked = rank(query, lambda term: self.postings.get(term, ()), lambda bucket: self.near.get(bucket, ()),
+                      lambda name: (name, self.gram_counts[name], self.token_counts[name]), limit, min_score)
+        return [{"name": name, "url": self.urls[name], "score": score} for score, name, _ in ranked]
@@ -0,0 +1,66 @@
+"""
+Phonetic keys for romanized Hindi/English dish names.
+
+People spell the same dish many ways ("chai"/"chay", "paratha"/"parantha",
+"jamun"/"jamoon", "coffee"/"cofee"). phonetic_key() folds the usual
+transliteration variants onto one key, and near misses between keys are
+found through precomputed single-deletion neighbours (deletions()) and
+confirmed with a bounded edit distance. The index stores every key and
+deletion at build time, so a lookup only hashes the query's own keys.
+"""
+
+import re
+
+# Applied in order; vowel digraphs first so "oo" becomes "u" before repeated letters collapse
+_RULES = [
+    (re.compile(r"oo|ou"), "u"),
+    (re.compile(r"au"), "o"),
+    (re.compile(r"ee|ea"), "i"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"ch+"), "x"),                  # ch/chh -> one sound; x is free after the line above
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"([bdgjkt])h"), r"\1"),        # aspirated consonants: bh, dh, gh, jh, kh, th
+    (re.compile(r"ck|c|q"), "k"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"(?<=.)y"), "i"),              # chay -> chai, pyaz -> piaz (but not a leading y)
+    (re.compile(r"n(?=[^aeiou])"), ""),         # nasalisation: parantha -> paratha
+    (re.compile(r"(.)\1+"), r"\1"),             # doubled letters: coffee -> cofe
+]
+# Final schwa, which romanizations add or drop freely (samosa/samose/samos)
+_TRAILING_VOWEL = re.compile(r"(?<=...)[ae]$")
+
+# Keys shorter than this only match exactly; near matches on them are mostly noise
+MIN_NEAR_KEY_LENGTH = 4
+
+
+def phonetic_key(token: str) -> str:
+    """Transliteration-insensitive key of one normalized token ("parantha" -> "parata")."""
+    key = token
+    for pattern, replacement in _RULES:
+        key = pattern.sub(replacement, key)
+    return _TRAILING_VOWEL.sub("", key) or token
+
+
+def deletions(key: str) -> set[str]:
+    """key with each single character removed (and key itself): the near-match buckets it belongs to."""
+    if len(key) < MIN_NEAR_KEY_LENGTH:
+        return {key}
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
@@ -0,0 +1,197 @@
+"""
+What we last saw about each product, per delivery address.
+
+Stock is per dark store, so entries are keyed by (pvid, address): the
+delivery address shown in the page header when the product was seen. Every
+product page the servers visit records its name, price and stock state here
+(see record_visit in the servers), and entries expire after
+ZEPTO_STOCK_TTL_SECONDS (default 900).
+
+    cache = stock_cache()
+    cache.record(pvid, "Hsr Home - 3rd floor", in_stock=False, name="Poha")
+    cache.get(pvid, "hsr home")             # fresh entry for that address, or None
+    cache.likely_out_of_stock([pvid], "hsr home")
+
+Lookups match an address label ("Hsr Home") against the recorded header
+text by containment, the same way prefetched results are trusted.
+
+The table is stale-while-revalidate: an entry past its TTL is still served
+for ZEPTO_STOCK_STALE_SECONDS more (default 6 hours) with "stale": True, so
+an order can warn from it right away, while the next page visit or
+background refresh (see zepto_stock.py) replaces it. An entry's age is
+the age of its stock state: a visit that couldn't tell in_stock updates the
+name and price but leaves the entry as old as it was.
+
+With a path, entries are loaded on start, so a respawned server doesn't
+begin with an empty table, and saved there shortly after they change (at
+most once per STOCK_SAVE_DELAY_SECONDS inside an event loop, so a prefetch
+fan-out costs one write; call flush() before exiting).
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from zepto_catalog.index import normalize
+from zepto_util import env_float, print
+
+DEFAULT_STOCK_TTL_SECONDS = 900.0
+DEFAULT_STOCK_STALE_SECONDS = 6 * 3600.0
+# Saved next to the servers' other state files (.zepto_session.json etc.)
+DEFAULT_STOCK_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".zepto_stock.json")
+# Records made within this many seconds of each other share one write of the table
+STOCK_SAVE_DELAY_SECONDS = 2.0
+
+
+def get_stock_ttl() -> float:
+    return env_float("ZEPTO_STOCK_TTL_SECONDS", DEFAULT_STOCK_TTL_SECONDS)
+
+
+def get_stock_stale_seconds() -> float:
+    return max(0.0, env_float("ZEPTO_STOCK_STALE_SECONDS", DEFAULT_STOCK_STALE_SECONDS))
+
+
+def address_matches(wanted: str, seen: str) -> bool:
+    """True if the address label wanted (e.g. "Hsr Home") is the header address seen."""
+    wanted, seen = normalize(wanted), normalize(seen)
+    return bool(wanted and seen) and (wanted == seen or wanted in seen)
+
+
+class StockCache:
+    """TTL cache of product name, price and stock state keyed by (pvid, delivery address)."""
+
+    def __init__(self, ttl: float = None, stale_for: float = None, path: str = None):
+        self.ttl = get_stock_ttl() if ttl is None else ttl
+        self.stale_for = get_stock_stale_seconds() if stale_for is None else stale_for
+        self.path = path
+        self.entries: dict[tuple[str, str], dict] = {}
+        self._save_scheduled = False
+        if path:
+            self.load()
+
+    def load(self) -> int:
+        """
+        Merge in the entries saved at path that are newer than ours and not
+        past the stale window (the other server may share the file); returns
+        how many were taken.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f).get("entries", [])
+        except (OSError, ValueError, AttributeError):
+            return 0
+        taken = 0
+        for entry in saved:
+            if not (isinstance(entry, dict) and entry.get("pvid") and entry.get("checked_at")) or not self.usable(entry):
+                continue
+            key = (entry["pvid"], normalize(entry.get("address")))
+            if key not in self.entries or self.entries[key]["checked_at"] < entry["checked_at"]:
+                self.entries[key] = entry
+                taken += 1
+        return taken
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.load()
+        self.prune()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": list(self.entries.values())}, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save stock table: {e}")
+
+    def flush(self) -> None:
+        """Write the table now if a save is pending."""
+        if self._save_scheduled:
+            self._save_scheduled = False
+            self.save()
+
+    def _schedule_save(self) -> None:
+        if not self.path or self._save_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()  # No event loop to defer to
+            return
+        self._save_scheduled = True
+        loop.call_later(STOCK_SAVE_DELAY_SECONDS, self.flush)
+
+    def record(self, pvid: str, address: str, in_stock: bool = None, name: str = None,
+               price: float = None, source: str = "page") -> dict:
+        """
+        Store what a visit learned; fields it didn't learn keep their previous
+        values. Only a visit that saw the stock state (in_stock not None)
+        makes the entry fresh again.
+        """
+        key = (pvid, normalize(address))
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {"pvid": pvid, "address": address, "in_stock": None, "name": None, "price": None,
+                     "checked_at": time.time(), "source": source}
+        entry.update({k: v for k, v in (("name", name), ("price", price)) if v is not None})
+        entry["address"] = address or entry["address"]
+        if in_stock is not None:
+            entry.update({"in_stock": in_stock, "checked_at": time.time(), "source": source})
+        self.entries[key] = entry
+        self._schedule_save()
+        return entry
+
+    def fresh(self, entry: dict, max_age: float = None) -> bool:
+        return time.time() - entry["checked_at"] <= (self.ttl if max_age is None else max_age)
+
+    def usable(self, entry: dict) -> bool:
+        """Fresh, or stale but still within the window where it is served while being revalidated."""
+        return self.fresh(entry, self.ttl + self.stale_for)
+
+    def for_product(self, pvid: str, max_age: float = None, allow_stale: bool = False) -> list[dict]:
+        """
+        Entries for pvid, one per address, newest first: fresh ones, plus
+        stale ones (marked "stale": True) with allow_stale.
+        """
+        entries = []
+        for (p, _), entry in self.entries.items():
+            if p != pvid:
+                continue
+            if self.fresh(entry, max_age):
+                entries.append({**entry, "stale": False})
+            elif allow_stale and max_age is None and self.usable(entry):
+                entries.append({**entry, "stale": True})
+        return sorted(entries, key=lambda e: -e["checked_at"])
+
+    def get(self, pvid: str, address: str = None, max_age: float = None, allow_stale: bool = False) -> dict:
+        """Newest fresh (or, with allow_stale, stale) entry for pvid at address (any address if None), or None."""
+        for entry in self.for_product(pvid, max_age, allow_stale):
+            if address is None or address_matches(address, entry["address"]):
+                return entry
+        return None
+
+    def likely_out_of_stock(self, pvids: list[str], address: str, allow_stale: bool = False) -> list[dict]:
+        """Entries saying these products were out of stock at address (stale ones too with allow_stale)."""
+        entries = [self.get(pvid, address, allow_stale=allow_stale) for pvid in pvids]
+        return [e for e in entries if e and e["in_stock"] is False]
+
+    def needs_refresh(self, pvid: str, address: str = None) -> bool:
+        """True unless a fresh entry with a known stock state exists for pvid (at address, if given)."""
+        entry = self.get(pvid, address)
+        return entry is None or entry["in_stock"] is None
+
+    def prune(self) -> int:
+        """Drop entries past the stale window; returns how many."""
+        expired = [key for key, entry in self.entries.items() if not self.usable(entry)]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
+
+    def describe(self, entry: dict) -> str:
+        """One line for tool output, e.g. "Hsr Home: out of stock, ₹129 (4 min ago)"."""
+        stock = {True: "in stock", False: "out of stock", None: "stock unknown"}[entry["in_stock"]]
+        price = f", ₹{entry['price']:g}" if entry.get("price") is not None else ""
+        age = int(time.time() - entry["checked_at"])
+        ago = f"{age}s ago" if age < 120 else f"{age // 60} min ago" if age < 7200 else f"{age // 3600}h ago"
+        outdated = ", may be outdated" if entry.get("stale") else ""
+        return f"{entry['address'] or 'unknown address'}: {stock}{price} ({ago}{outdated})"
@@ -0,0 +1,175 @@
+"""
+On-disk catalog with hot reload.
+
+The catalog lives in a JSON file ({"products": {name: url}}, default
+zepto_catalog/catalog.json, or ZEPTO_CATALOG_PATH). It is read on first use
+and re-read whenever its mtime or size changes, at most once per
+CATALOG_CHECK_SECONDS, so a scraper can publish products while the servers
+keep serving. A reload only touches the names that were added, removed or
+repointed; the rest of the search index stays as it is.
+
+Writers go through publish_products(), which replaces the file atomically,
+so a reader never sees half a file. A file that fails to parse is reported
+and the previous catalog keeps serving.
+
+When a catalog.idx built from the current file exists (see artifact.py), it
+is mmap'ed instead of parsing the JSON, so loading doesn't grow with the
+catalog.
+"""
+
+import json
+import os
+import time
+
+from zepto_catalog.artifact import MappedCatalog, artifact_path, build_artifact, open_artifact, source_signature
+from zepto_catalog.index import normalize
+from zepto_catalog.store import SLUG_PATTERN, ProductStore, product_key
+from zepto_util import print
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+# How often (at most) a lookup stats the file for changes
+CATALOG_CHECK_SECONDS = 1.0
+
+
+def get_catalog_path() -> str:
+    return os.getenv("ZEPTO_CATALOG_PATH", "").strip() or DEFAULT_CATALOG_PATH
+
+
+def read_catalog_file(path: str) -> dict[str, str]:
+    """name -> URL entries of a catalog file, names normalized."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    products = data.get("products", {}) if isinstance(data, dict) else {}
+    return {normalize(name): url for name, url in products.items() if normalize(name) and url}
+
+
+def write_catalog_file(path: str, entries: dict[str, str]) -> None:
+    """Write entries atomically: readers see the old file or the new one, never a partial one."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"products": dict(sorted(entries.items()))}, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CatalogFile:
+    """A store backed by a catalog file (and its artifact), reloaded when either changes."""
+
+    def __init__(self, path: str = None):
+        self.path = path or get_catalog_path()
+        self.store = ProductStore()
+        self.entries: dict[str, str] = {}
+        self.signature = None
+        self.checked_at = 0.0
+        self.loads = 0
+
+    def current(self) -> ProductStore:
+        """The store, refreshed from disk first if the file changed since the last check."""
+        now = time.monotonic()
+        if self.loads == 0 or now - self.checked_at >= CATALOG_CHECK_SECONDS:
+            self.checked_at = now
+            self.refresh()
+        return self.store
+
+    def refresh(self) -> bool:
+        """Re-read the file if its (or its artifact's) mtime or size changed; True if the catalog changed."""
+        try:
+            source = source_signature(self.path)
+        except FileNotFoundError:
+            if self.loads == 0:
+                print(f"⚠️ Catalog file {self.path} not found - the catalog is empty")
+                self.loads = 1
+            return False
+        try:
+            signature = (source, source_signature(artifact_path(self.path)))
+        except FileNotFoundError:
+            signature = (source, None)
+        if signature == self.signature:
+            return False
+
+        mapped = open_artifact(self.path) if signature[1] else None
+        if mapped:
+            self.signature = signature
+            self._replace_store(mapped)
+            self.entries = {}
+            if self.loads:
+                print(f"🔄 Catalog reloaded from {mapped.path} ({len(mapped)} products)")
+            self.loads += 1
+            return True
+        if not isinstance(self.store, ProductStore):
+            self._replace_store(ProductStore())  # Leaving the artifact: rebuild from JSON
+            self.entries = {}
+        try:
+            entries = read_catalog_file(self.path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read catalog file {self.path}, keeping the previous catalog: {e}")
+            self.signature = signature  # Don't retry until it changes again
+            return False
+        self.signature = signature
+        added, removed = self.apply(entries)
+        if self.loads:
+            print(f"🔄 Catalog reloaded: {added} name(s) added or changed, {removed} removed ({len(self.store)} products)")
+        self.loads += 1
+        return bool(added or removed)
+
+    def _replace_store(self, store) -> None:
+        """Swap in store; a replaced MappedCatalog is unmapped so reloads don't leak mappings and fds."""
+        previous, self.store = self.store, store
+        if isinstance(previous, MappedCatalog):
+            previous.close()
+
+    def apply(self, entries: dict[str, str]) -> tuple[int, int]:
+        """Bring the store in line with entries, touching only the names that differ."""
+        removed = [name for name in self.entries if name not in entries]
+        changed = [name for name, url in entries.items() if self.entries.get(name) != url]
+        for name in removed:
+            self.store.remove(name)
+        for name in changed:
+            self.store.add(name, entries[name])
+        self.entries = entries
+        return len(changed), len(removed)
+
+
+def publish_products(products: dict[str, str], path: str = None, replace: bool = False) -> int:
+    """
+    Add name -> URL entries to the catalog file (or, with replace, make them
+    the whole catalog). Running servers pick the change up on their next
+    lookup. Returns the number of names added or changed.
+    """
+    path = path or get_catalog_path()
+    try:
+        entries = {} if replace else read_catalog_file(path)
+    except FileNotFoundError:
+        entries = {}
+    changed = 0
+    for name, url in products.items():
+        name = normalize(name)
+        if name and url and entries.get(name) != url:
+            entries[name] = url
+            changed += 1
+    write_catalog_file(path, entries)
+    if os.path.exists(artifact_path(path)):
+        build_artifact(ProductStore(entries), artifact_path(path), source_signature(path))
+    return changed
+
+
+def publish_product_links(urls: list[str], path: str = None) -> int:
+    """
+    Publish scraped product URLs, named after their slug. Products already in
+    the catalog (same pvid, under any name) keep their names. Returns the
+    number of new products.
+    """
+    path = path or get_catalog_path()
+    try:
+        known = {product_key(url) for url in read_catalog_file(path).values()}
+    except FileNotFoundError:
+        known = set()
+    new_products = {}
+    for url in urls:
+        slug = SLUG_PATTERN.search(url or "")
+        if slug and product_key(url) not in known:
+            known.add(product_key(url))
+            new_products[slug.group(1).replace("-", " ")] = url.split("?")[0]
+    return publish_products(new_products, path) if new_products else 0
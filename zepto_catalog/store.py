@@ -0,0 +1,114 @@
+"""
+Canonical product records keyed by Zepto's pvid.
+
+Several catalog names point at the same product ("coke zero" and "coca cola
+zero sugar"), so anything cached per name would hold the same product twice.
+The store keeps one record per pvid - the UUID in /pn/<slug>/pvid/<uuid> -
+and a separate alias table (normalized name -> pvid). Stock, price and
+metadata caches and cart representations key on pvid.
+"""
+
+from bisect import bisect_left
+import re
+
+from zepto_catalog.index import CatalogIndex, normalize
+
+PVID_PATTERN = re.compile(r"/pvid/([0-9a-fA-F-]{36})")
+SLUG_PATTERN = re.compile(r"/pn/([^/]+)/")
+
+
+def parse_pvid(url: str) -> str:
+    """pvid of a Zepto product URL, or None if the URL doesn't carry one."""
+    match = PVID_PATTERN.search(url or "")
+    return match.group(1).lower() if match else None
+
+
+def product_key(url: str) -> str:
+    """Cache/cart key for a product URL: its pvid, or the bare URL for links without one."""
+    return parse_pvid(url) or (url or "").split("?")[0].rstrip("/")
+
+
+class ProductStore:
+    """One record per pvid plus an alias table; names resolve through the search index."""
+
+    def __init__(self, entries: dict[str, str] = None):
+        self.products: dict[str, dict] = {}
+        self.aliases: dict[str, str] = {}
+        self.slugs: dict[str, str] = {}
+        self.index = CatalogIndex()
+        self._sorted_names = None
+        for name, url in (entries or {}).items():
+            self.add(name, url)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def add(self, name: str, url: str) -> str:
+        """Register name as an alias of url's product (created if new); returns the pvid."""
+        pvid = product_key(url)
+        product = self.products.get(pvid)
+        if product is None:
+            slug = SLUG_PATTERN.search(url)
+            product = self.products[pvid] = {"pvid": pvid, "url": url,
+                                             "slug": slug.group(1) if slug else None, "names": []}
+            if product["slug"]:
+                self.slugs[normalize(product["slug"])] = pvid
+        alias = normalize(name)
+        if not alias:
+            return pvid
+        previous = self.aliases.get(alias)
+        if previous and previous != pvid:
+            self.remove(alias)
+        if alias not in product["names"]:
+            product["names"].append(alias)
+        self.aliases[alias] = pvid
+        self.index.add(alias, product["url"])
+        self._sorted_names = None
+        return pvid
+
+    def remove(self, name: str) -> None:
+        """Drop an alias; its product goes too once no alias points at it."""
+        alias = normalize(name)
+        pvid = self.aliases.pop(alias, None)
+        if pvid is None:
+            return
+        self.index.remove(alias)
+        self._sorted_names = None
+        product = self.products.get(pvid)
+        if product:
+            product["names"] = [n for n in product["names"] if n != alias]
+            if not product["names"]:
+                del self.products[pvid]
+                if product["slug"] and self.slugs.get(normalize(product["slug"])) == pvid:
+                    del self.slugs[normalize(product["slug"])]
+
+    def get(self, pvid: str) -> dict:
+        return self.products.get(pvid)
+
+    def lookup(self, name: str) -> str:
+        """pvid of an exact alias or product slug (as shown on cart lines), or None."""
+        key = normalize(name)
+        return self.aliases.get(key) or self.slugs.get(key)
+
+    def names(self) -> list[str]:
+        return self.index.names()
+
+    def prefixed(self, prefix: str, offset: int = 0, limit: int = 20) -> tuple[list[str], int]:
+        """A page of the names starting with prefix, alphabetically, and how many there are in total."""
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.aliases)
+        key = normalize(prefix)
+        start = bisect_left(self._sorted_names, key)
+        end = bisect_left(self._sorted_names, key + "\uffff") if key else len(self._sorted_names)
+        return self._sorted_names[start + offset:min(start + offset + limit, end)], end - start
+
+    def url(self, pvid: str) -> str:
+        product = self.products.get(pvid)
+        return product["url"] if product else None
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        """Ranked matches as [{"name", "pvid", "url", "score"}]."""
+        matches = self.index.search(query, limit=limit)
+        for match in matches:
+            match["pvid"] = self.aliases[match["name"]]
+        return matches
@@ -1,14 +1,29 @@
 import asyncio
+import contextvars
 import json
+import re
 import sys
 import os
-import shutil
 import time
+import uuid
+from urllib.parse import parse_qs, urlparse
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
 from playwright.async_api import async_playwright
+from zepto_browser import (
+    BrowserLauncher, BrowserWatchdog, ContextRecycler, get_device_mode, is_browser_gone, read_product_page, sel,
+)
+from zepto_catalog import (
+    MAX_PAGE_SIZE, address_matches, browse_catalog, describe_unresolved, get_product_url, merge_order_items,
+    normalize, parse_pvid, product_info, product_key, product_store, resolve_names, stock_cache,
+)
+from zepto_otp import get_otp_provider, get_otp_timeout
+from zepto_profile import ProfileJanitor
+from zepto_scheduler import StepGraph
+from zepto_session import SessionKeeper, SessionParker
+from zepto_stock import StockRefresher
 
 # Load environment variables from .env file if it exists (optional)
 # If python-dotenv is not installed, this will silently fail and use system env vars
@@ -34,139 +49,6 @@ def print(*args, **kwargs):
     kwargs.setdefault('file', sys.stderr)
     _original_print(*args, **kwargs)
 
-# PRODUCT CATALOG - Add more products here as needed
-PRODUCT_CATALOG = {
-    # Zepto Cafe items
-    "almond croissant": "https://www.zepto.com/pn/almond-croissant/pvid/c8a1a8c8-fc8b-4ca9-8e57-4305fa9e0b79",
-    "black forest shake": "https://www.zepto.com/pn/black-forest-shake/pvid/1d5a86f0-2565-432a-98c8-2dbad94cb470",
-    "hazelnut latte": "https://www.zepto.com/pn/hazelnut-latte/pvid/89ca18fd-2178-4ef6-a3e5-b9545447f181",
-    "mac and cheese": "https://www.zepto.com/pn/mac-and-cheese/pvid/b1cdf31f-4f53-45e9-bc73-360bc8d4707c",
-    "strawberry lemonade": "https://www.zepto.com/pn/strawberry-lemonade/pvid/0adbb1a8-79df-4c2b-af11-6442999138f2",
-    "angoori gulab jamun": "https://www.zepto.com/pn/angoori-gulab-jamun/pvid/3402b965-23f9-4070-b8c4-7ceae35bc82b",
-    "desi ghee aloo paratha with dahi": "https://www.zepto.com/pn/desi-ghee-aloo-paratha-with-dahi/pvid/f58ccd8c-e532-4e4e-b261-79b6290017e5",
-    "black pepper maggi with peanuts": "https://www.zepto.com/pn/black-pepper-maggi-with-peanuts/pvid/a5213c4d-6c69-4c1d-a4bd-85777cac0e1e",
-    "veg puff": "https://www.zepto.com/pn/veg-puff/pvid/362ac747-d438-4b80-916e-e074651e53bf",
-    "adrak chai": "https://www.zepto.com/pn/adrak-chai/pvid/959a5253-e580-4f44-8236-07ac7ba96bbf",
-    "iced americano": "https://www.zepto.com/pn/iced-americano/pvid/1f0d5ca8-8cb2-4499-b326-27654a68b6c7",
-    "spanish coffee": "https://www.zepto.com/pn/spanish-coffee/pvid/2c41692c-dd57-44d3-bfb7-ef61a12eb257",
-    "poha": "https://www.zepto.com/pn/poha/pvid/4426f6a8-ad91-4f21-a52a-823c8e659835",
-    "bun maska": "https://www.zepto.com/pn/bun-maska/pvid/606354e0-f4be-477e-a18e-6b54c474f51d",
-    "chicken puff": "https://www.zepto.com/pn/chicken-puff/pvid/de23bbb3-a07f-46f1-91a2-a8171b514a33",
-    "cheese maggi": "https://www.zepto.com/pn/cheese-maggi/pvid/b6a09671-d52a-440e-a4ac-7c9dda740a34",
-    "plain maggi": "https://www.zepto.com/pn/plain-maggi/pvid/ab252815-7562-465a-8abf-04ecc585c752",
-    "masala peanuts": "https://www.zepto.com/pn/masala-peanuts/pvid/36a9acbc-6e07-4261-9e74-d3770a1508cd",
-    "rawa upma": "https://www.zepto.com/pn/rawa-upma/pvid/9a3c38f9-9671-4a7a-b7bf-e19829e31fba",
-    "millet muesli almond cranberry": "https://www.zepto.com/pn/millet-muesli-almond-cranberry/pvid/94ae3352-e03f-43d5-845e-84e5f4fe8da5",
-    "medu vada sambar dip": "https://www.zepto.com/pn/medu-vada-sambar-dip/pvid/32f6f992-141d-449b-bcc0-4e0366e838da",
-    "mini butter croissants": "https://www.zepto.com/pn/mini-butter-croissants/pvid/85073836-96bd-4bdf-a66f-e4796e644e94",
-    "chili cheese toast": "https://www.zepto.com/pn/chili-cheese-toast/pvid/a4241249-58d2-4c88-b9df-8f1dba9f5f86",
-    "butter croissant": "https://www.zepto.com/pn/butter-croissant/pvid/37732d9c-b578-461e-9bd2-54bdd92b74d9",
-    "garlic bread with cheese dip": "https://www.zepto.com/pn/garlic-bread-with-cheese-dip/pvid/5b265566-61a3-4660-9e76-5e40643fe81f",
-    "butter chicken steamed bao": "https://www.zepto.com/pn/butter-chicken-steamed-bao/pvid/797fd5a2-c58e-4b47-9fb0-1b3e7c69235a",
-    "chicken tandoori momos": "https://www.zepto.com/pn/chicken-tandoori-momos/pvid/77583353-0155-444f-9311-d4eeca0ddfb7",
-    "double egg and cheese sandwich": "https://www.zepto.com/pn/double-egg-cheese-sandwich/pvid/32430f91-b606-4735-89fc-941f266b371f",
-    "tiramisu": "https://www.zepto.com/pn/tiramisu/pvid/2d01c0d0-125f-42e3-980c-679859fc7d0d",
-    "chicken classic burger": "https://www.zepto.com/pn/chicken-classic-burger/pvid/f41c7bce-33c4-4cfa-9647-5f38c634ee57",
-    "bulls eye egg 2pcs": "https://www.zepto.com/pn/bulls-eye-egg-2pcs/pvid/4b4962cb-3ba0-4ff8-8764-7d628d2fd09e",
-    "vietnamese cold coffee": "https://www.zepto.com/pn/vietnamese-cold-coffee/pvid/6a09750b-2bb7-4d1b-90f9-cd2a66269bfd",
-    # Additional products
-    "south indian chicken curry rice": "https://www.zepto.com/pn/south-indian-chicken-curry-rice/pvid/b5968528-73e3-436a-9159-f7e50d62246b",
-    "coca cola zero sugar": "https://www.zepto.com/pn/coca-cola-zero-sugar-soft-drink-can/pvid/f9fc134f-2bf8-4c75-8fd0-54ed20f881d8",
-    "coke zero": "https://www.zepto.com/pn/coca-cola-zero-sugar-soft-drink-can/pvid/f9fc134f-2bf8-4c75-8fd0-54ed20f881d8",
-    "hocco bix cake chocolate chips ice cream sandwich": "https://www.zepto.com/pn/hocco-bix-cake-chocolate-chips-ice-cream-sandwich/pvid/94879cba-016c-42d5-ae5c-db0c3bbfb3bf",
-    "hocco ice cream sandwich": "https://www.zepto.com/pn/hocco-bix-cake-chocolate-chips-ice-cream-sandwich/pvid/94879cba-016c-42d5-ae5c-db0c3bbfb3bf",
-    "pepsi black": "https://www.zepto.com/pn/pepsi-black-cola-diet-soft-drink/pvid/c6ddb7ce-ffe7-495d-bcbd-5e8697db0e78",
-    # Newly scraped products
-    "250ml lemon iced tea": "https://www.zepto.com/pn/250ml-lemon-iced-tea/pvid/3c677f19-cadf-40d2-a930-eb89f7c4cd60",
-    "250ml masala chaas": "https://www.zepto.com/pn/250ml-masala-chaas/pvid/ba82530c-d3de-4d2e-8ceb-b27d60c35751",
-    "adrak chai no sugar": "https://www.zepto.com/pn/adrak-chai-no-sugar/pvid/50eab84d-bf7a-42dc-a961-c8a8888c5403",
-    "aloo pyaz kulcha": "https://www.zepto.com/pn/aloo-pyaz-kulcha/pvid/30afa73e-4178-4aea-85f4-76f49d0bd0b6",
-    "ash gourd": "https://www.zepto.com/pn/ash-gourd/pvid/aa891942-3ce5-437e-bb11-0120ae085874",
-    "avocado indian premium semi ripe": "https://www.zepto.com/pn/avocado-indian-premium-semi-ripe/pvid/10a847f5-b72b-42b8-b1b7-619a26bccf90",
-    "beetroot 500 g combo": "https://www.zepto.com/pn/beetroot-500-g-combo/pvid/20b3e088-7254-4355-8955-e25ebd552f9e",
-    "bhelpuri": "https://www.zepto.com/pn/bhelpuri/pvid/a42c13b4-10d8-4c33-8e11-bbbb3a8f682f",
-    "blue flower rose tea": "https://www.zepto.com/pn/blue-flower-rose-tea/pvid/97ad5a72-5ae5-4337-98d6-3000c872d978",
-    "blueberry imported": "https://www.zepto.com/pn/blueberry-imported/pvid/025d077e-d19d-4792-a4f3-b8dfcd79df34",
-    "bombay aloo tikki sandwich": "https://www.zepto.com/pn/bombay-aloo-tikki-sandwich/pvid/5f76034c-880f-4ffb-9b8b-17e1ba69b9ea",
-    "bottle gourd": "https://www.zepto.com/pn/bottle-gourd/pvid/f613462d-a4c2-4e35-9388-aa520fd90ef4",
-    "bulls eye egg 4pcs": "https://www.zepto.com/pn/bulls-eye-egg-4pcs/pvid/8036e5ea-9fa8-4c52-926d-97892fb39685",
-    "butter chicken rice": "https://www.zepto.com/pn/butter-chicken-rice/pvid/dbc1404e-c8c4-4198-9c49-513bdf5b7bd6",
-    "butter chicken": "https://www.zepto.com/pn/butter-chicken/pvid/695e7401-a412-4698-be8a-c3cfb33521c9",
-    "butter maggi": "https://www.zepto.com/pn/butter-maggi/pvid/9ee479c7-74ec-4fe2-b344-710d2d205267",
-    "butter popcorn bag": "https://www.zepto.com/pn/butter-popcorn-bag/pvid/b4fc4721-e7f8-4553-9dd4-73da997ce96e",
-    "cappuccino": "https://www.zepto.com/pn/cappuccino/pvid/27fbad73-4154-406c-a864-80127d4f8642",
-    "channa jor chaat": "https://www.zepto.com/pn/channa-jor-chaat/pvid/a0ee7d1a-fde7-4f27-898c-a1e0eb9bb19a",
-    "chicken seekh kebab": "https://www.zepto.com/pn/chicken-seekh-kebab/pvid/4d3781cd-84c9-44d9-95f9-452adc566167",
-    "choco lava cake": "https://www.zepto.com/pn/choco-lava-cake/pvid/edf76459-7bbf-4ee6-9af4-507c7234368e",
-    "chole chapati": "https://www.zepto.com/pn/chole-chapati/pvid/fea627a3-5e97-421b-a4b8-6899a9cbd182",
-    "chole kulche": "https://www.zepto.com/pn/chole-kulche/pvid/56a84353-e390-420b-a34b-c0d12c7aea5c",
-    "chole rice": "https://www.zepto.com/pn/chole-rice/pvid/ea55f3d8-ae96-4b08-86e9-fa508805e637",
-    "chole samose": "https://www.zepto.com/pn/chole-samose/pvid/7ddb1e07-d803-408e-a9d0-366a8f58c78b",
-    "chole": "https://www.zepto.com/pn/chole/pvid/1f5f3ad4-b103-4ba1-9525-0b5a3a249e64",
-    "classic chai no sugar": "https://www.zepto.com/pn/classic-chai-no-sugar/pvid/9b1771bc-360e-4ae5-a776-bbbf8b120ece",
-    "classic cold coffee": "https://www.zepto.com/pn/classic-cold-coffee/pvid/6ebe42de-266c-4639-ae7b-b8517ccd52b3",
-    "dal makhani chapati": "https://www.zepto.com/pn/dal-makhani-chapati/pvid/1488ba02-b903-4a44-92fb-9b604e5efc52",
-    "dal makhani rice": "https://www.zepto.com/pn/dal-makhani-rice/pvid/0e8c050f-7b7f-4308-92a5-5366f08fcfff",
-    "dal makhani": "https://www.zepto.com/pn/dal-makhani/pvid/dcd8e9be-70d7-4687-ba9b-d455ed3e3f5f",
-    "dragon fruit imported": "https://www.zepto.com/pn/dragon-fruit-imported/pvid/85a8b981-aac7-4344-9a28-9818e50b790d",
-    "egg maggi": "https://www.zepto.com/pn/egg-maggi/pvid/e2d9f0ce-279f-4881-b2f1-d733012169e1",
-    "espresso tonic": "https://www.zepto.com/pn/espresso-tonic/pvid/1b9b9092-f472-4a51-8a29-e18dcd0e10dc",
-    "french vanilla latte": "https://www.zepto.com/pn/french-vanilla-latte/pvid/ff4ab8c9-1e6a-4579-acb4-e5f8243d647d",
-    "hazelnut cappuccino": "https://www.zepto.com/pn/hazelnut-cappuccino/pvid/36490ded-162b-40a1-8126-1404d278ee50",
-    "hazelnut cold coffee": "https://www.zepto.com/pn/hazelnut-cold-coffee/pvid/91c73e02-89a1-468b-b0ed-7f5dcc6ad82e",
-    "hellmanns chicken tikka sandwich": "https://www.zepto.com/pn/hellmanns-chicken-tikka-sandwich/pvid/cf6740d1-a405-44f5-8d41-0e00d4c5cac0",
-    "hellmanns paneer tikka sandwich": "https://www.zepto.com/pn/hellmanns-paneer-tikka-sandwich/pvid/59691f11-1757-4adc-8e9b-3ef2b817106b",
-    "hibiscus cinnamon tea": "https://www.zepto.com/pn/hibiscus-cinnamon-tea/pvid/0aaae272-a967-4363-8022-f6784d8b309e",
-    "hot chocolate": "https://www.zepto.com/pn/hot-chocolate/pvid/a00691fc-b863-43fd-96be-f1ea08ab194e",
-    "hot milk": "https://www.zepto.com/pn/hot-milk/pvid/76b85a8d-95b8-49d7-a5aa-2225dedd5ee9",
-    "idli sambar dip": "https://www.zepto.com/pn/idli-sambar-dip/pvid/aa9a9c36-d6a1-42a5-8135-17d56ab8c7a5",
-    "kesari rasmalai": "https://www.zepto.com/pn/kesari-rasmalai/pvid/db45b34a-7084-48e8-a658-010c7ffafa63",
-    "lady finger": "https://www.zepto.com/pn/lady-finger/pvid/2c89bcce-7f60-4d52-9613-3ca6c10fe527",
-    "latte": "https://www.zepto.com/pn/latte/pvid/88f6afb3-d80e-4e91-ba6f-e38c8a024713",
-    "lemon iced tea": "https://www.zepto.com/pn/lemon-iced-tea/pvid/18c77fdf-8f6b-4ef0-bd37-1a113d7fc60c",
-    "lemon": "https://www.zepto.com/pn/lemon/pvid/3e99d6ed-9714-4c6c-809a-c767e47dba5f",
-    "lettuce iceberg": "https://www.zepto.com/pn/lettuce-iceberg/pvid/370bf2eb-11a9-40cb-915a-998162d73593",
-    "magic masala mix": "https://www.zepto.com/pn/magic-masala-mix/pvid/9f710c9d-d485-48a1-8db0-2b203437d627",
-    "magnum shake": "https://www.zepto.com/pn/magnum-shake/pvid/103118ae-389c-46ac-a599-c4bc78debdad",
-    "masala chaas": "https://www.zepto.com/pn/masala-chaas/pvid/9c4f4a6b-9b6d-4a7a-8cc9-a5a22d909600",
-    "masala chai no sugar 500 ml": "https://www.zepto.com/pn/masala-chai-no-sugar-500-ml/pvid/3556a247-d92c-47b1-a280-e0eb953de97e",
-    "masala chai": "https://www.zepto.com/pn/masala-chai/pvid/7132f0c7-a233-4881-b310-ece3bb35ab9c",
-    "masala omelette pav": "https://www.zepto.com/pn/masala-omelette-pav/pvid/068a6414-12a2-4cb6-a12d-17e9e30c9a46",
-    "mixed berry shake": "https://www.zepto.com/pn/mixed-berry-shake/pvid/a75e1280-e95c-468c-96da-642edddbe356",
-    "muesli with strawberry greek yogurt": "https://www.zepto.com/pn/muesli-with-strawberry-greek-yogurt/pvid/abf8ebd8-b364-4574-aee7-cafa87149fc8",
-    "mushroom button": "https://www.zepto.com/pn/mushroom-button/pvid/178b3f0f-c01d-4065-8f5c-d1902cbb5d51",
-    "paneer makhani rice": "https://www.zepto.com/pn/paneer-makhani-rice/pvid/2019670e-219c-453a-88f8-35a7e7a90134",
-    "paneer makhani": "https://www.zepto.com/pn/paneer-makhani/pvid/db62259f-69ca-40c6-9165-e33e24b08b2b",
-    "paneer masala maggi": "https://www.zepto.com/pn/paneer-masala-maggi/pvid/dd89ed22-6c81-40e3-904a-abe8c0c373f5",
-    "paneer tandoori tikka": "https://www.zepto.com/pn/paneer-tandoori-tikka/pvid/7eb6a978-fd60-4288-a37e-7627312cd8ea",
-    "papaya": "https://www.zepto.com/pn/papaya/pvid/105c48cc-d5cb-4279-ac58-fe36cc92d51d",
-    "plain curd": "https://www.zepto.com/pn/plain-curd/pvid/a1a7b157-d40b-41c0-92be-e119a8c77e9a",
-    "pomegranate small": "https://www.zepto.com/pn/pomegranate-small/pvid/99dd9fd0-1b06-4649-b53f-cf756f60b8ea",
-    "popular essentials cinnamon whole dalchini": "https://www.zepto.com/pn/popular-essentials-cinnamon-whole-dalchini/pvid/70b6574c-77b3-4715-a370-8bba207c0f4a",
-    "popular essentials saunffennel seeds": "https://www.zepto.com/pn/popular-essentials-saunffennel-seeds/pvid/870056e6-aad4-43e6-8e38-e757dc2b028c",
-    "potato": "https://www.zepto.com/pn/potato/pvid/f72c0479-1ae2-44fd-a65f-ca569d4f8c72",
-    "rajma masala rice": "https://www.zepto.com/pn/rajma-masala-rice/pvid/08abb94e-438d-4d42-b914-2130c3a9fcd8",
-    "roomali roti": "https://www.zepto.com/pn/roomali-roti/pvid/0e944b9f-92fc-486e-94cc-2b6b0e9c0d76",
-    "samosa 2 pieces": "https://www.zepto.com/pn/samosa-2-pieces/pvid/5d385a24-313a-43f8-90f0-dd20eede55a0",
-    "samosa pav": "https://www.zepto.com/pn/samosa-pav/pvid/f2060662-62d3-41d2-ae67-93dbd7ea24a3",
-    "steamed rice family size": "https://www.zepto.com/pn/steamed-rice-family-size/pvid/5b6eab8c-b9ba-443a-914f-afe6a6cdd88c",
-    "steamed rice": "https://www.zepto.com/pn/steamed-rice/pvid/6b744fa4-f7e0-4cb9-8b3e-3befcf1ecb2d",
-    "strawberry shake": "https://www.zepto.com/pn/strawberry-shake/pvid/650d33dd-73f6-4ce9-ba2b-ab107f522d4e",
-    "strawberry smoothie": "https://www.zepto.com/pn/strawberry-smoothie/pvid/c3e1aedc-d42c-4733-b6e4-ab7f676bc373",
-    "strawberry": "https://www.zepto.com/pn/strawberry/pvid/cf8e41c6-8b18-461f-95b4-02876a22edce",
-    "sweet corn chaat": "https://www.zepto.com/pn/sweet-corn-chaat/pvid/c91f9888-205b-4b55-a219-a394314eb5b5",
-    "tawa plain paratha pack of 2": "https://www.zepto.com/pn/tawa-plain-paratha-pack-of-2/pvid/c04151e9-f787-40dd-aeff-5b57224787f3",
-    "triple chocolate mousse": "https://www.zepto.com/pn/triple-chocolate-mousse/pvid/26a31055-2f4a-4fde-be96-530ab4cd19f1",
-    "tulsi turmeric tea": "https://www.zepto.com/pn/tulsi-turmeric-tea/pvid/ab27a12a-8d6b-4821-9418-1f3d0ce19e42",
-    "veg steamed pizza bao": "https://www.zepto.com/pn/veg-steamed-pizza-bao/pvid/cf9fb663-e925-413e-99cd-4e49a06d2cd2",
-    "virgin mojito": "https://www.zepto.com/pn/virgin-mojito/pvid/49226b4f-8f75-4df1-809e-03f1dd9b2476",
-    "wheat chapati pack of 10": "https://www.zepto.com/pn/wheat-chapati-pack-of-10/pvid/a624a393-2279-41d7-8c0c-a1b6dd661ab1",
-    "wheat chapati pack of 3": "https://www.zepto.com/pn/wheat-chapati-pack-of-3/pvid/d707815a-2f6e-443d-bee9-210fbc33eea1",
-    "wheat chapati pack of 5": "https://www.zepto.com/pn/wheat-chapati-pack-of-5/pvid/4b9364e7-fe2f-4f60-a050-66e8716887e9",
-    "whey protein masala chaas wellbeing": "https://www.zepto.com/pn/whey-protein-masala-chaas-wellbeing/pvid/0f20ad90-25f7-44bd-91a1-765d2302e2e9",
-    "onion": "https://www.zepto.com/pn/fresh-onion/pvid/5b5c1960-d2d1-4528-8a74-bc7280174071",
-    "coconut milk": "https://www.zepto.com/pn/dabur-hommade-organic-coconut-milk/pvid/9687009f-7d47-4cd0-8b2e-6512e9730427",
-}
 
 # Address selectors - These are example labels only
 # Your actual address labels in Zepto may be different
@@ -187,20 +69,143 @@ order_state = {
     "waiting_for": None,
     "phone_number": None,
     "item_url": None,
-    "items": None,  # for multi-item orders: list of {"url": str, "qty": int}
+    "items": None,  # for multi-item orders: list of {"pvid": str, "url": str, "qty": int}, one per product
     "address": None,
     "out_of_stock_items": None,  # list of out-of-stock items
-    "successfully_added": None  # list of successfully added items
+    "successfully_added": None,  # list of successfully added items
+    "launch": None,  # {"strategy": str, "seconds": float} of the last browser launch
+    "completed_steps": [],  # checkpoints reached in submit_login, used to resume after a browser crash
+    "plan": None,  # StepGraph of work that runs ahead of the login OTP (product prefetch)
+    "otp_driver": None,  # background task that awaits OTPs from an inline provider and runs the order
+    "otp_sent_at": {},  # {"login"|"payment": time.time()} when the flow made Zepto send that OTP; older inline codes are ignored
+    "last_result": None,  # final message of an order the OTP driver ran without a tool call
+    "quick": None,  # quick_order settings: {"pay_on_delivery": bool, "started": monotonic time}
+    "cart_total": None,  # amount to pay read from the cart at checkout, e.g. "249"
+    "job": None,  # background order job: {"id", "tool", "task", "progress", "started", "finished", "result"}
+    "inline_call": None,  # order tool running within its call: {"id", "tool", "task"}
+    "cancel_requested": False  # set by stop_order; the flow stops at its next step boundary
 }
 
 server = Server("zepto-cafe")
 
+# Shared launcher - remembers which launch strategy works on this host
+browser_launcher = BrowserLauncher()
+
+# Replaces the browser if it dies mid-order (hot spare with ZEPTO_HOT_SPARE=1)
+browser_watchdog = BrowserWatchdog(browser_launcher)
+
+# Profile maintenance (backups, SQLite vacuum, cache trim) - runs after orders, once per interval
+profile_janitor = ProfileJanitor(browser_launcher.profile_dir())
+
+# Retires the warm browser between orders before it grows too big; it is then
+# torn down, the janitor runs, and the next order launches fresh
+context_recycler = ContextRecycler(browser_launcher)
+_background_tasks = set()
+
+# Refreshes the saved login between orders so start_order takes the logged-in fast path
+session_keeper = SessionKeeper(
+    browser_launcher,
+    get_context=lambda: order_state["page"].context if warm_browser_alive() else None,  # Borrow a warm browser
+    is_busy=lambda: order_state["status"] != "idle",
+)
+
+# Re-checks the stock of the most ordered products between orders (ZEPTO_STOCK_REFRESH_MINUTES)
+stock_refresher = StockRefresher(
+    browser_launcher,
+    get_context=lambda: order_state["page"].context if warm_browser_alive() else None,
+    is_busy=lambda: order_state["status"] != "idle",
+)
+
+# Closes the browser while we wait on a human for the login OTP (ZEPTO_PARK_IDLE_SECONDS, off by default)
+session_parker = SessionParker(browser_launcher)
+
+# Where OTPs come from (ZEPTO_OTP_PROVIDER); the default "tool" waits for submit_*_otp calls
+otp_provider = get_otp_provider()
+
+# Only the login OTP form can be rebuilt after parking; a bank's payment OTP page cannot
+PARKABLE_STATUSES = ("waiting_login_otp", "waiting_login_otp_multi")
+
+# Statuses that wait for an OTP, and which one
+OTP_STATUSES = {
+    "waiting_login_otp": "login",
+    "waiting_login_otp_multi": "login",
+    "waiting_payment_otp": "payment",
+}
+
+# Tools that can run an order for tens of seconds, and so send progress notifications
+PROGRESS_TOOLS = ("start_zepto_order", "start_zepto_multi_order", "quick_order", "submit_login_otp", "handle_stock_decision")
+
+# Typical seconds per order milestone, used for the remaining-time estimate in
+# progress notifications and refined from the orders this process runs
+STEP_SECONDS = {
+    "browser_ready": 6.0,
+    "logged_in": 4.0,
+    "cart_cleared": 4.0,
+    "address_selected": 5.0,
+    "item": 7.0,
+    "checkout_started": 6.0,
+    "done": 3.0,
+}
+
+# How long stop_order waits for a running order flow to reach a step boundary before cancelling it outright
+JOB_CANCEL_GRACE_SECONDS = 20
+
+# Crash recoveries allowed per submit_login call before giving up
+MAX_CRASH_RECOVERIES = 2
+
+# Product pages the order plan loads at once in side tabs, and how long the
+# add-to-cart loop waits for a prefetch that is still running
+PREFETCH_CONCURRENCY = 2
+PREFETCH_WAIT_SECONDS = 3.0
+
 
 async def check_product_stock(page) -> tuple[bool, str]:
     """
-    Check if product is in stock or out of stock.
-    Returns: (is_in_stock: bool, product_name: str)
+    Check if product is in stock or out of stock, and remember what the page
+    showed in the stock cache.
+    Returns: (is_in_stock: bool, product_name: str) - is_in_stock is None when
+    the page didn't show either state; treat that as out of stock, but it is
+    recorded as unknown so one bad render doesn't mark the product unavailable.
+    """
+    in_stock, product_name = await _detect_product_stock(page)
+    await record_visit(page, in_stock, product_name)
+    return in_stock, product_name
+
+
+async def record_visit(page, in_stock: bool, product_name: str = None) -> None:
+    """Store the open product page's name, price and stock for the delivery address it shows."""
+    pvid = parse_pvid(page.url)
+    if not pvid:
+        return
+    try:
+        info = await read_product_page(page)
+        stock_cache().record(pvid, info["address"], in_stock=in_stock, price=info["price"],
+                             name=product_name if product_name != "this product" else None)
+    except Exception as e:
+        print(f"⚠️ Could not record product visit: {e}")
+
+
+def stock_warning(urls: list[str], address: str) -> str:
+    """
+    Consult the stock table before an order starts: a heads-up for products
+    seen out of stock at this address (empty if none). Stale or missing
+    entries are queued for the stock refresher, and the order joins the
+    history that picks the products it keeps checked.
     """
+    pvids = [product_key(url) for url in urls]
+    stock_refresher.note_order(urls, address)
+    stock_refresher.revalidate([pvid for pvid in pvids if stock_cache().needs_refresh(pvid, address)])
+    entries = stock_cache().likely_out_of_stock(pvids, address, allow_stale=True)
+    if not entries:
+        return ""
+    lines = [f"⚠️ Recently seen out of stock at {address}:"]
+    lines += [f"   - {entry['name'] or entry['pvid']}: {stock_cache().describe(entry)}" for entry in entries]
+    lines.append("   The order goes ahead; if they're still unavailable you'll be asked what to do.")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _detect_product_stock(page) -> tuple[bool, str]:
+    """True (Add To Cart found), False (a Notify Me button found) or None (neither), and the product name."""
     try:
         # Get product name first (for better error messages)
         product_name = "this product"
@@ -299,22 +304,21 @@ async def check_product_stock(page) -> tuple[bool, str]:
             page_text = await page.evaluate("() => document.body.innerText")
             if page_text:
                 if "out of stock" in page_text.lower() or "notify me" in page_text.lower():
-                    print(f"🔍 Page text suggests OUT OF STOCK")
-                    return (False, product_name)
+                    # Not an element of this product: the text may belong to a recommended one
+                    print(f"🔍 Page text suggests OUT OF STOCK (unconfirmed)")
+                    return (None, product_name)
                 if "add to cart" in page_text.lower():
                     print(f"🔍 Page text suggests IN STOCK")
                     return (True, product_name)
         except:
             pass
         
-        # Default: assume out of stock if we can't find Add To Cart
-        # This is safer - we'll double-check before proceeding
+        # Unknown: callers treat it as out of stock for safety, but it isn't recorded as such
         print(f"⚠️ Could not definitively determine stock status, assuming OUT OF STOCK for safety")
-        return (False, product_name)
+        return (None, product_name)
     except Exception as e:
         print(f"⚠️ Error checking stock: {e}")
-        # Default to out of stock for safety
-        return (False, "this product")
+        return (None, "this product")
 
 
 async def select_address(page, address_name: str):
@@ -348,38 +352,80 @@ async def select_address(page, address_name: str):
             return
         raise Exception("Jo's address not found in saved addresses list.")
 
-    selector = ADDRESS_SELECTORS.get(
-        address_name, f"div.c4ZmYS:has-text('{address_name}')"
-    )
+    # ADDRESS_SELECTORS targets desktop classes; the mobile DOM uses the selector map
+    if get_device_mode() == "desktop":
+        selector = ADDRESS_SELECTORS.get(address_name, sel("address_item", label=address_name))
+    else:
+        selector = sel("address_item", label=address_name)
     await page.click(selector)
 
-def get_product_url(product_name=None, item_url=None):
+def resolve_order_items(raw_items: list) -> list[dict]:
     """
-    Get product URL from catalog by name or return direct URL.
-    Raises ValueError if product not found.
+    Tool-call items (product_name or item_url, optional quantity) as {"pvid", "url", "qty"}, one per product.
+    All names are resolved in one batch; if any can't be, ValueError lists every miss with suggestions.
     """
-    if item_url:
-        return item_url
-    
-    if product_name:
-        key = product_name.lower().strip()
-        url = PRODUCT_CATALOG.get(key)
-        
-        if not url:
-            available = ", ".join(PRODUCT_CATALOG.keys())
-            raise ValueError(
-                f"Product '{product_name}' not found in catalog. "
-                f"Available products: {available}"
-            )
-        
-        return url
-    
-    raise ValueError("Either product_name or item_url must be provided")
+    wanted: list[tuple[dict, int]] = []
+    for item in raw_items or []:
+        if not isinstance(item, dict):
+            continue
+        qty_raw = item.get("quantity", 1)
+        try:
+            qty = int(qty_raw)
+        except Exception:
+            qty = 1
+        if qty < 1:
+            continue
+        if not item.get("item_url") and not item.get("product_name"):
+            raise ValueError("Either product_name or item_url must be provided for every item")
+        wanted.append((item, qty))
+
+    names = [item["product_name"] for item, _ in wanted if not item.get("item_url")]
+    results = iter(resolve_names(names))
+    resolved_items: list[dict] = []
+    misses: list[dict] = []
+    for item, qty in wanted:
+        if item.get("item_url"):
+            resolved_items.append({"url": item["item_url"], "qty": qty})
+            continue
+        result = next(results)
+        if result["resolved"]:
+            resolved_items.append({"url": result["url"], "qty": qty})
+        else:
+            misses.append(result)
+    if misses:
+        raise ValueError(
+            f"Could not match {len(misses)} of {len(wanted)} item(s) to the catalog - nothing was ordered. "
+            f"Fix these names and call again with the full item list:\n{describe_unresolved(misses)}"
+        )
+    return merge_order_items(resolved_items)
+
+
+# Optional argument of the long-running order tools
+BACKGROUND_ARG = {
+    "type": "boolean",
+    "description": (
+        "Return an order job handle immediately and run the flow in the background. "
+        "Poll get_order_status for the live step, timing and result; stop_order cancels it."
+    ),
+    "default": False
+}
+
+
+# The tool list doesn't depend on the catalog (search_catalog and the
+# catalog resource handle discovery), so it is built once per process
+_tool_list: list[types.Tool] = None
 
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """List available tools"""
+    global _tool_list
+    if _tool_list is None:
+        _tool_list = build_tool_list()
+    return _tool_list
+
+
+def build_tool_list() -> list[types.Tool]:
     return [
         types.Tool(
             name="start_zepto_order",
@@ -387,9 +433,10 @@ async def handle_list_tools() -> list[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "background": BACKGROUND_ARG,
                     "product_name": {
                         "type": "string",
-                        "description": "Name of the product to order (e.g., 'iced americano'). Available products: " + ", ".join(PRODUCT_CATALOG.keys())
+                        "description": "Name of the product to order (e.g., 'iced americano'). Use search_catalog to look up names you're unsure of."
                     },
                     "item_url": {
                         "type": "string",
@@ -408,12 +455,52 @@ async def handle_list_tools() -> list[types.Tool]:
                 }
             }
         ),
+        types.Tool(
+            name="search_catalog",
+            description=(
+                "Searches the Zepto product catalog by name. Use it to find the exact product_name before ordering "
+                "when you're unsure of it. Returns one page of names; call again with next offset for more."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Words of the product name (typos are fine). Empty lists the whole catalog alphabetically."
+                    },
+                    "match": {
+                        "type": "string",
+                        "enum": ["fuzzy", "prefix"],
+                        "description": "'fuzzy' ranks by similarity (default); 'prefix' lists names starting with query alphabetically",
+                        "default": "fuzzy"
+                    },
+                    "offset": {"type": "integer", "default": 0, "minimum": 0},
+                    "limit": {"type": "integer", "default": 20, "minimum": 1, "maximum": MAX_PAGE_SIZE}
+                }
+            }
+        ),
+        types.Tool(
+            name="get_product_info",
+            description=(
+                "Shows a product's catalog entry and its last seen price and stock state per delivery address "
+                "(from recent orders), without opening a browser."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "product": {"type": "string", "description": "Product name, Zepto product URL or pvid"},
+                    "address": {"type": "string", "description": "Only show stock for this delivery address (optional)"}
+                },
+                "required": ["product"]
+            }
+        ),
         types.Tool(
             name="submit_login_otp",
             description="Submits the login OTP received via SMS",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "background": BACKGROUND_ARG,
                     "otp": {
                         "type": "string",
                         "description": "6-digit OTP code"
@@ -449,7 +536,13 @@ async def handle_list_tools() -> list[types.Tool]:
             description="Stops and resets the current order process. Use this when user clicks stop or wants to cancel/restart the order.",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "full_teardown": {
+                        "type": "boolean",
+                        "description": "Close the browser completely instead of keeping it warm for the next order",
+                        "default": False
+                    }
+                }
             }
         ),
         types.Tool(
@@ -462,6 +555,7 @@ async def handle_list_tools() -> list[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "background": BACKGROUND_ARG,
                     "items": {
                         "type": "array",
                         "description": (
@@ -473,7 +567,7 @@ async def handle_list_tools() -> list[types.Tool]:
                             "properties": {
                                 "product_name": {
                                     "type": "string",
-                                    "description": "Product name, e.g. 'mac and cheese', 'angoori gulab jamun', 'iced americano'"
+                                    "description": "Product name, e.g. 'mac and cheese', 'angoori gulab jamun', 'iced americano' (see search_catalog)"
                                 },
                                 "item_url": {
                                     "type": "string",
@@ -502,6 +596,50 @@ async def handle_list_tools() -> list[types.Tool]:
                 "required": ["items"]
             }
         ),
+        types.Tool(
+            name="quick_order",
+            description=(
+                "Places a whole Zepto order in ONE call when the saved login is still valid: "
+                "reuses the session, keeps matching items already in the cart, pays from the Zepto wallet "
+                "and returns the receipt. Prefer this over start_zepto_order / start_zepto_multi_order. "
+                "If a login OTP, an out-of-stock decision or a different payment method is needed, "
+                "it stops and says which tool continues the order."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "background": BACKGROUND_ARG,
+                    "items": {
+                        "type": "array",
+                        "description": "Items to order, each with a product_name (matching the catalog) or item_url, plus an optional quantity.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "product_name": {"type": "string"},
+                                "item_url": {"type": "string"},
+                                "quantity": {"type": "integer", "default": 1, "minimum": 1}
+                            }
+                        }
+                    },
+                    "phone_number": {
+                        "type": "string",
+                        "description": "Phone number, only used if the saved login has expired (defaults to ZEPTO_PHONE_NUMBER)",
+                        "default": os.getenv("ZEPTO_PHONE_NUMBER", "")
+                    },
+                    "address": {
+                        "type": "string",
+                        "description": "Delivery address name (defaults to ZEPTO_DEFAULT_ADDRESS)",
+                        "default": os.getenv("ZEPTO_DEFAULT_ADDRESS", "")
+                    },
+                    "pay_on_delivery": {
+                        "type": "boolean",
+                        "description": "Fall back to Pay on Delivery when the wallet can't cover the order (default false: stop instead)",
+                        "default": False
+                    }
+                },
+                "required": ["items"]
+            }
+        ),
         types.Tool(
             name="handle_stock_decision",
             description=(
@@ -511,6 +649,7 @@ async def handle_list_tools() -> list[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "background": BACKGROUND_ARG,
                     "decision": {
                         "type": "string",
                         "enum": ["cancel", "proceed_with_remaining", "replace_items"],
@@ -541,12 +680,173 @@ async def handle_list_tools() -> list[types.Tool]:
         )
     ]
 
+def search_catalog(query: str = "", match: str = "fuzzy", offset: int = 0, limit: int = 20) -> str:
+    """search_catalog tool: one page of matching product names."""
+    try:
+        page = browse_catalog(query or "", match, offset, limit)
+    except (TypeError, ValueError) as e:
+        return f"❌ Invalid search: {e}"
+    if not page["items"]:
+        return f"No products match '{query}'." if query else "The catalog is empty."
+    first = int(offset or 0) + 1
+    heading = f"Products matching '{query}'" if query else "Catalog"
+    # A fuzzy total only counts the ranked window, so it is open-ended while there are more pages
+    ranked = match != "prefix" and query and page["next_offset"] is not None
+    total = f"{page['total']}+" if ranked else page["total"]
+    lines = [f"{heading} ({first}-{first + len(page['items']) - 1} of {total}):"]
+    for item in page["items"]:
+        lines.append(f"- {item['name']}" + (f" ({item['score']:.2f})" if "score" in item else ""))
+    if page["next_offset"] is not None:
+        lines.append(f"More: call search_catalog again with offset={page['next_offset']}.")
+    return "\n".join(lines)
+
+
+def get_product_info(product: str, address: str = None) -> str:
+    """get_product_info tool: catalog record plus what recent page visits saw."""
+    if not product:
+        return "❌ Give a product name, URL or pvid."
+    info = product_info(product)
+    if not info:
+        return f"❌ '{product}' doesn't match a catalog product. Try search_catalog."
+    lines = [f"📦 {', '.join(info['names']) or info['pvid']}", f"   pvid: {info['pvid']}"]
+    if info["url"]:
+        lines.append(f"   url: {info['url']}")
+    entries = [e for e in info["stock"] if not address or address_matches(address, e["address"])]
+    seen_name = next((e["name"] for e in entries if e["name"]), None)
+    if seen_name:
+        lines.append(f"   shown as: {seen_name}")
+    if entries:
+        lines.append("   Last seen:")
+        lines += [f"   - {stock_cache().describe(entry)}" for entry in entries]
+    else:
+        where = f" at {address}" if address else ""
+        lines.append(f"   No recent stock information{where} (it's recorded whenever an order visits the product page).")
+    return "\n".join(lines)
+
+
+CATALOG_RESOURCE = "catalog://products"
+
+
+@server.list_resources()
+async def handle_list_resources() -> list[types.Resource]:
+    return [
+        types.Resource(
+            uri=CATALOG_RESOURCE,
+            name="Zepto product catalog",
+            description=(
+                "Product names, alphabetically, one page per read. "
+                f"Query parameters: q, match (fuzzy|prefix), offset, limit (max {MAX_PAGE_SIZE})."
+            ),
+            mimeType="application/json",
+        )
+    ]
+
+
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> list[types.ResourceTemplate]:
+    return [
+        types.ResourceTemplate(
+            uriTemplate=CATALOG_RESOURCE + "{?q,match,offset,limit}",
+            name="Zepto product catalog search",
+            description="One page of catalog names matching q (fuzzy by default, or match=prefix).",
+            mimeType="application/json",
+        )
+    ]
+
+
+@server.read_resource()
+async def handle_read_resource(uri) -> str:
+    """catalog://products[?q=&match=&offset=&limit=] as {"items", "total", "next_offset"}."""
+    parsed = urlparse(str(uri))
+    if f"{parsed.scheme}://{parsed.netloc}{parsed.path}" != CATALOG_RESOURCE:
+        raise ValueError(f"Unknown resource: {uri}")
+    params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    page = browse_catalog(
+        params.get("q", ""),
+        params.get("match", "prefix" if not params.get("q") else "fuzzy"),
+        int(params.get("offset", 0)),
+        int(params.get("limit", 20)),
+    )
+    return json.dumps(page)
+
+
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict | None
 ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    """Handle tool execution"""
-    
+    """Handle tool execution; the long-running order tools report progress while they work."""
+    if name not in PROGRESS_TOOLS:
+        return await dispatch_tool(name, arguments)
+    if (arguments or {}).get("background"):
+        return [types.TextContent(type="text", text=start_order_job(name, arguments))]
+    return await run_order_inline(name, arguments)
+
+
+async def run_order_inline(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Run an order tool within its call, in a task tracked like a job so stop_order can wait for it."""
+    task = asyncio.create_task(run_with_progress(name, arguments, OrderProgress.for_request()))
+    call = {"id": uuid.uuid4().hex[:8], "tool": name, "task": task}
+    order_state["inline_call"] = call
+    try:
+        return await task  # Cancelling the tool call cancels the task too
+    finally:
+        if order_state.get("inline_call") is call:
+            order_state["inline_call"] = None
+
+
+async def run_with_progress(
+    name: str, arguments: dict | None, progress: "OrderProgress"
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    scope = _order_progress.set(progress)
+    try:
+        return await dispatch_tool(name, arguments)
+    except OrderCancelled:
+        return [types.TextContent(type="text", text="🛑 Order cancelled by stop_order.")]
+    finally:
+        _order_progress.reset(scope)
+
+
+def start_order_job(name: str, arguments: dict | None) -> str:
+    """Run an order tool as a background job and return its handle right away."""
+    job = order_state.get("job")
+    if job and not job["task"].done():
+        return (f"Order job {job['id']} ({job['tool']}) is still running. "
+                f"Check it with get_order_status or cancel it with stop_order.")
+    job = {
+        "id": uuid.uuid4().hex[:8],
+        "tool": name,
+        "progress": OrderProgress(),
+        "started": time.monotonic(),
+        "finished": None,
+        "result": None,
+    }
+    job["task"] = asyncio.create_task(_run_order_job(job, name, arguments))
+    _background_tasks.add(job["task"])
+    job["task"].add_done_callback(_background_tasks.discard)
+    order_state["job"] = job
+    return (f"Order job {job['id']} started ({name}). Poll get_order_status for live progress "
+            f"and the result; stop_order cancels it.")
+
+
+async def _run_order_job(job: dict, name: str, arguments: dict | None) -> None:
+    try:
+        content = await run_with_progress(name, arguments, job["progress"])
+        job["result"] = "\n".join(c.text for c in content if getattr(c, "text", None))
+    except asyncio.CancelledError:
+        job["result"] = "🛑 Cancelled"
+        raise
+    except Exception as e:
+        job["result"] = f"❌ Error: {e}"
+        print(f"❌ Order job {job['id']} failed: {e}")
+    finally:
+        job["finished"] = time.monotonic()
+
+
+async def dispatch_tool(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
     if name == "start_zepto_order":
         try:
             # Get URL from product name or direct URL
@@ -565,20 +865,23 @@ async def handle_call_tool(
             if not address:
                 return [types.TextContent(type="text", text="Error: Address is required. Set ZEPTO_DEFAULT_ADDRESS environment variable or provide it as a parameter (e.g., 'Hsr Home', 'Office New Cafe').")]
             
+            warning = stock_warning([item_url], address)
             result = await start_order(
                 item_url,
                 phone_number,
                 address
             )
-            return [types.TextContent(type="text", text=result)]
+            return [types.TextContent(type="text", text=warning + result)]
         except ValueError as e:
             return [types.TextContent(type="text", text=str(e))]
     
     elif name == "submit_login_otp":
+        stop_otp_driver()  # The tool call wins over an inline provider
         result = await submit_login(arguments.get("otp"))
         return [types.TextContent(type="text", text=result)]
     
     elif name == "submit_payment_otp":
+        stop_otp_driver()
         result = await submit_payment(arguments.get("otp"))
         return [types.TextContent(type="text", text=result)]
     
@@ -586,8 +889,17 @@ async def handle_call_tool(
         result = get_status()
         return [types.TextContent(type="text", text=result)]
     
+    elif name == "get_product_info":
+        result = get_product_info((arguments or {}).get("product", ""), (arguments or {}).get("address"))
+        return [types.TextContent(type="text", text=result)]
+    
+    elif name == "search_catalog":
+        result = search_catalog(**{k: v for k, v in (arguments or {}).items()
+                                   if k in ("query", "match", "offset", "limit")})
+        return [types.TextContent(type="text", text=result)]
+    
     elif name == "stop_order":
-        result = await stop_order()
+        result = await stop_order(full_teardown=bool((arguments or {}).get("full_teardown", False)))
         return [types.TextContent(type="text", text=result)]
     
     elif name == "start_zepto_multi_order":
@@ -596,32 +908,40 @@ async def handle_call_tool(
             if not raw_items:
                 return [types.TextContent(type="text", text="No items provided for multi-item order.")]
 
-            resolved_items: list[dict] = []
-            for item in raw_items:
-                if not isinstance(item, dict):
-                    continue
-                url = get_product_url(
-                    product_name=item.get("product_name"),
-                    item_url=item.get("item_url")
-                )
-                qty_raw = item.get("quantity", 1)
-                try:
-                    qty = int(qty_raw)
-                except Exception:
-                    qty = 1
-                if qty < 1:
-                    continue
-                resolved_items.append({"url": url, "qty": qty})
-
+            resolved_items = resolve_order_items(raw_items)
             if not resolved_items:
                 return [types.TextContent(type="text", text="No valid items found for multi-item order.")]
 
+            address = (arguments or {}).get("address") or os.getenv("ZEPTO_DEFAULT_ADDRESS") or ""
+            warning = stock_warning([item["url"] for item in resolved_items], address) if address else ""
             result = await start_multi_order(
                 resolved_items,
                 (arguments or {}).get("phone_number") or os.getenv("ZEPTO_PHONE_NUMBER") or "",
-                (arguments or {}).get("address") or os.getenv("ZEPTO_DEFAULT_ADDRESS") or ""
+                address
+            )
+            return [types.TextContent(type="text", text=warning + result)]
+        except ValueError as e:
+            return [types.TextContent(type="text", text=str(e))]
+    
+    elif name == "quick_order":
+        try:
+            resolved_items = resolve_order_items((arguments or {}).get("items", []))
+            if not resolved_items:
+                return [types.TextContent(type="text", text="No valid items found for quick order.")]
+            phone_number = (arguments or {}).get("phone_number") or os.getenv("ZEPTO_PHONE_NUMBER") or ""
+            if not phone_number:
+                return [types.TextContent(type="text", text="Error: Phone number is required. Set ZEPTO_PHONE_NUMBER environment variable in Claude Desktop config or provide it as a parameter.")]
+            address = (arguments or {}).get("address") or os.getenv("ZEPTO_DEFAULT_ADDRESS") or ""
+            if not address:
+                return [types.TextContent(type="text", text="Error: Address is required. Set ZEPTO_DEFAULT_ADDRESS environment variable or provide it as a parameter (e.g., 'Hsr Home', 'Office New Cafe').")]
+            warning = stock_warning([item["url"] for item in resolved_items], address)
+            result = await quick_order(
+                resolved_items,
+                phone_number,
+                address,
+                pay_on_delivery=bool((arguments or {}).get("pay_on_delivery", False))
             )
-            return [types.TextContent(type="text", text=result)]
+            return [types.TextContent(type="text", text=warning + result)]
         except ValueError as e:
             return [types.TextContent(type="text", text=str(e))]
     
@@ -650,7 +970,7 @@ async def clear_cart_if_needed(page) -> None:
     """
     try:
         # STEP 1: Check for notification badge
-        cart_badge = await page.query_selector('span[data-testid="cart-items-number"]')
+        cart_badge = await page.query_selector(sel("cart_badge"))
         if not cart_badge:
             print("✅ No cart badge found, cart is empty - skipping clear")
             return
@@ -665,7 +985,7 @@ async def clear_cart_if_needed(page) -> None:
         print(f"🔍 Found cart badge with {badge_count} item(s) - clearing cart...")
         
         # STEP 2: Click on cart button to open cart
-        cart_btn = await page.query_selector("button[data-testid='cart-btn']")
+        cart_btn = await page.query_selector(sel("cart_button"))
         if not cart_btn:
             print("⚠️ Cart badge found but cart button not found")
             return
@@ -673,7 +993,7 @@ async def clear_cart_if_needed(page) -> None:
         await cart_btn.click()
         # Wait for cart content to be visible (replaces fixed sleep)
         try:
-            await page.wait_for_selector("div.__6RuoF, span:has-text('Your cart is empty')", timeout=3000)
+            await page.wait_for_selector(sel("cart_loaded"), timeout=3000)
         except:
             print("⚠️ Cart content may not have loaded, but proceeding...")
             await asyncio.sleep(0.5)  # Fallback minimal wait
@@ -685,7 +1005,7 @@ async def clear_cart_if_needed(page) -> None:
         
         while True:
             # Get all line items
-            line_items = await page.query_selector_all("div.__6RuoF")
+            line_items = await page.query_selector_all(sel("cart_line_item"))
             
             if len(line_items) == 0:
                 print("✅ All line items removed from cart!")
@@ -696,7 +1016,7 @@ async def clear_cart_if_needed(page) -> None:
             # Process each line item
             for item_idx, line_item in enumerate(line_items, 1):
                 # Get quantity for this line item
-                quantity_elem = await line_item.query_selector('p[data-testid="undefined-cart-qty"]')
+                quantity_elem = await line_item.query_selector(sel("cart_item_qty"))
                 if not quantity_elem:
                     print(f"   ⚠️ Line item {item_idx}: Could not find quantity element, skipping")
                     continue
@@ -717,7 +1037,7 @@ async def clear_cart_if_needed(page) -> None:
                 clicks_made = 0
                 for click_attempt in range(max_iterations):
                     # Re-check quantity after each click
-                    quantity_elem = await line_item.query_selector('p[data-testid="undefined-cart-qty"]')
+                    quantity_elem = await line_item.query_selector(sel("cart_item_qty"))
                     if not quantity_elem:
                         # Item might have been removed
                         print(f"      ✅ Line item {item_idx}: Removed (quantity element gone)")
@@ -820,7 +1140,7 @@ async def clear_cart_if_needed(page) -> None:
             
             # After processing all items, check if cart is empty
             await asyncio.sleep(0.3)  # Reduced from 0.5s - Brief wait for DOM to update
-            line_items_after = await page.query_selector_all("div.__6RuoF")
+            line_items_after = await page.query_selector_all(sel("cart_line_item"))
             if len(line_items_after) == 0:
                 print("✅ All line items successfully removed!")
                 break
@@ -868,7 +1188,7 @@ async def clear_cart_if_needed(page) -> None:
                         await back_btn.click()
                         # Wait for cart to close using element wait
                         try:
-                            await page.wait_for_selector("button[data-testid='cart-btn']", timeout=1000)
+                            await page.wait_for_selector(sel("cart_button"), timeout=1000)
                             print("✅ Clicked back button (by cart header class structure) - cart closed")
                         except:
                             await asyncio.sleep(0.3)  # Fallback minimal wait
@@ -1027,6 +1347,159 @@ async def clear_cart_if_needed(page) -> None:
         pass
 
 
+def _cart_line_pvid(name: str, items: list[dict]) -> str:
+    """
+    pvid of a cart line from its product name: a catalog alias or product
+    slug, or the slug of one of the order's own URLs (direct links that
+    aren't in the catalog). None if it matches nothing.
+    """
+    if not name:
+        return None
+    pvid = product_store().lookup(name)
+    if pvid:
+        return pvid
+    for item in items:
+        slug = re.search(r"/pn/([^/]+)/", item["url"])
+        if slug and normalize(slug.group(1)) == normalize(name):
+            return product_key(item["url"])
+    return None
+
+
+async def _cart_line_name(line_item) -> str:
+    """Product name of a cart line: its first line of text that isn't a price, quantity or button label."""
+    text = await line_item.inner_text()
+    for row in text.splitlines():
+        row = row.strip()
+        if row and "₹" not in row and any(c.isalpha() for c in row) and row.lower() not in ("add", "remove"):
+            return row
+    return ""
+
+
+async def _cart_line_qty(line_item) -> int:
+    quantity_elem = await line_item.query_selector(sel("cart_item_qty"))
+    if not quantity_elem:
+        return 0
+    try:
+        return int((await quantity_elem.text_content()).strip())
+    except:
+        return 0
+
+
+async def _find_cart_line(page, name: str):
+    for line_item in await page.query_selector_all(sel("cart_line_item")):
+        if await _cart_line_name(line_item) == name:
+            return line_item
+    return None
+
+
+async def _set_cart_line_qty(page, name: str, target: int) -> bool:
+    """Click the cart line's +/- until it shows target (a line at 0 disappears); False if it gets stuck."""
+    for _ in range(50):
+        line_item = await _find_cart_line(page, name)
+        if not line_item:
+            return target == 0
+        qty = await _cart_line_qty(line_item)
+        if qty == target:
+            return True
+        button = await line_item.query_selector(sel("cart_item_remove" if qty > target else "cart_item_add"))
+        if not button:
+            return False
+        await button.click()
+        await asyncio.sleep(0.3)
+    return False
+
+
+async def read_cart(page) -> list[dict]:
+    """Name and quantity of every line in the open cart."""
+    lines = []
+    for line_item in await page.query_selector_all(sel("cart_line_item")):
+        lines.append({"name": await _cart_line_name(line_item), "qty": await _cart_line_qty(line_item)})
+    return lines
+
+
+async def read_cart_total(page) -> str:
+    """Amount to pay shown in the open cart's bill summary (e.g. "249"), or None."""
+    try:
+        return await page.evaluate("""
+            () => {
+                const labels = ['To Pay', 'Grand Total', 'Total Bill', 'Item Total'];
+                const leaves = Array.from(document.querySelectorAll('span, p, div')).filter(el => el.children.length === 0);
+                for (const label of labels) {
+                    for (const el of leaves) {
+                        if ((el.textContent || '').trim() !== label) continue;
+                        const row = el.parentElement && el.parentElement.parentElement;
+                        const amounts = ((row && row.textContent) || '').match(/₹\s*[\d,]+(?:\.\d+)?/g);
+                        // The last amount in the row is the payable one (struck-through MRP comes first)
+                        if (amounts) return amounts[amounts.length - 1].replace(/[^\d.]/g, '');
+                    }
+                }
+                return null;
+            }
+        """)
+    except Exception as e:
+        print(f"⚠️ Could not read the cart total: {e}")
+        return None
+
+
+async def reconcile_cart(page) -> None:
+    """
+    quick_order's alternative to clear_cart_if_needed: cart lines that belong
+    to this order are set to the wanted quantity and checkpointed as added, so
+    their product pages are never visited; every other line is removed. If a
+    line can't be adjusted the whole cart is cleared as usual.
+    """
+    items = order_state["items"] or []
+    cart_badge = await page.query_selector(sel("cart_badge"))
+    badge_text = (await cart_badge.text_content()) if cart_badge else ""
+    if not badge_text or not badge_text.strip().isdigit():
+        print("✅ Cart is empty - nothing to reconcile")
+        return
+    
+    print(f"🔍 Cart has {badge_text.strip()} item(s) - reconciling with the order...")
+    await page.click(sel("cart_button"))
+    try:
+        await page.wait_for_selector(sel("cart_loaded"), timeout=3000)
+    except:
+        await asyncio.sleep(0.5)  # Fallback minimal wait
+    
+    wanted = {product_key(item["url"]): idx for idx, item in enumerate(items, start=1)}
+    kept = []
+    for line in await read_cart(page):
+        idx = wanted.pop(_cart_line_pvid(line["name"], items), None)
+        target = items[idx - 1]["qty"] if idx else 0
+        if line["qty"] != target:
+            print(f"   🔄 {line['name'] or 'Unnamed line'}: {line['qty']} → {target}")
+            if not await _set_cart_line_qty(page, line["name"], target):
+                if idx and await _set_cart_line_qty(page, line["name"], 0):
+                    continue  # Emptied - the normal add-to-cart path adds it at the right quantity
+                print(f"⚠️ Could not adjust '{line['name']}' in the cart, clearing the cart instead")
+                await page.goto(items[0]["url"], wait_until="domcontentloaded")
+                await clear_cart_if_needed(page)
+                return
+        if idx:
+            kept.append((idx, line["name"], target))
+    
+    # Reload the product page: closes the cart drawer and refreshes the badge
+    await page.goto(items[0]["url"], wait_until="domcontentloaded")
+    successfully_added = []
+    for idx, name, qty in kept:
+        successfully_added.append({"name": name, "quantity": qty})
+        print(f"   ✅ {qty}x {name} already in the cart")
+        order_state["successfully_added"] = successfully_added
+        order_state["out_of_stock_items"] = []
+        await _complete_step(f"item:{idx}")
+    print(f"✅ Cart reconciled: {len(kept)} of {len(items)} item(s) already there")
+
+
+async def prepare_cart(page) -> None:
+    """Empty the cart for a new order - or, for quick_order, make it match the order."""
+    if order_state.get("quick"):
+        await reconcile_cart(page)
+    else:
+        await clear_cart_if_needed(page)
+    await _complete_step("cart_cleared")
+
+
 async def check_if_logged_in(page) -> bool:
     """Check if user is already logged in to Zepto"""
     try:
@@ -1105,7 +1578,7 @@ async def check_if_logged_in(page) -> bool:
         
         # Strategy 1: Check for login button - if it exists and is visible, user is NOT logged in
         try:
-            login_btn = await page.query_selector("span[data-testid='login-btn']")
+            login_btn = await page.query_selector(sel("login_button"))
             if login_btn:
                 is_visible = await login_btn.is_visible()
                 if is_visible:
@@ -1215,57 +1688,411 @@ async def check_if_logged_in(page) -> bool:
         return False
 
 
-async def start_order(item_url: str, phone_number: str, address: str) -> str:
-    """Start the order process"""
-    global order_state
-    
-    if order_state["status"] != "idle":
-        return f"Order already in progress. Status: {order_state['status']}"
+def use_order_handle(handle: dict) -> None:
+    """Make a launcher handle the order's browser and put the watchdog on it."""
+    order_state["browser"] = handle["browser"]  # Persistent context or regular browser
+    order_state["page"] = handle["page"]
+    order_state["context"] = handle["context"] if handle["persistent"] else None
+    browser_watchdog.attach(handle)
+
+
+async def open_login_otp_form(page, phone_number: str) -> None:
+    """Open the login modal, enter the phone number and continue - Zepto sends the OTP."""
+    # Click login
+    await page.click(sel("login_button"))
+    await page.wait_for_selector("input[placeholder='Enter Phone Number']", timeout=3000)  # Reduced from 5000ms
     
-    order_state["status"] = "starting"
-    order_state["phone_number"] = phone_number
-    order_state["item_url"] = item_url
-    order_state["items"] = None
-    order_state["address"] = address
+    # Enter phone number
+    await page.fill("input[placeholder='Enter Phone Number']", phone_number)
+    await asyncio.sleep(0.2)  # Reduced from 0.5s
     
-    # CRITICAL: Close any existing context/browser before starting new order
-    # This ensures we always load from saved directory, not a cancelled session
-    if order_state.get("context"):
-        print("🔄 Closing existing context to start fresh from saved directory...")
+    # Click Continue - the OTP is sent from here, so an inline code delivered since then is for this login
+    order_state["otp_sent_at"]["login"] = time.time()
+    await page.click("button:has-text('Continue')")
+    await page.wait_for_selector('input[type="text"][inputmode="numeric"]', timeout=3000)  # Reduced from 5000ms
+
+
+async def park_order_browser() -> None:
+    """Idle-timer callback: free the browser while the human finds the login OTP."""
+    handle = browser_watchdog.handle
+    if order_state["status"] not in PARKABLE_STATUSES or not handle:
+        return
+    await browser_watchdog.close()  # Expected close, and drops the hot spare too
+    await session_parker.park(handle, status=order_state["status"])
+    order_state["browser"] = None
+    order_state["page"] = None
+    order_state["context"] = None
+
+
+async def revive_parked_browser() -> None:
+    """
+    Reopen a parked order browser. The OTP form's in-page state is gone, so
+    unless the restored session is already logged in the form is filled again,
+    which makes Zepto send a fresh OTP; the code the user just gave is tried first.
+    """
+    handle = await session_parker.revive(order_state["playwright"])
+    use_order_handle(handle)
+    page = handle["page"]
+    if await check_if_logged_in(page):
+        order_state["status"] = "adding_to_cart"
+        return
+    await open_login_otp_form(page, order_state["phone_number"])
+    order_state["otp_resent"] = True
+
+
+_order_progress: contextvars.ContextVar = contextvars.ContextVar("order_progress", default=None)
+
+
+class OrderCancelled(asyncio.CancelledError):
+    """
+    Raised at a step boundary after stop_order. A CancelledError so the flow's
+    broad `except Exception` fallbacks don't swallow it.
+    """
+
+
+def check_cancelled() -> None:
+    if order_state.get("cancel_requested"):
+        print("🛑 Stopping the order at a step boundary (stop_order)")
+        raise OrderCancelled()
+
+
+async def cancel_running_order() -> None:
+    """
+    Ask the running order flows (a background job, a tool call running
+    inline, the inline OTP driver) to stop at their next step boundary, and return once they have
+    exited. Each gets JOB_CANCEL_GRACE_SECONDS to get there before it is
+    cancelled outright.
+    """
+    order_state["cancel_requested"] = True
+    driver = order_state.get("otp_driver")
+    runs = [order_state.get("job"), order_state.get("inline_call"),
+            {"id": "inline OTPs", "tool": "OTP driver", "task": driver} if driver else None]
+    for run in runs:
+        task = run["task"] if run else None
+        if not task or task.done() or task is asyncio.current_task():
+            continue
+        print(f"🛑 Asking {run['tool']} ({run['id']}) to stop at the next step...")
+        # asyncio.wait never raises the task's own error or cancellation; its caller gets those
+        await asyncio.wait({task}, timeout=JOB_CANCEL_GRACE_SECONDS)
+        if not task.done():
+            print(f"⚠️ {run['tool']} ({run['id']}) didn't reach a step boundary in {JOB_CANCEL_GRACE_SECONDS}s, cancelling it")
+            task.cancel()
+            await asyncio.wait({task})
+
+
+class OrderProgress:
+    """
+    Progress of the order behind one tool call: every milestone becomes an MCP
+    progress notification (when the client sent a progressToken) and a stderr
+    line, with the elapsed time and an estimate of the time left.
+    """
+
+    def __init__(self, session=None, token=None):
+        self.session = session
+        self.token = token
+        self.started = self.last = time.monotonic()
+        self.reached = {"browser_ready"} if order_state.get("page") else set()
+        self.last_message = None
+
+    @classmethod
+    def for_request(cls) -> "OrderProgress":
         try:
-            await order_state["context"].close()
-        except:
-            pass
-        order_state["context"] = None
-    
-    if order_state.get("browser"):
-        print("🔄 Closing existing browser...")
+            ctx = server.request_context
+        except LookupError:
+            return cls()
+        token = getattr(ctx.meta, "progressToken", None) if ctx.meta else None
+        return cls(ctx.session, token)
+
+    def milestones(self) -> list[str]:
+        count = len(order_state["items"]) if order_state["items"] else 1
+        return (["browser_ready", "logged_in", "cart_cleared", "address_selected"]
+                + [f"item:{idx}" for idx in range(1, count + 1)]
+                + ["checkout_started", "done"])
+
+    def label(self, step: str) -> str:
+        if step.startswith("item:"):
+            count = len(order_state["items"]) if order_state["items"] else 1
+            return f"Item {step.split(':')[1]}/{count} handled"
+        return {
+            "browser_ready": "Browser ready",
+            "logged_in": "Logged in",
+            "cart_cleared": "Cart ready",
+            "address_selected": "Address selected",
+            "checkout_started": "On the payment page",
+            "done": "Order placed",
+        }.get(step, step)
+
+    async def report(self, step: str) -> None:
+        now = time.monotonic()
+        kind = step.split(":")[0]
+        if kind in STEP_SECONDS and step not in self.reached and now - self.last > 0.2:
+            # Milestones skipped through (resume, reconciled cart) take ~0s and would skew the estimate
+            STEP_SECONDS[kind] = round(0.7 * STEP_SECONDS[kind] + 0.3 * (now - self.last), 2)
+        self.last = now
+        self.reached.add(step)
+
+        milestones = self.milestones()
+        reached = self.reached | set(order_state["completed_steps"])
+        done = [m for m in milestones if m in reached]
+        remaining = sum(STEP_SECONDS[m.split(":")[0]] for m in milestones if m not in reached)
+        message = f"{self.label(step)} - {now - self.started:.0f}s elapsed, ~{remaining:.0f}s left"
+        self.last_message = message
+        print(f"⏱️ {message}")
+        if self.session is None or self.token is None:
+            return
         try:
-            await order_state["browser"].close()
-        except:
-            pass
-        order_state["browser"] = None
-    
-    if order_state.get("playwright"):
-        print("🔄 Stopping existing playwright...")
+            try:
+                await self.session.send_progress_notification(self.token, len(done), total=len(milestones), message=message)
+            except TypeError:
+                # mcp releases before progress messages
+                await self.session.send_progress_notification(self.token, len(done), total=len(milestones))
+        except Exception as e:
+            print(f"⚠️ Could not send progress notification: {e}")
+
+
+async def report_progress(step: str) -> None:
+    """Report an order milestone to the tool call that is running it, if any."""
+    progress = _order_progress.get()
+    if progress:
+        await progress.report(step)
+
+
+def otp_request(kind: str) -> str:
+    """What to tell the caller when the flow needs a kind OTP."""
+    if order_state.get("otp_driver"):
+        return (f"Waiting for the {kind} OTP on {otp_provider.describe()} - the order continues on its own. "
+                f"submit_{kind}_otp also works; check progress with get_order_status.")
+    return f"Please provide the {kind} OTP."
+
+
+def start_otp_driver() -> None:
+    """With an inline OTP provider, run the rest of the order in the background."""
+    if not otp_provider.inline or order_state["status"] not in OTP_STATUSES:
+        return
+    if order_state.get("otp_driver") and not order_state["otp_driver"].done():
+        return
+    task = asyncio.create_task(drive_order_with_otps())
+    order_state["otp_driver"] = task
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def stop_otp_driver() -> None:
+    task = order_state.get("otp_driver")
+    if task and not task.done() and task is not asyncio.current_task():
+        task.cancel()
+    order_state["otp_driver"] = None
+
+
+async def drive_order_with_otps() -> None:
+    """
+    Await each OTP the order stops for from the inline provider and feed it
+    to the same code the submit tools use, until the order completes or
+    needs a decision only a person can make (out of stock). Hands back to
+    the tool path on timeout or when a submit tool is called meanwhile.
+    """
+    _order_progress.set(None)  # The tool call that started this task has already returned
+    try:
+        while order_state["status"] in OTP_STATUSES:
+            status = order_state["status"]
+            kind = OTP_STATUSES[status]
+            # A code that arrived between the OTP being sent and this wait is still for this step
+            since = order_state["otp_sent_at"].get(kind) or time.time()
+            try:
+                otp = await otp_provider.wait(
+                    kind,
+                    timeout=get_otp_timeout(),
+                    since=since,
+                    still_waiting=lambda: order_state["status"] == status and not order_state["cancel_requested"],
+                )
+            except OSError as e:
+                print(f"⚠️ {otp_provider.name} OTP provider unavailable ({e}), waiting for the tool call")
+                return
+            if not otp:
+                return
+            print(f"🔑 Submitting {kind} OTP from {otp_provider.name} provider")
+            if kind == "login":
+                result = await submit_login(otp)
+            else:
+                result = await submit_payment(otp)
+            order_state["last_result"] = result
+            print(f"📦 {result}")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        order_state["last_result"] = f"Error: {e}"
+        print(f"❌ Order stopped while running on its own: {e}")
+    finally:
+        if order_state.get("otp_driver") is asyncio.current_task():
+            order_state["otp_driver"] = None
+
+
+def order_urls() -> list[str]:
+    if order_state["items"]:
+        return [item["url"] for item in order_state["items"]]
+    return [order_state["item_url"]] if order_state["item_url"] else []
+
+
+async def prefetch_product(context, url: str, limit: asyncio.Semaphore) -> dict:
+    """
+    Load a product page in a side tab and record its stock state and the
+    delivery address it was checked for. A fresh stock table entry for the
+    order's address (e.g. from the stock refresher) stands in for the page.
+    """
+    cached = stock_cache().get(product_key(url), order_state["address"]) if order_state["address"] else None
+    # Only a fresh, known stock state skips the page; a stale one is checked again
+    if cached and cached["in_stock"] is not None and stock_cache().fresh(cached):
+        return {"pvid": cached["pvid"], "url": url, "in_stock": cached["in_stock"],
+                "name": cached["name"] or "this product", "address": cached["address"]}
+    async with limit:
+        page = await context.new_page()
         try:
-            await order_state["playwright"].stop()
+            await page.goto(url, wait_until="domcontentloaded")
+            try:
+                await page.wait_for_selector(sel("add_or_notify"), timeout=5000)
+            except:
+                pass
+            in_stock, name = await check_product_stock(page)
+            try:
+                address = (await page.inner_text(sel("address_header"), timeout=1000)).strip()
+            except:
+                address = None
+            return {"pvid": product_key(url), "url": url, "in_stock": in_stock, "name": name, "address": address}
+        finally:
+            await page.close()
+
+
+def plan_order(context) -> StepGraph:
+    """
+    Start the work that doesn't need the login OTP: every product page is
+    loaded and stock-checked in side tabs while we wait for the human (or,
+    when already logged in, while the main tab clears the cart and picks the
+    address). The add-to-cart loop then only revisits in-stock products, on a
+    warm cache. Cart and address work need the login, so they stay behind
+    the "login" gate in submit_login.
+    """
+    graph = StepGraph("order")
+    graph.gate("login")
+    limit = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    for idx, url in enumerate(order_urls(), start=1):
+        graph.add(f"product:{idx}", lambda url=url: prefetch_product(context, url, limit))
+    graph.start()
+    return graph
+
+
+async def prefetched_product(idx: int) -> dict:
+    """
+    Prefetch result for the idx-th product, or None if there is none yet or
+    it can't be trusted: stock is per store, so it only counts if the page
+    was checked for the address this order delivers to.
+    """
+    plan = order_state.get("plan")
+    if not plan:
+        return None
+    result = await plan.result(f"product:{idx}", timeout=PREFETCH_WAIT_SECONDS)
+    if not result or not result["address"] or not order_state["address"]:
+        return None
+    if order_state["address"].lower() not in result["address"].lower():
+        return None
+    return result
+
+
+def drop_order_plan() -> None:
+    plan = order_state.get("plan")
+    if plan:
+        plan.cancel()
+        print(plan.summary())
+    order_state["plan"] = None
+
+
+def single_item_out_of_stock(product_name: str) -> str:
+    """Put a single-item order on hold for the user's out-of-stock decision."""
+    order_state["status"] = "waiting_stock_decision"
+    order_state["out_of_stock_items"] = [{
+        "name": product_name,
+        "url": order_state["item_url"],
+        "quantity": 1,
+        "index": 1
+    }]
+    return (
+        f"⚠️ OUT OF STOCK: The product '{product_name}' is currently out of stock.\n\n"
+        f"Please choose one of the following options:\n"
+        f"1. Cancel the order\n"
+        f"2. Order a different product instead\n\n"
+        f"Use the 'handle_stock_decision' tool to proceed."
+    )
+
+
+async def launch_order_browser() -> dict:
+    """
+    Launch the browser for an order through the shared BrowserLauncher and
+    store it in order_state. The launcher tries the strategy that last worked
+    on this host first, so repeat failures don't cost a timeout per order.
+    """
+    p = await async_playwright().start()
+    try:
+        handle = await browser_launcher.launch(p, headless=False)
+    except Exception:
+        await p.stop()
+        order_state["playwright"] = None
+        order_state["status"] = "idle"  # Let the next order retry instead of reporting "in progress"
+        raise
+
+    order_state["playwright"] = p
+    use_order_handle(handle)
+    order_state["launch"] = {"strategy": handle["strategy"], "seconds": handle["launch_s"]}
+    browser_watchdog.warm_spare(p)
+
+    if handle["persistent"]:
+        # Quick check: if persistent context exists, check for cookies immediately
+        try:
+            initial_cookies = await handle["context"].cookies()
+            zepto_cookies = [c for c in initial_cookies if "zeptonow" in c.get("domain", "").lower() and c.get("value")]
+            if zepto_cookies:
+                print(f"🔍 Found {len(zepto_cookies)} zeptonow.com cookies - login session saved!")
+            else:
+                print(f"⚠️ No Zepto cookies found. Run 'python3 setup_firefox_login.py' to save your login.")
         except:
             pass
-        order_state["playwright"] = None
+    else:
+        print(f"ℹ️ Launched {handle['strategy']} without a persistent profile (no session saved)")
+    await report_progress("browser_ready")
+    check_cancelled()
+    return handle
+
+
+async def start_order(item_url: str, phone_number: str, address: str) -> str:
+    """Start the order process"""
+    global order_state
     
-    # CRITICAL: Wait to ensure everything is fully closed before launching new browser
-    # This prevents "has been closed" errors from directory locks
-    # Reduced from 2.0s to 1.0s for faster startup
-    await asyncio.sleep(1.0)
-    print("✅ Previous browser instances closed, ready to launch new browser")
+    if order_state["status"] != "idle":
+        return f"Order already in progress. Status: {order_state['status']}"
+    
+    order_state["status"] = "starting"
+    order_state["phone_number"] = phone_number
+    order_state["item_url"] = item_url
+    order_state["items"] = None
+    order_state["address"] = address
+    order_state["completed_steps"] = []
+    order_state["last_result"] = None
+    order_state["quick"] = None
+    order_state["cart_total"] = None
+    order_state["cancel_requested"] = False
+    drop_order_plan()
+    
+    # Reuse the browser the last order left warm; otherwise close whatever is
+    # left so the launch loads fresh from the saved directory
+    warm_handle = await reuse_warm_browser()
+    if not warm_handle:
+        await teardown_order_browser()
+        # No fixed wait needed: the launcher's ProfileLease waits only as long as the
+        # previous browser process actually takes to release the profile
+        print("✅ Previous browser instances closed, ready to launch new browser")
     
     # Launch browser with persistent context to save login session
-    p = await async_playwright().start()
-    import os
     # Use absolute path to ensure consistency with setup_firefox_login.py
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    user_data_dir = os.path.join(script_dir, "zepto_firefox_data")
+    user_data_dir = browser_launcher.profile_dir()
     
     # Debug: Show paths (important for Claude Desktop)
     print(f"📂 Script directory: {script_dir}")
@@ -1273,221 +2100,24 @@ async def start_order(item_url: str, phone_number: str, address: str) -> str:
     print(f"📂 Current working directory: {os.getcwd()}")
     print(f"🔄 Starting fresh session from saved directory: {user_data_dir}")
     
-    # Check if persistent context directory exists and has files
+    # Check if persistent context directory exists (cached metadata - no walk over the profile)
     if os.path.exists(user_data_dir):
-        # Check if directory has files (especially Default folder with cookies)
-        default_dir = os.path.join(user_data_dir, "Default")
-        cookie_file = os.path.join(default_dir, "Cookies") if os.path.exists(default_dir) else None
-        
-        file_count = sum(len(files) for _, _, files in os.walk(user_data_dir))
+        profile_meta = profile_janitor.metadata()
         print(f"✅ Found existing persistent context: {user_data_dir}")
-        print(f"   - Contains {file_count} files")
-        if cookie_file and os.path.exists(cookie_file):
-            cookie_size = os.path.getsize(cookie_file)
-            print(f"   - Cookies file exists: {cookie_size} bytes")
+        print(f"   - Contains {profile_meta['file_count']} files ({profile_meta['size_mb']} MB)")
+        if profile_meta["cookie_file"]:
+            print(f"   - Cookies file exists: {profile_meta['cookie_bytes']} bytes")
         else:
             print(f"   - ⚠️ Cookies file not found (may be in different location)")
     else:
         print(f"ℹ️ Creating new persistent context: {user_data_dir}")
         os.makedirs(user_data_dir, exist_ok=True)
     
-    # PROACTIVELY clean browser data directory if locked to prevent crashes
-    if os.path.exists(user_data_dir):
-        try:
-            # Firefox uses different lock file location
-            lock_file = os.path.join(user_data_dir, "lock")
-            if os.path.exists(lock_file):
-                print(f"⚠️ Lock file detected - cleaning directory to prevent crashes...")
-                backup_dir = f"{user_data_dir}_backup_{int(time.time())}"
-                try:
-                    shutil.move(user_data_dir, backup_dir)
-                    print(f"📦 Backed up directory to: {backup_dir}")
-                except:
-                    try:
-                        shutil.rmtree(user_data_dir)
-                        print(f"🗑️ Removed locked directory")
-                    except:
-                        pass
-                os.makedirs(user_data_dir, exist_ok=True)
-        except:
-            pass
+    # Stale lock files are cleared by the launcher's ProfileLease once their owner is
+    # confirmed dead; a profile held by a live process is waited for, never discarded
     
-    try:
-        # USE FIREFOX ONLY (Chromium crashes on macOS 26.1 beta)
-        # Use Firefox persistent context to save login session
-        print(f"🚀 Launching Firefox with persistent context...")
-        try:
-            context = await asyncio.wait_for(
-                p.firefox.launch_persistent_context(
-                    user_data_dir=user_data_dir,
-                    headless=False,
-                    viewport={"width": 1280, "height": 720}
-                ),
-                timeout=30.0
-            )
-        except Exception as launch_err:
-            error_str = str(launch_err).lower()
-            # Check if browser crashed or locked
-            if "lock" in error_str or "has been closed" in error_str:
-                # Browser data directory might be locked
-                print(f"⚠️ Firefox data directory may be locked. Attempting recovery...")
-                backup_dir = f"{user_data_dir}_backup_{int(time.time())}"
-                if os.path.exists(user_data_dir):
-                    try:
-                        if os.path.exists(backup_dir):
-                            shutil.rmtree(backup_dir)
-                        shutil.move(user_data_dir, backup_dir)
-                        print(f"📦 Backed up directory to: {backup_dir}")
-                        os.makedirs(user_data_dir, exist_ok=True)
-                        print(f"✅ Created fresh Firefox data directory")
-                    except Exception as backup_err:
-                        print(f"⚠️ Could not backup directory: {backup_err}")
-                        try:
-                            shutil.rmtree(user_data_dir)
-                            os.makedirs(user_data_dir, exist_ok=True)
-                            print(f"✅ Recreated fresh Firefox data directory")
-                        except:
-                            pass
-                
-                # Retry with fresh directory
-                try:
-                    print(f"🔄 Retrying Firefox launch with fresh data directory...")
-                    context = await asyncio.wait_for(
-                        p.firefox.launch_persistent_context(
-                            user_data_dir=user_data_dir,
-                            headless=False,
-                            viewport={"width": 1280, "height": 720}
-                        ),
-                        timeout=30.0
-                    )
-                    print(f"✅ Firefox launched successfully with fresh data directory")
-                except Exception as retry_err:
-                    print(f"❌ Firefox still fails: {retry_err}")
-                    raise Exception(f"Firefox cannot launch. Try running: python3 setup_firefox_login.py to set up login first")
-            else:
-                raise
-        
-        pages = context.pages
-        if pages:
-            page = pages[0]
-        else:
-            page = await context.new_page()
-        
-        print(f"✅ Firefox persistent context loaded successfully")
-        
-        # Quick check: if persistent context exists, check for cookies immediately
-        try:
-            initial_cookies = await context.cookies()
-            if initial_cookies:
-                zepto_cookies = [c for c in initial_cookies if "zeptonow" in c.get("domain", "").lower() and c.get("value")]
-                if zepto_cookies:
-                    print(f"🔍 Found {len(zepto_cookies)} zeptonow.com cookies in Firefox - login session saved!")
-                else:
-                    print(f"⚠️ No Zepto cookies found. Run 'python3 setup_firefox_login.py' to save your login.")
-        except:
-            pass
-        
-        order_state["browser"] = context  # Store context instead of browser
-        order_state["page"] = page
-        order_state["playwright"] = p
-        order_state["context"] = context
-    except Exception as e:
-        # ANY error with persistent context - immediately try regular browser
-        # This is more reliable than trying to detect specific crash types
-        error_str = str(e).lower()
-        print(f"⚠️ Persistent context failed: {e}")
-        print(f"🔄 Switching to regular browser (no session saved, but more stable)...")
-        
-        try:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
-            order_state["browser"] = browser
-            order_state["page"] = page
-            order_state["playwright"] = p
-            order_state["context"] = None
-            print(f"✅ Regular Chromium browser launched successfully")
-        except Exception as fallback_err:
-            error_str = str(fallback_err).lower()
-            # If Chromium crashes, try Firefox with persistent context as fallback
-            if "segv" in error_str or "crash" in error_str or "signal 11" in error_str or "targetclosederror" in error_str or "has been closed" in error_str:
-                print(f"⚠️ Chromium crashes - trying Firefox with persistent context (saves login)...")
-                try:
-                    # Use Firefox persistent context to save login session
-                    firefox_data_dir = user_data_dir.replace("zepto_browser_data", "zepto_firefox_data")
-                    
-                    # Clean Firefox data directory if locked
-                    if os.path.exists(firefox_data_dir):
-                        try:
-                            lock_file = os.path.join(firefox_data_dir, "lock")
-                            if os.path.exists(lock_file):
-                                print(f"⚠️ Firefox lock file detected - cleaning...")
-                                backup_dir = f"{firefox_data_dir}_backup_{int(time.time())}"
-                                try:
-                                    shutil.move(firefox_data_dir, backup_dir)
-                                    print(f"📦 Backed up Firefox directory")
-                                except:
-                                    try:
-                                        shutil.rmtree(firefox_data_dir)
-                                    except:
-                                        pass
-                                os.makedirs(firefox_data_dir, exist_ok=True)
-                        except:
-                            pass
-                    else:
-                        os.makedirs(firefox_data_dir, exist_ok=True)
-                    
-                    # Launch Firefox with persistent context
-                    firefox_context = await asyncio.wait_for(
-                        p.firefox.launch_persistent_context(
-                            user_data_dir=firefox_data_dir,
-                            headless=False,
-                            viewport={"width": 1280, "height": 720}
-                        ),
-                        timeout=30.0
-                    )
-                    
-                    pages = firefox_context.pages
-                    if pages:
-                        page = pages[0]
-                    else:
-                        page = await firefox_context.new_page()
-                    
-                    # Store Firefox context (similar to Chromium persistent context)
-                    order_state["browser"] = firefox_context
-                    order_state["page"] = page
-                    order_state["playwright"] = p
-                    order_state["context"] = firefox_context
-                    print(f"✅ Firefox browser launched with persistent context (login will be saved)")
-                    
-                    # Check for existing cookies
-                    try:
-                        initial_cookies = await firefox_context.cookies()
-                        if initial_cookies:
-                            zepto_cookies = [c for c in initial_cookies if "zeptonow" in c.get("domain", "").lower() and c.get("value")]
-                            if zepto_cookies:
-                                print(f"🔍 Found {len(zepto_cookies)} zeptonow.com cookies in Firefox - session saved!")
-                    except:
-                        pass
-                        
-                except Exception as firefox_err:
-                    # If Firefox persistent context fails, try regular Firefox
-                    print(f"⚠️ Firefox persistent context failed: {firefox_err}, trying regular Firefox...")
-                    try:
-                        browser = await p.firefox.launch(headless=False)
-                        page = await browser.new_page()
-                        order_state["browser"] = browser
-                        order_state["page"] = page
-                        order_state["playwright"] = p
-                        order_state["context"] = None
-                        print(f"✅ Firefox browser launched (no session saved)")
-                    except Exception as firefox_fallback_err:
-                        await p.stop()
-                        order_state["playwright"] = None
-                        raise Exception(f"Both Chromium and Firefox failed to launch.\nChromium error: {fallback_err}\nFirefox error: {firefox_fallback_err}\n\nTroubleshooting:\n1. Close ALL browser windows\n2. Restart your Mac\n3. Reinstall Playwright: python3 -m playwright install chromium firefox")
-            else:
-                await p.stop()
-                order_state["playwright"] = None
-                raise Exception(f"Browser cannot launch. Error: {fallback_err}\n\nTroubleshooting:\n1. Close ALL Chrome/Chromium windows\n2. Restart your Mac\n3. Reinstall Playwright: python3 -m playwright install chromium\n4. Check system logs for crash details")
+    handle = warm_handle or await launch_order_browser()
+    page = handle["page"]
     
     # If using persistent context and directory has files, assume logged in and try to proceed
     # (More aggressive approach for Claude Desktop where we can't see debug output)
@@ -1495,20 +2125,21 @@ async def start_order(item_url: str, phone_number: str, address: str) -> str:
     if persistent_context_exists:
         # Check if directory has files
         try:
-            has_files = os.path.exists(user_data_dir) and any(os.scandir(user_data_dir))
+            profile_dir = handle["user_data_dir"]
+            has_files = os.path.exists(profile_dir) and any(os.scandir(profile_dir))
             if has_files:
                 print("✅ Persistent context found with files - assuming logged in, proceeding directly...")
                 # Navigate directly to product and try to proceed
                 await page.goto(item_url, wait_until="domcontentloaded")  # Changed from networkidle
                 # No sleep needed - wait for specific element instead
                 try:
-                    await page.wait_for_selector("button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart')", timeout=1000)
+                    await page.wait_for_selector(sel("add_to_cart_any"), timeout=1000)
                 except:
                     pass  # Element might not be present yet, continue
                 
                 # Try to check if login button is visible (quick check)
                 try:
-                    login_btn = await page.query_selector("span[data-testid='login-btn']")
+                    login_btn = await page.query_selector(sel("login_button"))
                     if login_btn and await login_btn.is_visible(timeout=1000):
                         # Login button visible, need to log in
                         print("⚠️ Login button found - session may have expired, proceeding with login...")
@@ -1559,7 +2190,7 @@ async def start_order(item_url: str, phone_number: str, address: str) -> str:
     await page.goto(item_url, wait_until="domcontentloaded")
     # No sleep needed - wait for specific element instead
     try:
-        await page.wait_for_selector("button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart')", timeout=1000)
+        await page.wait_for_selector(sel("add_to_cart_any"), timeout=1000)
     except:
         pass  # Element might not be present yet, continue
     
@@ -1575,25 +2206,18 @@ async def start_order(item_url: str, phone_number: str, address: str) -> str:
     # Not logged in, proceed with login flow
     print("🔐 Not logged in, starting login flow...")
     
-    # Click login
-    await page.click("span[data-testid='login-btn']")
-    await page.wait_for_selector("input[placeholder='Enter Phone Number']", timeout=3000)  # Reduced from 5000ms
-    
-    # Enter phone number
-    await page.fill("input[placeholder='Enter Phone Number']", phone_number)
-    await asyncio.sleep(0.2)  # Reduced from 0.5s
-    
-    # Click Continue
-    await page.click("button:has-text('Continue')")
-    await page.wait_for_selector('input[type="text"][inputmode="numeric"]', timeout=3000)  # Reduced from 5000ms
+    await open_login_otp_form(page, phone_number)
     
     order_state["status"] = "waiting_login_otp"
+    order_state["plan"] = plan_order(page.context)
+    session_parker.arm(park_order_browser)
+    start_otp_driver()
     
-    return f"Order started! OTP sent to {phone_number}. Please provide the login OTP."
+    return f"Order started! OTP sent to {phone_number}. {otp_request('login')}"
 
 
-async def start_multi_order(items: list[dict], phone_number: str, address: str) -> str:
-    """Start a multi-item order process (single cart)."""
+async def start_multi_order(items: list[dict], phone_number: str, address: str, quick: dict = None) -> str:
+    """Start a multi-item order process (single cart). quick carries quick_order's settings."""
     global order_state
     
     if order_state["status"] != "idle":
@@ -1604,45 +2228,26 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
     order_state["item_url"] = None
     order_state["items"] = items
     order_state["address"] = address
-    
-    # CRITICAL: Close any existing context/browser before starting new order
-    # This ensures we always load from saved directory, not a cancelled session
-    if order_state.get("context"):
-        print("🔄 Closing existing context to start fresh from saved directory...")
-        try:
-            await order_state["context"].close()
-        except:
-            pass
-        order_state["context"] = None
-    
-    if order_state.get("browser"):
-        print("🔄 Closing existing browser...")
-        try:
-            await order_state["browser"].close()
-        except:
-            pass
-        order_state["browser"] = None
-    
-    if order_state.get("playwright"):
-        print("🔄 Stopping existing playwright...")
-        try:
-            await order_state["playwright"].stop()
-        except:
-            pass
-        order_state["playwright"] = None
-    
-    # CRITICAL: Wait to ensure everything is fully closed before launching new browser
-    # This prevents "has been closed" errors from directory locks
-    # Reduced from 2.0s to 1.0s for faster startup
-    await asyncio.sleep(1.0)
-    print("✅ Previous browser instances closed, ready to launch new browser")
+    order_state["completed_steps"] = []
+    order_state["last_result"] = None
+    order_state["quick"] = quick
+    order_state["cart_total"] = None
+    order_state["cancel_requested"] = False
+    drop_order_plan()
+    
+    # Reuse the browser the last order left warm; otherwise close whatever is
+    # left so the launch loads fresh from the saved directory
+    warm_handle = await reuse_warm_browser()
+    if not warm_handle:
+        await teardown_order_browser()
+        # No fixed wait needed: the launcher's ProfileLease waits only as long as the
+        # previous browser process actually takes to release the profile
+        print("✅ Previous browser instances closed, ready to launch new browser")
     
     # Launch browser with persistent context to save login session
-    p = await async_playwright().start()
-    import os
     # Use absolute path to ensure consistency with setup_firefox_login.py
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    user_data_dir = os.path.join(script_dir, "zepto_firefox_data")
+    user_data_dir = browser_launcher.profile_dir()
     
     # Debug: Show paths (important for Claude Desktop)
     print(f"📂 Script directory: {script_dir}")
@@ -1650,221 +2255,24 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
     print(f"📂 Current working directory: {os.getcwd()}")
     print(f"🔄 Starting fresh session from saved directory: {user_data_dir}")
     
-    # Check if persistent context directory exists and has files
+    # Check if persistent context directory exists (cached metadata - no walk over the profile)
     if os.path.exists(user_data_dir):
-        # Check if directory has files (especially Default folder with cookies)
-        default_dir = os.path.join(user_data_dir, "Default")
-        cookie_file = os.path.join(default_dir, "Cookies") if os.path.exists(default_dir) else None
-        
-        file_count = sum(len(files) for _, _, files in os.walk(user_data_dir))
+        profile_meta = profile_janitor.metadata()
         print(f"✅ Found existing persistent context: {user_data_dir}")
-        print(f"   - Contains {file_count} files")
-        if cookie_file and os.path.exists(cookie_file):
-            cookie_size = os.path.getsize(cookie_file)
-            print(f"   - Cookies file exists: {cookie_size} bytes")
+        print(f"   - Contains {profile_meta['file_count']} files ({profile_meta['size_mb']} MB)")
+        if profile_meta["cookie_file"]:
+            print(f"   - Cookies file exists: {profile_meta['cookie_bytes']} bytes")
         else:
             print(f"   - ⚠️ Cookies file not found (may be in different location)")
     else:
         print(f"ℹ️ Creating new persistent context: {user_data_dir}")
         os.makedirs(user_data_dir, exist_ok=True)
     
-    # PROACTIVELY clean browser data directory if locked to prevent crashes
-    if os.path.exists(user_data_dir):
-        try:
-            # Firefox uses different lock file location
-            lock_file = os.path.join(user_data_dir, "lock")
-            if os.path.exists(lock_file):
-                print(f"⚠️ Lock file detected - cleaning directory to prevent crashes...")
-                backup_dir = f"{user_data_dir}_backup_{int(time.time())}"
-                try:
-                    shutil.move(user_data_dir, backup_dir)
-                    print(f"📦 Backed up directory to: {backup_dir}")
-                except:
-                    try:
-                        shutil.rmtree(user_data_dir)
-                        print(f"🗑️ Removed locked directory")
-                    except:
-                        pass
-                os.makedirs(user_data_dir, exist_ok=True)
-        except:
-            pass
+    # Stale lock files are cleared by the launcher's ProfileLease once their owner is
+    # confirmed dead; a profile held by a live process is waited for, never discarded
     
-    try:
-        # USE FIREFOX ONLY (Chromium crashes on macOS 26.1 beta)
-        # Use Firefox persistent context to save login session
-        print(f"🚀 Launching Firefox with persistent context...")
-        try:
-            context = await asyncio.wait_for(
-                p.firefox.launch_persistent_context(
-                    user_data_dir=user_data_dir,
-                    headless=False,
-                    viewport={"width": 1280, "height": 720}
-                ),
-                timeout=30.0
-            )
-        except Exception as launch_err:
-            error_str = str(launch_err).lower()
-            # Check if browser crashed or locked
-            if "lock" in error_str or "has been closed" in error_str:
-                # Browser data directory might be locked
-                print(f"⚠️ Firefox data directory may be locked. Attempting recovery...")
-                backup_dir = f"{user_data_dir}_backup_{int(time.time())}"
-                if os.path.exists(user_data_dir):
-                    try:
-                        if os.path.exists(backup_dir):
-                            shutil.rmtree(backup_dir)
-                        shutil.move(user_data_dir, backup_dir)
-                        print(f"📦 Backed up directory to: {backup_dir}")
-                        os.makedirs(user_data_dir, exist_ok=True)
-                        print(f"✅ Created fresh Firefox data directory")
-                    except Exception as backup_err:
-                        print(f"⚠️ Could not backup directory: {backup_err}")
-                        try:
-                            shutil.rmtree(user_data_dir)
-                            os.makedirs(user_data_dir, exist_ok=True)
-                            print(f"✅ Recreated fresh Firefox data directory")
-                        except:
-                            pass
-                
-                # Retry with fresh directory
-                try:
-                    print(f"🔄 Retrying Firefox launch with fresh data directory...")
-                    context = await asyncio.wait_for(
-                        p.firefox.launch_persistent_context(
-                            user_data_dir=user_data_dir,
-                            headless=False,
-                            viewport={"width": 1280, "height": 720}
-                        ),
-                        timeout=30.0
-                    )
-                    print(f"✅ Firefox launched successfully with fresh data directory")
-                except Exception as retry_err:
-                    print(f"❌ Firefox still fails: {retry_err}")
-                    raise Exception(f"Firefox cannot launch. Try running: python3 setup_firefox_login.py to set up login first")
-            else:
-                raise
-        
-        pages = context.pages
-        if pages:
-            page = pages[0]
-        else:
-            page = await context.new_page()
-        
-        print(f"✅ Firefox persistent context loaded successfully")
-        
-        # Quick check: if persistent context exists, check for cookies immediately
-        try:
-            initial_cookies = await context.cookies()
-            if initial_cookies:
-                zepto_cookies = [c for c in initial_cookies if "zeptonow" in c.get("domain", "").lower() and c.get("value")]
-                if zepto_cookies:
-                    print(f"🔍 Found {len(zepto_cookies)} zeptonow.com cookies in Firefox - login session saved!")
-                else:
-                    print(f"⚠️ No Zepto cookies found. Run 'python3 setup_firefox_login.py' to save your login.")
-        except:
-            pass
-        
-        order_state["browser"] = context  # Store context instead of browser
-        order_state["page"] = page
-        order_state["playwright"] = p
-        order_state["context"] = context
-    except Exception as e:
-        # ANY error with persistent context - immediately try regular browser
-        # This is more reliable than trying to detect specific crash types
-        error_str = str(e).lower()
-        print(f"⚠️ Persistent context failed: {e}")
-        print(f"🔄 Switching to regular browser (no session saved, but more stable)...")
-        
-        try:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
-            order_state["browser"] = browser
-            order_state["page"] = page
-            order_state["playwright"] = p
-            order_state["context"] = None
-            print(f"✅ Regular Chromium browser launched successfully")
-        except Exception as fallback_err:
-            error_str = str(fallback_err).lower()
-            # If Chromium crashes, try Firefox with persistent context as fallback
-            if "segv" in error_str or "crash" in error_str or "signal 11" in error_str or "targetclosederror" in error_str or "has been closed" in error_str:
-                print(f"⚠️ Chromium crashes - trying Firefox with persistent context (saves login)...")
-                try:
-                    # Use Firefox persistent context to save login session
-                    firefox_data_dir = user_data_dir.replace("zepto_browser_data", "zepto_firefox_data")
-                    
-                    # Clean Firefox data directory if locked
-                    if os.path.exists(firefox_data_dir):
-                        try:
-                            lock_file = os.path.join(firefox_data_dir, "lock")
-                            if os.path.exists(lock_file):
-                                print(f"⚠️ Firefox lock file detected - cleaning...")
-                                backup_dir = f"{firefox_data_dir}_backup_{int(time.time())}"
-                                try:
-                                    shutil.move(firefox_data_dir, backup_dir)
-                                    print(f"📦 Backed up Firefox directory")
-                                except:
-                                    try:
-                                        shutil.rmtree(firefox_data_dir)
-                                    except:
-                                        pass
-                                os.makedirs(firefox_data_dir, exist_ok=True)
-                        except:
-                            pass
-                    else:
-                        os.makedirs(firefox_data_dir, exist_ok=True)
-                    
-                    # Launch Firefox with persistent context
-                    firefox_context = await asyncio.wait_for(
-                        p.firefox.launch_persistent_context(
-                            user_data_dir=firefox_data_dir,
-                            headless=False,
-                            viewport={"width": 1280, "height": 720}
-                        ),
-                        timeout=30.0
-                    )
-                    
-                    pages = firefox_context.pages
-                    if pages:
-                        page = pages[0]
-                    else:
-                        page = await firefox_context.new_page()
-                    
-                    # Store Firefox context (similar to Chromium persistent context)
-                    order_state["browser"] = firefox_context
-                    order_state["page"] = page
-                    order_state["playwright"] = p
-                    order_state["context"] = firefox_context
-                    print(f"✅ Firefox browser launched with persistent context (login will be saved)")
-                    
-                    # Check for existing cookies
-                    try:
-                        initial_cookies = await firefox_context.cookies()
-                        if initial_cookies:
-                            zepto_cookies = [c for c in initial_cookies if "zeptonow" in c.get("domain", "").lower() and c.get("value")]
-                            if zepto_cookies:
-                                print(f"🔍 Found {len(zepto_cookies)} zeptonow.com cookies in Firefox - session saved!")
-                    except:
-                        pass
-                        
-                except Exception as firefox_err:
-                    # If Firefox persistent context fails, try regular Firefox
-                    print(f"⚠️ Firefox persistent context failed: {firefox_err}, trying regular Firefox...")
-                    try:
-                        browser = await p.firefox.launch(headless=False)
-                        page = await browser.new_page()
-                        order_state["browser"] = browser
-                        order_state["page"] = page
-                        order_state["playwright"] = p
-                        order_state["context"] = None
-                        print(f"✅ Firefox browser launched (no session saved)")
-                    except Exception as firefox_fallback_err:
-                        await p.stop()
-                        order_state["playwright"] = None
-                        raise Exception(f"Both Chromium and Firefox failed to launch.\nChromium error: {fallback_err}\nFirefox error: {firefox_fallback_err}\n\nTroubleshooting:\n1. Close ALL browser windows\n2. Restart your Mac\n3. Reinstall Playwright: python3 -m playwright install chromium firefox")
-            else:
-                await p.stop()
-                order_state["playwright"] = None
-                raise Exception(f"Browser cannot launch. Error: {fallback_err}\n\nTroubleshooting:\n1. Close ALL Chrome/Chromium windows\n2. Restart your Mac\n3. Reinstall Playwright: python3 -m playwright install chromium\n4. Check system logs for crash details")
+    handle = warm_handle or await launch_order_browser()
+    page = handle["page"]
     
     # If using persistent context and directory has files, assume logged in and try to proceed
     # (More aggressive approach for Claude Desktop where we can't see debug output)
@@ -1872,7 +2280,8 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
     if persistent_context_exists:
         # Check if directory has files
         try:
-            has_files = os.path.exists(user_data_dir) and any(os.scandir(user_data_dir))
+            profile_dir = handle["user_data_dir"]
+            has_files = os.path.exists(profile_dir) and any(os.scandir(profile_dir))
             if has_files:
                 print("✅ Persistent context found with files - assuming logged in, proceeding directly...")
                 # Navigate directly to first product and try to proceed
@@ -1882,7 +2291,7 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
                 
                 # Try to check if login button is visible (quick check)
                 try:
-                    login_btn = await page.query_selector("span[data-testid='login-btn']")
+                    login_btn = await page.query_selector(sel("login_button"))
                     if login_btn and await login_btn.is_visible(timeout=1000):
                         # Login button visible, need to log in
                         print("⚠️ Login button found - session may have expired, proceeding with login...")
@@ -1898,8 +2307,8 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
                 
                 if is_logged_in:
                     print("✅ Already logged in! Clearing cart from previous session if needed...")
-                    # Clear cart before starting new order
-                    await clear_cart_if_needed(page)
+                    # Clear cart before starting new order (quick_order reconciles it instead)
+                    await prepare_cart(page)
                     order_state["status"] = "adding_to_cart"
                     result = await submit_login(otp=None)  # No OTP needed
                     return result
@@ -1936,113 +2345,90 @@ async def start_multi_order(items: list[dict], phone_number: str, address: str)
     
     if is_logged_in:
         print("✅ Already logged in! Skipping login flow and proceeding directly to address selection.")
-        order_state["status"] = "adding_to_cart"
-        result = await submit_login(otp=None)  # No OTP needed
-        return result
-    
-    # Not logged in, proceed with login flow
-    print("🔐 Not logged in, starting login flow...")
-    
-    # Click login
-    await page.click("span[data-testid='login-btn']")
-    await page.wait_for_selector("input[placeholder='Enter Phone Number']", timeout=3000)  # Reduced from 5000ms
-    
-    # Enter phone number
-    await page.fill("input[placeholder='Enter Phone Number']", phone_number)
-    await asyncio.sleep(0.2)  # Reduced from 0.5s
-    
-    # Click Continue
-    await page.click("button:has-text('Continue')")
-    await page.wait_for_selector('input[type="text"][inputmode="numeric"]', timeout=3000)  # Reduced from 5000ms
-    
-    order_state["status"] = "waiting_login_otp_multi"
-    
-    return f"Multi-item order started! OTP sent to {phone_number}. Please provide the login OTP."
-
-
-async def submit_login(otp: str = None) -> str:
-    """Submit login OTP and proceed to checkout (handles both single and multi-item orders)
-    
-    If already logged in (status='adding_to_cart'), OTP is optional and will be skipped.
-    """
-    global order_state
-    
-    page = order_state["page"]
-    
-    # Check if already logged in (persistent session)
-    if order_state["status"] == "adding_to_cart":
-        print("✅ Already logged in via persistent session, skipping OTP entry")
-        # Skip OTP and go directly to address selection
-    elif order_state["status"] in ["waiting_login_otp", "waiting_login_otp_multi"]:
-        # Need to enter OTP
-        if not otp:
-            return "OTP is required for login. Please provide the OTP code."
-        
-        # Get all OTP input fields
-        otp_inputs = await page.query_selector_all('input[type="text"][inputmode="numeric"]')
-        
-        # Fill each digit individually using type for more realistic input
-        for i, digit in enumerate(otp):
-            if i < len(otp_inputs):
-                await otp_inputs[i].click()
-                await otp_inputs[i].type(digit, delay=20)  # Reduced from 30ms for faster typing
-                # No sleep needed - typing delay handles it
-        
-        # Wait for login to complete - use element wait instead of fixed sleep
-        try:
-            # Wait for either address header or product page to appear (login successful)
-            await page.wait_for_selector("div[data-testid='address-header'], button[data-testid='add-to-cart-btn']", timeout=2000)
-        except:
-            await asyncio.sleep(0.3)  # Fallback minimal wait
-        order_state["status"] = "adding_to_cart"
-    else:
-        return f"Not waiting for login OTP and not already logged in. Current status: {order_state['status']}"
-    
-    # NEW FLOW: Navigate to first product, check and clear cart if needed, click address header, select address, then add items
-    print("📍 Starting new order flow...")
-    
-    # Wait for page to be ready after login
-    await page.wait_for_load_state("domcontentloaded")  # Changed from networkidle - faster
-    # No additional sleep needed - domcontentloaded means page is ready
-    # No sleep needed - domcontentloaded means page is ready
-    
-    # Determine first product URL
-    first_product_url = None
-    if order_state["items"] is not None and len(order_state["items"]) > 0:
-        first_product_url = order_state["items"][0]["url"]
-    elif order_state["item_url"]:
-        first_product_url = order_state["item_url"]
+        order_state["status"] = "adding_to_cart"
+        result = await submit_login(otp=None)  # No OTP needed
+        return result
     
-    if not first_product_url:
-        return "Error: No product URL found in order state"
+    # Not logged in, proceed with login flow
+    print("🔐 Not logged in, starting login flow...")
     
-    # Navigate to first product page
-    print(f"🔄 Navigating to first product: {first_product_url}")
-    await page.goto(first_product_url, wait_until="domcontentloaded")
-    # No sleep needed - wait for specific element instead
-    try:
-        await page.wait_for_selector("button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart')", timeout=1000)
-    except:
-        pass
+    await open_login_otp_form(page, phone_number)
     
-    # Close any popups
-    try:
-        await page.click("button:has-text('Close')", timeout=1000)
-    except:
-        pass
+    order_state["status"] = "waiting_login_otp_multi"
+    order_state["plan"] = plan_order(page.context)
+    session_parker.arm(park_order_browser)
+    start_otp_driver()
     
-    # CRITICAL: Check and clear cart if cart badge shows a number
-    # This must happen AFTER navigating to product page so we can see the cart badge
-    print("🛒 Checking cart and clearing if needed...")
-    await clear_cart_if_needed(page)
+    return f"Multi-item order started! OTP sent to {phone_number}. {otp_request('login')}"
+
+
+def _step_done(step: str) -> bool:
+    return step in order_state["completed_steps"]
+
+
+async def _complete_step(step: str) -> None:
+    """Record a finished step of the order flow and snapshot the session for the hot spare."""
+    if step not in order_state["completed_steps"]:
+        order_state["completed_steps"].append(step)
+        await report_progress(step)
+    await browser_watchdog.checkpoint()
+    check_cancelled()
+
+
+async def _item_finished(idx: int, out_of_stock_items: list, successfully_added: list) -> None:
+    """Checkpoint a handled product (added or out of stock) of a multi-item order."""
+    order_state["out_of_stock_items"] = out_of_stock_items
+    order_state["successfully_added"] = successfully_added
+    await _complete_step(f"item:{idx}")
+
+
+async def submit_login(otp: str = None) -> str:
+    """Submit login OTP and proceed to checkout (handles both single and multi-item orders)
     
+    If already logged in (status='adding_to_cart'), OTP is optional and will be skipped.
+    If the browser dies after login, the watchdog swaps in a replacement and the
+    flow resumes from the last completed step.
+    """
+    await session_parker.settle()
+    if session_parker.parked and otp:
+        await revive_parked_browser()
+
+    recoveries = 0
+    while True:
+        try:
+            return await _run_order_steps(otp)
+        except Exception as e:
+            if not (browser_watchdog.crashed or is_browser_gone(e)):
+                raise
+            if not _step_done("logged_in"):
+                # The OTP form lives only in the dead page - nothing to resume
+                raise Exception(f"Browser closed before login finished ({e}). Use stop_order and start again.")
+            if _step_done("checkout_started"):
+                # Never replay checkout: the order may already have been placed
+                raise Exception(
+                    f"Browser closed during checkout ({e}). Check your Zepto orders before retrying - "
+                    f"the order may already have been placed."
+                )
+            if recoveries >= MAX_CRASH_RECOVERIES:
+                raise
+            check_cancelled()  # Never relaunch a browser that stop_order is tearing down
+            recoveries += 1
+            print(f"💥 Browser lost mid-order ({e}), recovering (attempt {recoveries}/{MAX_CRASH_RECOVERIES})...")
+            handle = await browser_watchdog.recover(order_state["playwright"])
+            use_order_handle(handle)
+            order_state["status"] = "adding_to_cart"
+            print(f"⏩ Resuming after: {', '.join(order_state['completed_steps'])}")
+
+
+async def _select_delivery_address(page) -> None:
+    """Open the address modal from the header and pick order_state["address"]."""
     # Click on address header (h3 with data-testid="user-address") to open address modal
     print("📍 Clicking on address header to open address modal...")
     address_header_clicked = False
     
     try:
         # Strategy 1: Find by data-testid
-        address_header = await page.query_selector('h3[data-testid="user-address"]')
+        address_header = await page.query_selector(sel("address_header"))
         if address_header:
             await address_header.click()
             address_header_clicked = True
@@ -2097,7 +2483,7 @@ async def submit_login(otp: str = None) -> str:
     if address_header_clicked:
         # Wait for address modal to open
         try:
-            await page.wait_for_selector("div[data-testid='address-modal'], div[data-testid='saved-address-container']", timeout=3000)  # Reduced from 5000ms
+            await page.wait_for_selector(sel("address_modal"), timeout=3000)  # Reduced from 5000ms
             print("✅ Address modal opened")
             # No sleep needed - modal is already open
         except:
@@ -2105,7 +2491,7 @@ async def submit_login(otp: str = None) -> str:
     else:
         print("⚠️ Could not find address header. Checking if address modal is already open...")
         try:
-            await page.wait_for_selector("div[data-testid='address-modal'], div[data-testid='saved-address-container']", timeout=1500)  # Reduced from 2000ms
+            await page.wait_for_selector(sel("address_modal"), timeout=1500)  # Reduced from 2000ms
             print("✅ Address modal found (already open)")
         except:
             print("⚠️ Address modal not found. This may cause issues.")
@@ -2121,6 +2507,101 @@ async def submit_login(otp: str = None) -> str:
     await asyncio.sleep(0.3)  # Reduced from 0.5s
     await page.wait_for_load_state("domcontentloaded")  # Changed from networkidle - faster
     # No additional sleep needed - domcontentloaded means page is ready
+
+
+async def _run_order_steps(otp: str = None) -> str:
+    """The submit_login flow; steps recorded with _complete_step() are skipped on resume."""
+    global order_state
+    
+    page = order_state["page"]
+    
+    # Check if already logged in (persistent session)
+    if order_state["status"] == "adding_to_cart":
+        print("✅ Already logged in via persistent session, skipping OTP entry")
+        # Skip OTP and go directly to address selection
+    elif order_state["status"] in ["waiting_login_otp", "waiting_login_otp_multi"]:
+        # Need to enter OTP
+        if not otp:
+            return "OTP is required for login. Please provide the OTP code."
+        
+        # Get all OTP input fields
+        otp_inputs = await page.query_selector_all('input[type="text"][inputmode="numeric"]')
+        
+        # Fill each digit individually using type for more realistic input
+        for i, digit in enumerate(otp):
+            if i < len(otp_inputs):
+                await otp_inputs[i].click()
+                await otp_inputs[i].type(digit, delay=20)  # Reduced from 30ms for faster typing
+                # No sleep needed - typing delay handles it
+        
+        # Wait for login to complete - use element wait instead of fixed sleep
+        try:
+            # Wait for either address header or product page to appear (login successful)
+            await page.wait_for_selector("div[data-testid='address-header'], button[data-testid='add-to-cart-btn']", timeout=2000)
+        except:
+            await asyncio.sleep(0.3)  # Fallback minimal wait
+        if order_state.pop("otp_resent", False):
+            # Browser was parked and the form re-sent an OTP - the old code may have been invalidated
+            otp_form = await page.query_selector('input[type="text"][inputmode="numeric"]')
+            if otp_form and await otp_form.is_visible():
+                session_parker.arm(park_order_browser)
+                return (
+                    f"The browser was parked while waiting and reopening it made Zepto send a new OTP to "
+                    f"{order_state['phone_number']}. Please provide the newest login OTP."
+                )
+        order_state["status"] = "adding_to_cart"
+    else:
+        return f"Not waiting for login OTP and not already logged in. Current status: {order_state['status']}"
+    await _complete_step("logged_in")
+    if not order_state.get("plan"):
+        # Logged-in fast path: prefetch in side tabs while this page clears the cart and picks the address
+        order_state["plan"] = plan_order(page.context)
+    order_state["plan"].open("login")
+    
+    # NEW FLOW: Navigate to first product, check and clear cart if needed, click address header, select address, then add items
+    print("📍 Starting new order flow...")
+    
+    # Wait for page to be ready after login
+    await page.wait_for_load_state("domcontentloaded")  # Changed from networkidle - faster
+    # No additional sleep needed - domcontentloaded means page is ready
+    # No sleep needed - domcontentloaded means page is ready
+    
+    # Determine first product URL
+    first_product_url = None
+    if order_state["items"] is not None and len(order_state["items"]) > 0:
+        first_product_url = order_state["items"][0]["url"]
+    elif order_state["item_url"]:
+        first_product_url = order_state["item_url"]
+    
+    if not first_product_url:
+        return "Error: No product URL found in order state"
+    
+    # Navigate to first product page
+    print(f"🔄 Navigating to first product: {first_product_url}")
+    await page.goto(first_product_url, wait_until="domcontentloaded")
+    # No sleep needed - wait for specific element instead
+    try:
+        await page.wait_for_selector(sel("add_to_cart_any"), timeout=1000)
+    except:
+        pass
+    
+    # Close any popups
+    try:
+        await page.click("button:has-text('Close')", timeout=1000)
+    except:
+        pass
+    
+    # CRITICAL: Check and clear cart if cart badge shows a number
+    # This must happen AFTER navigating to product page so we can see the cart badge
+    if not _step_done("cart_cleared"):
+        print("🛒 Checking cart and clearing if needed...")
+        await prepare_cart(page)
+    
+    if not _step_done("address_selected"):
+        await _select_delivery_address(page)
+        await _complete_step("address_selected")
+    else:
+        print("⏩ Address already selected before the browser restart")
     
     # Check if this is a multi-item order
     if order_state["items"] is not None and len(order_state["items"]) > 0:
@@ -2130,17 +2611,37 @@ async def submit_login(otp: str = None) -> str:
         items = order_state["items"]
         out_of_stock_items = []
         successfully_added = []
+        if any(step.startswith("item:") for step in order_state["completed_steps"]):
+            # Resuming after a browser crash, or quick_order found these already in the cart
+            out_of_stock_items = list(order_state.get("out_of_stock_items") or [])
+            successfully_added = list(order_state.get("successfully_added") or [])
         
         for idx, item in enumerate(items, start=1):
+            if idx > 1:
+                await _item_finished(idx - 1, out_of_stock_items, successfully_added)
+            if _step_done(f"item:{idx}"):
+                print(f"⏩ Product {idx} handled before the browser restart")
+                continue
             url = item["url"]
             qty = item["qty"]
             
+            prefetched = await prefetched_product(idx)
+            if prefetched and prefetched["in_stock"] is False:
+                print(f"❌ Product {idx} is OUT OF STOCK (checked ahead of login): {prefetched['name']}")
+                out_of_stock_items.append({
+                    "name": prefetched["name"],
+                    "url": url,
+                    "quantity": qty,
+                    "index": idx
+                })
+                continue
+            
             print(f"\n=== Checking product {idx}/{len(items)} ===")
             print(f"🔄 Loading product page: {url}")
             await page.goto(url, wait_until="domcontentloaded")
             # No sleep needed - wait for specific element instead
             try:
-                await page.wait_for_selector("button[data-testid='add-to-cart-btn'], button:has-text('Add To Cart')", timeout=1000)
+                await page.wait_for_selector(sel("add_to_cart_any"), timeout=1000)
             except:
                 pass
             
@@ -2152,7 +2653,7 @@ async def submit_login(otp: str = None) -> str:
             
             # Wait for Add To Cart button to appear (replaces fixed 1s sleep)
             try:
-                await page.wait_for_selector("button.WJXJe:has-text('Add To Cart'), button[aria-label='Notify Me']", timeout=2000)
+                await page.wait_for_selector(sel("add_or_notify"), timeout=2000)
             except:
                 await asyncio.sleep(0.3)  # Fallback minimal wait
             
@@ -2219,7 +2720,7 @@ async def submit_login(otp: str = None) -> str:
             # Wait for Add to Cart button with double-check for out of stock
             add_to_cart_found = False
             try:
-                await page.wait_for_selector("button.WJXJe:has-text('Add To Cart')", timeout=3000)  # Reduced from 5000ms
+                await page.wait_for_selector(sel("add_to_cart"), timeout=3000)  # Reduced from 5000ms
                 add_to_cart_found = True
             except Exception as e:
                 # Button not found - double-check if it's out of stock
@@ -2346,6 +2847,7 @@ async def submit_login(otp: str = None) -> str:
             
             successfully_added.append({"name": product_name, "quantity": qty})
             print(f"✅ Added {qty}x {product_name}!")
+        await _item_finished(len(items), out_of_stock_items, successfully_added)
         
         # Check if any items are out of stock
         if out_of_stock_items:
@@ -2380,19 +2882,31 @@ async def submit_login(otp: str = None) -> str:
         
         # After all items added, proceed to cart → payment
         # This function checks for "Place Order" (wallet) first, otherwise uses Pay on Delivery
-        payment_method = await proceed_to_payment(page)
+        await _complete_step("checkout_started")
+        payment_method = await proceed_to_payment(page, allow_pay_on_delivery=not wallet_only())
+        if not payment_method:
+            return await wallet_unavailable()
 
         order_state["status"] = "completed"
         # Close browser after order completion
         await close_browser_after_completion()
+        if order_state.get("quick"):
+            return quick_receipt(payment_method)
         
         payment_text = "through Wallet" if payment_method == "wallet" else "with Pay on Delivery"
         return f"Login successful! Address selected. All {len(items)} items added to cart and order placed {payment_text}."
     
+    elif _step_done("item:1"):
+        print("⏩ Item added before the browser restart, going straight to checkout")
     else:
         # SINGLE-ITEM FLOW
         order_state["status"] = "adding_to_cart"
         
+        prefetched = await prefetched_product(1)
+        if prefetched and prefetched["in_stock"] is False:
+            print(f"❌ Product is OUT OF STOCK (checked ahead of login): {prefetched['name']}")
+            return single_item_out_of_stock(prefetched["name"])
+        
         # Navigate to product page
         await page.goto(order_state["item_url"], wait_until="domcontentloaded")
         await asyncio.sleep(0.3)  # Reduced from 0.5s + networkidle wait
@@ -2405,7 +2919,7 @@ async def submit_login(otp: str = None) -> str:
         
         # Wait for Add To Cart button to appear (replaces fixed 1s sleep)
         try:
-            await page.wait_for_selector("button.WJXJe:has-text('Add To Cart'), button[aria-label='Notify Me']", timeout=2000)
+            await page.wait_for_selector(sel("add_or_notify"), timeout=2000)
         except:
             await asyncio.sleep(0.3)  # Fallback minimal wait
         
@@ -2415,20 +2929,7 @@ async def submit_login(otp: str = None) -> str:
         
         if not is_in_stock:
             print(f"❌ Product is OUT OF STOCK: {product_name}")
-            order_state["status"] = "waiting_stock_decision"
-            order_state["out_of_stock_items"] = [{
-                "name": product_name,
-                "url": order_state["item_url"],
-                "quantity": 1,
-                "index": 1
-            }]
-            return (
-                f"⚠️ OUT OF STOCK: The product '{product_name}' is currently out of stock.\n\n"
-                f"Please choose one of the following options:\n"
-                f"1. Cancel the order\n"
-                f"2. Order a different product instead\n\n"
-                f"Use the 'handle_stock_decision' tool to proceed."
-            )
+            return single_item_out_of_stock(product_name)
         
         # Product appears in stock, but verify before proceeding
         print(f"✅ Product appears in stock: {product_name}")
@@ -2465,27 +2966,14 @@ async def submit_login(otp: str = None) -> str:
             
             if notify_check:
                 print(f"❌ SECOND CHECK: Found 'Notify Me' button - {product_name} is OUT OF STOCK")
-                order_state["status"] = "waiting_stock_decision"
-                order_state["out_of_stock_items"] = [{
-                    "name": product_name,
-                    "url": order_state["item_url"],
-                    "quantity": 1,
-                    "index": 1
-                }]
-                return (
-                    f"⚠️ OUT OF STOCK: The product '{product_name}' is currently out of stock.\n\n"
-                    f"Please choose one of the following options:\n"
-                    f"1. Cancel the order\n"
-                    f"2. Order a different product instead\n\n"
-                    f"Use the 'handle_stock_decision' tool to proceed."
-                )
+                return single_item_out_of_stock(product_name)
         except Exception as e:
             print(f"⚠️ Error in explicit notify check: {e}")
         
         # Wait for Add to Cart button with double-check for out of stock
         add_to_cart_found = False
         try:
-            await page.wait_for_selector("button.WJXJe:has-text('Add To Cart')", timeout=3000)  # Reduced from 5000ms
+            await page.wait_for_selector(sel("add_to_cart"), timeout=3000)  # Reduced from 5000ms
             add_to_cart_found = True
         except Exception as e:
             # Button not found - double-check if it's out of stock
@@ -2495,20 +2983,7 @@ async def submit_login(otp: str = None) -> str:
             
             if not is_still_in_stock:
                 print(f"❌ FINAL CHECK: {product_name} is OUT OF STOCK")
-                order_state["status"] = "waiting_stock_decision"
-                order_state["out_of_stock_items"] = [{
-                    "name": product_name,
-                    "url": order_state["item_url"],
-                    "quantity": 1,
-                    "index": 1
-                }]
-                return (
-                    f"⚠️ OUT OF STOCK: The product '{product_name}' is currently out of stock.\n\n"
-                    f"Please choose one of the following options:\n"
-                    f"1. Cancel the order\n"
-                    f"2. Order a different product instead\n\n"
-                    f"Use the 'handle_stock_decision' tool to proceed."
-                )
+                return single_item_out_of_stock(product_name)
             else:
                 # Still says in stock but button not found - might be page issue
                 return (
@@ -2523,52 +2998,54 @@ async def submit_login(otp: str = None) -> str:
                 f"The product may be out of stock or the page structure has changed."
             )
         
-    # Scroll Add to Cart button into view
-    await page.evaluate("""
-        const button = document.querySelector("button.WJXJe");
-        if (button) {
-            button.scrollIntoView({ behavior: 'smooth', block: 'center' });
-        }
-    """)
-    await asyncio.sleep(0.3)  # Reduced from 0.5s - wait for scroll to complete
-    
-    # Click "Add To Cart" button once
-    print(f"🛒 Clicking 'Add To Cart' button...")
-    add_to_cart_clicked = await page.evaluate("""
-        () => {
-            const buttons = document.querySelectorAll("button.WJXJe");
-            for (let btn of buttons) {
-                if (btn.textContent && btn.textContent.includes('Add To Cart')) {
-                    btn.click();
+        # Scroll Add to Cart button into view
+        await page.evaluate("""
+            const button = document.querySelector("button.WJXJe");
+            if (button) {
+                button.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            }
+        """)
+        await asyncio.sleep(0.3)  # Reduced from 0.5s - wait for scroll to complete
+        
+        # Click "Add To Cart" button once
+        print(f"🛒 Clicking 'Add To Cart' button...")
+        add_to_cart_clicked = await page.evaluate("""
+            () => {
+                const buttons = document.querySelectorAll("button.WJXJe");
+                for (let btn of buttons) {
+                    if (btn.textContent && btn.textContent.includes('Add To Cart')) {
+                        btn.click();
+                        return true;
+                    }
+                }
+                // Also try by aria-label
+                const btnByAria = document.querySelector('button[aria-label="Add to Cart"]');
+                if (btnByAria) {
+                    btnByAria.click();
                     return true;
                 }
+                // Also try by class
+                const btnByClass = document.querySelector('div[aria-label="Add to Cart"] button');
+                if (btnByClass) {
+                    btnByClass.click();
+                    return true;
+                }
+                return false;
             }
-            // Also try by aria-label
-            const btnByAria = document.querySelector('button[aria-label="Add to Cart"]');
-            if (btnByAria) {
-                btnByAria.click();
-                return true;
-            }
-            // Also try by class
-            const btnByClass = document.querySelector('div[aria-label="Add to Cart"] button');
-            if (btnByClass) {
-                btnByClass.click();
-                return true;
-            }
-            return false;
-        }
-    """)
-    
-    if not add_to_cart_clicked:
-        return f"❌ Could not find 'Add To Cart' button for {product_name}"
-    
-    await asyncio.sleep(0.5)  # Reduced from 1.5s - wait for item to be added to cart
-    
-    # Note: Single-item orders typically have quantity 1, so no need for + button
-    # If quantity > 1 is needed in future, add the same + button logic here
+        """)
+        
+        if not add_to_cart_clicked:
+            return f"❌ Could not find 'Add To Cart' button for {product_name}"
+        
+        await asyncio.sleep(0.5)  # Reduced from 1.5s - wait for item to be added to cart
+        await _complete_step("item:1")
+        
+        # Note: Single-item orders typically have quantity 1, so no need for + button
+        # If quantity > 1 is needed in future, add the same + button logic here
     
     # Proceed to payment
     # This function checks for "Place Order" (wallet) first, otherwise uses Pay on Delivery
+    await _complete_step("checkout_started")
     payment_method = await proceed_to_payment(page)
 
     order_state["status"] = "completed"
@@ -2662,7 +3139,9 @@ async def handle_stock_decision(decision: str, replacement_items: list = None) -
         
         try:
             # Proceed to payment (checks for wallet "Place Order" first)
-            payment_method = await proceed_to_payment(page)
+            payment_method = await proceed_to_payment(page, allow_pay_on_delivery=not wallet_only())
+            if not payment_method:
+                return await wallet_unavailable()
             
             order_state["status"] = "completed"
             # Close browser after order completion
@@ -2685,19 +3164,10 @@ async def handle_stock_decision(decision: str, replacement_items: list = None) -
         order_state["status"] = "adding_to_cart"
         
         # Resolve replacement items
-        resolved_replacements = []
-        for item in replacement_items:
-            try:
-                url = get_product_url(
-                    product_name=item.get("product_name"),
-                    item_url=item.get("item_url")
-                )
-                qty = int(item.get("quantity", 1))
-                if qty < 1:
-                    continue
-                resolved_replacements.append({"url": url, "qty": qty})
-            except Exception as e:
-                return f"❌ Error resolving replacement item: {str(e)}"
+        try:
+            resolved_replacements = resolve_order_items(replacement_items)
+        except ValueError as e:
+            return f"❌ Error resolving replacement items: {str(e)}"
         
         if not resolved_replacements:
             return "❌ No valid replacement items provided."
@@ -2720,7 +3190,7 @@ async def handle_stock_decision(decision: str, replacement_items: list = None) -
             
             # Add to cart
             try:
-                await page.wait_for_selector("button.WJXJe:has-text('Add To Cart')", timeout=3000)  # Reduced from 10000ms
+                await page.wait_for_selector(sel("add_to_cart"), timeout=3000)  # Reduced from 10000ms
                 await page.evaluate("""
                     const button = document.querySelector("button.WJXJe");
                     if (button) button.scrollIntoView({ behavior: 'smooth', block: 'center' });
@@ -2745,7 +3215,9 @@ async def handle_stock_decision(decision: str, replacement_items: list = None) -
         
         # Proceed to cart and payment (checks for wallet "Place Order" first)
         try:
-            payment_method = await proceed_to_payment(page)
+            payment_method = await proceed_to_payment(page, allow_pay_on_delivery=not wallet_only())
+            if not payment_method:
+                return await wallet_unavailable()
             
             order_state["status"] = "completed"
             # Close browser after order completion
@@ -2777,23 +3249,51 @@ def get_status() -> str:
         "completed": "Order completed!"
     }
     
-    return status_messages.get(order_state["status"], f"Status: {order_state['status']}")
+    message = status_messages.get(order_state["status"], f"Status: {order_state['status']}")
+    launch = order_state.get("launch")
+    if launch:
+        message += f" (browser: {launch['strategy']}, launched in {launch['seconds']}s)"
+    if browser_watchdog.recoveries and order_state["status"] != "idle":
+        last = browser_watchdog.recoveries[-1]
+        message += f" [recovered from {last['reason']} via {last['source']} in {last['seconds']}s]"
+    if session_parker.parked:
+        message += f" ({session_parker.describe()})"
+    if order_state.get("otp_driver") and order_state["status"] in OTP_STATUSES:
+        message += f" (listening on {otp_provider.describe()})"
+    job = order_state.get("job")
+    if job:
+        if job["finished"] is None:
+            elapsed = time.monotonic() - job["started"]
+            step = job["progress"].last_message or "starting"
+            message += f"\nOrder job {job['id']} ({job['tool']}): running for {elapsed:.0f}s - {step}"
+        else:
+            message += (f"\nOrder job {job['id']} ({job['tool']}) finished in "
+                        f"{job['finished'] - job['started']:.0f}s:\n{job['result']}")
+    if order_state["status"] == "idle" and order_state.get("last_result"):
+        message += f". Last order: {order_state['last_result']}"
+    if order_state["status"] == "idle" and session_keeper.interval_minutes:
+        message += f" ({session_keeper.describe()})"
+    if order_state["status"] == "idle" and stock_refresher.last_pass["at"]:
+        message += f"\nStock refresh: {stock_refresher.describe()}"
+    return message
 
 
-async def proceed_to_payment(page) -> str:
+async def proceed_to_payment(page, allow_pay_on_delivery: bool = True) -> str:
     """
     Handle payment flow - checks for 'Place Order' button (wallet payment) first,
     otherwise proceeds with Pay on Delivery flow.
-    Returns: "wallet" if wallet payment was used, "pay_on_delivery" if Pay on Delivery was used.
+    Returns: "wallet" if wallet payment was used, "pay_on_delivery" if Pay on Delivery was used,
+    None if the wallet can't pay and allow_pay_on_delivery is False (nothing is ordered).
     """
     # First, open cart
-    await page.click("button[data-testid='cart-btn']")
+    await page.click(sel("cart_button"))
     # Wait for cart to fully load (replaces fixed 1.5s sleep)
     try:
         # Wait for either "Place Order" or "Click to Pay" button to appear
-        await page.wait_for_selector("button:has-text('Place Order'), button:has-text('Click to Pay')", timeout=2000)  # Reduced from 3000ms
+        await page.wait_for_selector(sel("checkout_ready"), timeout=2000)  # Reduced from 3000ms
     except:
         await asyncio.sleep(0.5)  # Fallback minimal wait if selector not found
+    order_state["cart_total"] = await read_cart_total(page)
     
     # Check if "Place Order" button exists (wallet payment available)
     # User provided selector: <button class="my-2.5 h-[52px] w-full rounded-xl text-center bg-skin-primary"><span class="text-body1 text-white">Place Order</span></button>
@@ -2869,7 +3369,7 @@ async def proceed_to_payment(page) -> str:
             # Method 2: Try Playwright locator click as backup
             if not clicked:
                 try:
-                    place_order_locator = page.locator("button.bg-skin-primary:has-text('Place Order')")
+                    place_order_locator = page.locator(sel("place_order"))
                     if await place_order_locator.count() > 0:
                         await place_order_locator.first.click()
                         clicked = True
@@ -2898,7 +3398,7 @@ async def proceed_to_payment(page) -> str:
     
     # Strategy 3: Try Playwright locator with CSS selector
     try:
-        place_order_locator = page.locator("button.bg-skin-primary:has-text('Place Order')")
+        place_order_locator = page.locator(sel("place_order"))
         count = await place_order_locator.count()
         if count > 0:
             print("💰 Wallet payment detected - clicking 'Place Order' button directly...")
@@ -2946,32 +3446,36 @@ async def proceed_to_payment(page) -> str:
     except Exception as e:
         print(f"⚠️ Strategy 4 failed: {e}")
     
+    if not allow_pay_on_delivery:
+        print("💳 No 'Place Order' button - the wallet can't pay for this cart, stopping before Pay on Delivery")
+        return None
+    
     # If "Place Order" not found, proceed with normal Pay on Delivery flow
     print("💳 Proceeding with Pay on Delivery flow...")
     try:
-        await page.wait_for_selector("button:has-text('Click to Pay')", timeout=3000)  # Reduced from 5000ms
+        await page.wait_for_selector(sel("click_to_pay"), timeout=3000)  # Reduced from 5000ms
     except:
         # Maybe already on payment screen or button text is different
         print("⚠️ 'Click to Pay' button not found, checking if already on payment screen...")
     
     # Click to Pay (open payment methods screen)
     try:
-        await page.click("button:has-text('Click to Pay')")
-        await page.wait_for_selector("div[testid='nvb_cod']", timeout=3000)  # Reduced from 5000ms
+        await page.click(sel("click_to_pay"))
+        await page.wait_for_selector(sel("pay_on_delivery"), timeout=3000)  # Reduced from 5000ms
     except:
         # Maybe payment screen is already open
         pass
     
     # Select "Pay On Delivery" tab
     try:
-        await page.click("div[testid='nvb_cod']")
+        await page.click(sel("pay_on_delivery"))
         await asyncio.sleep(0.5)
     except:
         print("⚠️ Could not find Pay on Delivery option")
     
     # Click "Proceed to Pay" button
     try:
-        await page.click("div:has-text('Proceed to Pay')")
+        await page.click(sel("proceed_to_pay"))
         await asyncio.sleep(1)
         print("✅ Order placed with Pay on Delivery!")
     except:
@@ -2980,83 +3484,203 @@ async def proceed_to_payment(page) -> str:
     return "pay_on_delivery"
 
 
+def wallet_only() -> bool:
+    """quick_order pays from the wallet only, unless it was called with pay_on_delivery."""
+    return bool(order_state.get("quick")) and not order_state["quick"]["pay_on_delivery"]
+
+
+async def wallet_unavailable() -> str:
+    """Stop a wallet-only checkout that the wallet can't cover; the cart stays on the account."""
+    total = order_state.get("cart_total")
+    await close_browser_after_completion()
+    amount = f" (₹{total})" if total else ""
+    return (
+        f"💳 The wallet can't pay for this cart{amount}, so nothing was ordered. "
+        f"The items are waiting in your Zepto cart: top up the wallet and run quick_order again "
+        f"(the cart is reused as is), or call quick_order with pay_on_delivery=true."
+    )
+
+
+def quick_receipt(payment_method: str) -> str:
+    """Final message of a completed quick_order."""
+    payment_text = "through Wallet" if payment_method == "wallet" else "with Pay on Delivery"
+    lines = [f"✅ Order placed {payment_text}!", ""]
+    for item in order_state.get("successfully_added") or []:
+        lines.append(f"  - {item['quantity']}x {item['name']}")
+    lines.append("")
+    if order_state.get("cart_total"):
+        lines.append(f"Total: ₹{order_state['cart_total']}")
+    lines.append(f"Delivering to: {order_state['address']}")
+    lines.append(f"Done in {time.monotonic() - order_state['quick']['started']:.0f}s")
+    return "\n".join(lines)
+
+
+async def quick_order(items: list[dict], phone_number: str, address: str, pay_on_delivery: bool = False) -> str:
+    """
+    Whole order in one call for a warm session: saved login, reconciled cart,
+    wallet payment and a receipt. Whenever a person is needed (login OTP,
+    out-of-stock choice, wallet can't pay) it stops and says which stepwise
+    tool continues the order.
+    """
+    result = await start_multi_order(
+        items, phone_number, address,
+        quick={"pay_on_delivery": pay_on_delivery, "started": time.monotonic()},
+    )
+    if order_state["status"] in OTP_STATUSES:
+        return f"⏸️ Quick order needs a login first (the saved session has expired). {result}"
+    return result
+
+
+def schedule_profile_maintenance() -> None:
+    """Run the profile janitor in the background if it is due (the browser is closed now)."""
+    task = asyncio.create_task(profile_janitor.run_if_due())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def keep_browser_warm() -> bool:
+    """Soft reset between orders unless ZEPTO_CLOSE_BROWSER_AFTER_ORDER asks for a full teardown."""
+    return os.getenv("ZEPTO_CLOSE_BROWSER_AFTER_ORDER", "").strip().lower() not in ("1", "true", "yes")
+
+
+def warm_browser_alive() -> bool:
+    page = order_state.get("page")
+    return bool(
+        browser_watchdog.handle and page and order_state.get("playwright")
+        and not browser_watchdog.crashed and not page.is_closed()
+    )
+
+
+async def reuse_warm_browser() -> dict:
+    """The launcher handle of the browser the last order left open, if it is still usable."""
+    if not warm_browser_alive():
+        return None
+    print("♻️ Reusing the warm browser from the last order")
+    handle = browser_watchdog.handle
+    await report_progress("browser_ready")
+    check_cancelled()
+    return handle
+
+
+async def soft_reset_order_browser() -> bool:
+    """
+    Leave the order browser idle but open for the next order: extra tabs
+    closed, any modal dismissed, home page loaded. False if the browser is
+    gone, the reset failed or the context recycler says it has served
+    enough orders or grown too big - the caller then tears it down, which
+    also gives the profile janitor its turn.
+    """
+    if not warm_browser_alive():
+        return False
+    context_recycler.order_finished()
+    reason = context_recycler.due(browser_watchdog.handle)
+    if reason:
+        print(f"♻️ Retiring the warm browser ({reason}); the next order launches fresh")
+        context_recycler.closed(browser_watchdog.handle, reason)
+        return False
+    page = order_state["page"]
+    try:
+        for extra in page.context.pages:
+            if extra is not page:
+                await extra.close()
+        try:
+            await page.keyboard.press("Escape")
+        except:
+            pass
+        await page.goto("https://www.zeptonow.com", wait_until="domcontentloaded", timeout=15000)
+        print("✅ Browser reset to the home page and kept warm for the next order")
+        return True
+    except Exception as e:
+        print(f"⚠️ Soft reset failed ({e}), closing the browser instead")
+        return False
+
+
+async def teardown_order_browser() -> None:
+    """Close the order browser completely; the next order launches fresh from the saved profile."""
+    context_recycler.closed(browser_watchdog.handle)
+    await browser_watchdog.close()
+    if order_state.get("context"):
+        # Close persistent context - next order will load fresh from saved directory
+        print("🔄 Closing persistent context - next order will load from saved directory")
+        try:
+            await order_state["context"].close()
+        except:
+            pass
+        order_state["context"] = None
+    
+    if order_state.get("browser"):
+        # Regular browser - close it
+        print("🔄 Closing browser...")
+        try:
+            await order_state["browser"].close()
+        except:
+            pass
+        order_state["browser"] = None
+    
+    # Stop playwright to ensure clean state
+    if order_state.get("playwright"):
+        print("🔄 Stopping playwright...")
+        try:
+            await order_state["playwright"].stop()
+        except:
+            pass
+        order_state["playwright"] = None
+    order_state["page"] = None
+
+
 async def close_browser_after_completion() -> None:
-    """Close browser/context after order completion"""
+    """Soft-reset the browser after order completion, or close it (ZEPTO_CLOSE_BROWSER_AFTER_ORDER=1)"""
     global order_state
     
+    if order_state["status"] == "completed":
+        await report_progress("done")
     try:
+        drop_order_plan()
+        if otp_provider.inline:
+            await otp_provider.stop()
+        if keep_browser_warm() and await soft_reset_order_browser():
+            order_state["status"] = "idle"
+            return
         print("🔄 Closing browser after order completion...")
-        if order_state.get("context"):
-            try:
-                await order_state["context"].close()
-            except:
-                pass
-            order_state["context"] = None
-        
-        if order_state.get("browser"):
-            try:
-                await order_state["browser"].close()
-            except:
-                pass
-            order_state["browser"] = None
-        
-        if order_state.get("playwright"):
-            try:
-                await order_state["playwright"].stop()
-            except:
-                pass
-            order_state["playwright"] = None
-        
-        order_state["page"] = None
+        await teardown_order_browser()
         order_state["status"] = "idle"
         print("✅ Browser closed successfully")
+        schedule_profile_maintenance()
     except Exception as e:
+        order_state["status"] = "idle"
         print(f"⚠️ Error closing browser: {e}")
 
 
-async def stop_order() -> str:
-    """Stop and reset the current order. Close context to ensure next order loads from saved directory."""
+async def stop_order(full_teardown: bool = False) -> str:
+    """
+    Stop and reset the current order. In-flight work is cancelled and the
+    browser is soft-reset for the next order; full_teardown (or
+    ZEPTO_CLOSE_BROWSER_AFTER_ORDER=1) closes it so the next order loads
+    from the saved directory.
+    """
     global order_state
     
+    await cancel_running_order()
+    kept_warm = False
     try:
-        # CRITICAL: Close context/browser to ensure next order starts fresh from saved directory
-        # This prevents reusing a cancelled session state
-        if order_state.get("context"):
-            # Close persistent context - next order will load fresh from saved directory
-            print("🔄 Closing persistent context - next order will load from saved directory")
-            try:
-                await order_state["context"].close()
-            except:
-                pass
-            order_state["context"] = None
-        
-        if order_state.get("browser"):
-            # Regular browser - close it
-            print("🔄 Closing browser...")
-            try:
-                await order_state["browser"].close()
-            except:
-                pass
-            order_state["browser"] = None
-        
-        # Stop playwright to ensure clean state
-        if order_state.get("playwright"):
-            print("🔄 Stopping playwright...")
-            try:
-                await order_state["playwright"].stop()
-            except:
-                pass
-            order_state["playwright"] = None
+        stop_otp_driver()
+        drop_order_plan()
+        session_parker.discard()
+        if not full_teardown and keep_browser_warm():
+            kept_warm = await soft_reset_order_browser()
+        if not kept_warm:
+            await teardown_order_browser()
     except Exception as e:
         # Ignore cleanup errors
         print(f"⚠️ Cleanup warning: {e}")
         pass
     
-    # Reset all state
-    order_state["browser"] = None
-    order_state["page"] = None
-    order_state["context"] = None
-    order_state["playwright"] = None
+    # Reset all order state (a warm browser stays in browser/page/context/playwright)
+    if not kept_warm:
+        order_state["browser"] = None
+        order_state["page"] = None
+        order_state["context"] = None
+        order_state["playwright"] = None
     order_state["status"] = "idle"
     order_state["waiting_for"] = None
     order_state["phone_number"] = None
@@ -3065,8 +3689,19 @@ async def stop_order() -> str:
     order_state["address"] = None
     order_state["out_of_stock_items"] = None
     order_state["successfully_added"] = None
-    
-    return "Order stopped and reset. Next order will load fresh from saved directory at /Users/Pranav_1/zepto-mcp/zepto_browser_data"
+    order_state["completed_steps"] = []
+    order_state["last_result"] = None
+    order_state["quick"] = None
+    order_state["cart_total"] = None
+    order_state["cancel_requested"] = False
+    order_state["otp_sent_at"] = {}
+    order_state.pop("otp_resent", None)
+    await otp_provider.stop()
+    
+    if kept_warm:
+        return "Order stopped and reset. The browser stays open on the home page for the next order (use full_teardown to close it)."
+    schedule_profile_maintenance()
+    return f"Order stopped and reset. Browser closed - next order will load fresh from the saved directory at {browser_launcher.profile_dir()}"
 
 
 async def main():
@@ -3074,6 +3709,8 @@ async def main():
         print("🚀 Starting Zepto Cafe MCP Server...", file=sys.stderr)
         async with stdio_server() as (read_stream, write_stream):
             print("✅ Server transport established", file=sys.stderr)
+            session_keeper.start()
+            stock_refresher.start()
             await server.run(
                 read_stream,
                 write_stream,
@@ -3091,6 +3728,8 @@ async def main():
         import traceback
         print(traceback.format_exc(), file=sys.stderr)
         raise
+    finally:
+        stock_cache().flush()  # The stock table is written a moment after each visit
 
 if __name__ == "__main__":
     try:
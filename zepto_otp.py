@@ -0,0 +1,352 @@
+"""
+Where the order flow gets its OTPs from.
+
+By default an OTP arrives through a tool call: start_zepto_order returns, the
+model asks the user, and submit_login_otp / submit_payment_otp carry the code
+back. Each OTP therefore costs a full LLM (or n8n) round trip. An inline
+provider lets the flow await the OTP itself, so that one background task can
+take an order from login to completion:
+
+- file:  poll a drop file (or read a FIFO) that something else writes the
+         OTP into, e.g. an SMS-forwarding shortcut or `echo 123456 > .zepto_otp`
+- http:  a tiny local endpoint: POST /otp with the code as the body,
+         JSON {"otp": "123456", "kind": "login"} or ?otp=123456
+- stdin: read the code from the terminal (/dev/tty when stdin is the MCP pipe)
+
+A line may name the OTP it carries ("login 123456", "payment: 654321");
+an unlabelled code goes to whichever OTP is being waited for. The tool calls
+keep working with every provider: whichever path delivers first wins.
+
+Configuration (environment variables):
+- ZEPTO_OTP_PROVIDER: tool (default), file, http or stdin
+- ZEPTO_OTP_TIMEOUT_SECONDS: how long to wait inline before handing back to the tool path (default 300)
+- ZEPTO_OTP_FILE: drop file or FIFO for the file provider (default .zepto_otp)
+- ZEPTO_OTP_HTTP_PORT: port for the http provider, bound to 127.0.0.1 (default 8765)
+- ZEPTO_OTP_HTTP_TOKEN: if set, the http provider requires it as a Bearer token or ?token=
+"""
+
+import asyncio
+import json
+import os
+import re
+import stat
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from zepto_util import env_float, print
+
+
+DEFAULT_OTP_TIMEOUT_SECONDS = 300.0
+DEFAULT_OTP_FILE = ".zepto_otp"
+DEFAULT_OTP_HTTP_PORT = 8765
+OTP_POLL_SECONDS = 0.5
+OTP_KINDS = ("login", "payment")
+
+_OTP_LINE = re.compile(r"^\s*(?:(login|payment)\s*[:=\s]\s*)?(\d{4,8})\s*$", re.IGNORECASE)
+
+
+def get_otp_timeout() -> float:
+    return env_float("ZEPTO_OTP_TIMEOUT_SECONDS", DEFAULT_OTP_TIMEOUT_SECONDS)
+
+
+def parse_otp_lines(text: str) -> list[tuple]:
+    """(kind or None, code) for every line of text that holds an OTP."""
+    found = []
+    for line in text.splitlines():
+        match = _OTP_LINE.match(line)
+        if match:
+            kind = match.group(1).lower() if match.group(1) else None
+            found.append((kind, match.group(2)))
+    return found
+
+
+class OtpProvider:
+    """
+    The tool-call path: never delivers anything inline. Subclasses fill the
+    inbox from their source; wait() takes the newest matching code.
+    """
+
+    name = "tool"
+    inline = False
+
+    def __init__(self):
+        self.inbox: list[dict] = []  # {"kind", "otp", "at"}
+
+    def deliver(self, otp: str, kind: str = None, source: str = None, at: float = None) -> None:
+        kind = kind.lower() if kind else None
+        if kind and kind not in OTP_KINDS:
+            print(f"⚠️ Ignoring OTP for unknown kind '{kind}'")
+            return
+        self.inbox.append({"kind": kind, "otp": otp, "at": time.time() if at is None else at})
+        print(f"📨 {kind or 'An'} OTP received via {source or self.name}")
+
+    def _take(self, kind: str, since: float) -> str:
+        matches = [m for m in self.inbox if m["at"] >= since and m["kind"] in (kind, None)]
+        if not matches:
+            return None
+        newest = matches[-1]
+        # Older codes for this OTP are superseded; codes for the other kind stay queued
+        self.inbox = [m for m in self.inbox if m["at"] > newest["at"] or m["kind"] not in (kind, None)]
+        return newest["otp"]
+
+    async def _collect(self) -> None:
+        """Pull whatever the source has into the inbox."""
+
+    def _accepted(self) -> None:
+        """Called once wait() has handed a code to the flow."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self.inbox.clear()
+
+    async def wait(self, kind: str, timeout: float = None, since: float = None, still_waiting=None) -> str:
+        """
+        The next kind OTP delivered after since, or None on timeout, when
+        still_waiting() turns false (the tool path took over), or for the
+        tool provider. Pass the time the OTP was requested as since: the
+        default, now, drops a code that arrived before wait() was called.
+        """
+        if not self.inline:
+            return None
+        await self.start()
+        since = time.time() if since is None else since
+        deadline = time.monotonic() + (get_otp_timeout() if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            if still_waiting and not still_waiting():
+                return None
+            await self._collect()
+            otp = self._take(kind, since)
+            if otp:
+                self._accepted()
+                return otp
+            await asyncio.sleep(OTP_POLL_SECONDS)
+        print(f"⏰ No {kind} OTP from {self.name} provider, falling back to the tool call")
+        return None
+
+    def describe(self) -> str:
+        return "the submit OTP tools"
+
+
+class FileOtpProvider(OtpProvider):
+    """Reads OTPs written to a drop file (removed once a code from it is used) or a FIFO."""
+
+    name = "file"
+    inline = True
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = os.path.abspath(path or os.getenv("ZEPTO_OTP_FILE") or DEFAULT_OTP_FILE)
+        self._fifo_fd = None
+        self._fifo_buffer = ""
+        self._read_mtime = None  # mtime of the drop file whose codes are in the inbox
+
+    def _is_fifo(self) -> bool:
+        try:
+            return stat.S_ISFIFO(os.stat(self.path).st_mode)
+        except OSError:
+            return False
+
+    async def _collect(self) -> None:
+        if self._is_fifo():
+            self._read_fifo()
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._read_mtime:
+                return
+            with open(self.path) as f:
+                text = f.read()
+        except OSError:
+            return
+        found = parse_otp_lines(text)
+        if not found:
+            return
+        # The file stays until one of its codes is used (see _accepted), so a code
+        # that is too old for this wait is still there for a later one
+        self._read_mtime = mtime
+        for kind, otp in found:
+            # Stamped with the file's mtime, so a file left over from an earlier order is ignored
+            self.deliver(otp, kind, source=f"file {os.path.basename(self.path)}", at=mtime)
+
+    def _accepted(self) -> None:
+        # Consume the file so the same code is never typed twice - unless it was rewritten meanwhile
+        try:
+            if self._read_mtime is not None and os.path.getmtime(self.path) == self._read_mtime:
+                os.remove(self.path)
+        except OSError:
+            pass
+
+    def _read_fifo(self) -> None:
+        if self._fifo_fd is None:
+            # Non-blocking, so an idle FIFO without a writer never stalls the loop
+            self._fifo_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            chunk = os.read(self._fifo_fd, 4096).decode(errors="ignore")
+        except BlockingIOError:
+            return
+        if not chunk:
+            return
+        self._fifo_buffer += chunk
+        *lines, self._fifo_buffer = self._fifo_buffer.split("\n")
+        for kind, otp in parse_otp_lines("\n".join(lines)):
+            self.deliver(otp, kind, source="FIFO")
+
+    async def stop(self) -> None:
+        await super().stop()
+        self._read_mtime = None
+        if self._fifo_fd is not None:
+            os.close(self._fifo_fd)
+            self._fifo_fd = None
+            self._fifo_buffer = ""
+
+    def describe(self) -> str:
+        return f"the OTP file {self.path}"
+
+
+class HttpOtpProvider(OtpProvider):
+    """A minimal local HTTP endpoint (POST /otp[/login|/payment]) that accepts OTPs."""
+
+    name = "http"
+    inline = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = None, token: str = None):
+        super().__init__()
+        self.host = host
+        self.port = int(port or env_float("ZEPTO_OTP_HTTP_PORT", DEFAULT_OTP_HTTP_PORT))
+        self.token = token if token is not None else os.getenv("ZEPTO_OTP_HTTP_TOKEN", "")
+        self._server = None
+
+    async def start(self) -> None:
+        if self._server:
+            return
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"📮 OTP endpoint listening on http://{self.host}:{self.port}/otp")
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer) -> None:
+        try:
+            code, body = await asyncio.wait_for(self._serve(reader), timeout=10)
+        except Exception as e:
+            code, body = 400, {"error": str(e) or type(e).__name__}
+        payload = json.dumps(body).encode()
+        reason = {202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found"}.get(code, "OK")
+        writer.write(
+            f"HTTP/1.1 {code} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _serve(self, reader) -> tuple[int, dict]:
+        method, target, _ = (await reader.readline()).decode().split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        raw = (await reader.readexactly(length)).decode(errors="ignore") if length else ""
+
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        if method not in ("POST", "GET") or not parts or parts[0] != "otp" or len(parts) > 2:
+            return 404, {"error": "POST /otp or /otp/<login|payment>"}
+        if self.token:
+            bearer = headers.get("authorization", "").removeprefix("Bearer ").strip()
+            if self.token not in (bearer, query.get("token")):
+                return 401, {"error": "bad token"}
+
+        kind = parts[1] if len(parts) == 2 else query.get("kind")
+        otp = query.get("otp")
+        if raw.strip().startswith("{"):
+            data = json.loads(raw)
+            otp = str(data.get("otp") or otp or "")
+            kind = data.get("kind") or kind
+        elif raw.strip():
+            found = parse_otp_lines(raw)
+            if found:
+                kind = kind or found[0][0]
+                otp = found[0][1]
+        if not otp or not parse_otp_lines(otp):
+            return 400, {"error": "no OTP in request"}
+        if kind and kind.lower() not in OTP_KINDS:
+            return 400, {"error": f"kind must be one of {', '.join(OTP_KINDS)}"}
+        self.deliver(otp.strip(), kind, source="http")
+        return 202, {"accepted": True, "kind": kind or "any"}
+
+    def describe(self) -> str:
+        return f"POST http://{self.host}:{self.port}/otp"
+
+
+class StdinOtpProvider(OtpProvider):
+    """
+    Reads OTPs typed at the terminal. Under MCP, stdin is the JSON-RPC pipe,
+    so the controlling terminal (/dev/tty) is read instead.
+    """
+
+    name = "stdin"
+    inline = True
+
+    def __init__(self):
+        super().__init__()
+        self._thread = None
+        self._loop = None
+
+    def _open_terminal(self):
+        if sys.stdin and sys.stdin.isatty():
+            return sys.stdin
+        return open("/dev/tty")
+
+    async def start(self) -> None:
+        if self._thread:
+            return
+        stream = self._open_terminal()  # OSError without a terminal; the caller falls back to tools
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._read_lines, args=(stream,), daemon=True, name="otp-stdin")
+        self._thread.start()
+
+    def _read_lines(self, stream) -> None:
+        # A blocking readline can't be cancelled, so one daemon thread reads for the life of the process
+        for line in stream:
+            for kind, otp in parse_otp_lines(line):
+                self._loop.call_soon_threadsafe(self.deliver, otp, kind, "terminal")
+
+    async def wait(self, kind: str, timeout: float = None, since: float = None, still_waiting=None) -> str:
+        print(f"⌨️  Type the {kind} OTP and press Enter:")
+        return await super().wait(kind, timeout, since, still_waiting)
+
+    def describe(self) -> str:
+        return "the terminal"
+
+
+OTP_PROVIDERS = {
+    "tool": OtpProvider,
+    "file": FileOtpProvider,
+    "fifo": FileOtpProvider,
+    "http": HttpOtpProvider,
+    "stdin": StdinOtpProvider,
+}
+
+
+def get_otp_provider(name: str = None) -> OtpProvider:
+    """Provider chosen by ZEPTO_OTP_PROVIDER (default: the tool-call path)."""
+    name = (name or os.getenv("ZEPTO_OTP_PROVIDER") or "tool").strip().lower()
+    if name not in OTP_PROVIDERS:
+        print(f"⚠️ Unknown ZEPTO_OTP_PROVIDER '{name}', using tool calls. Choose from: {', '.join(OTP_PROVIDERS)}")
+        name = "tool"
+    return OTP_PROVIDERS[name]()
@@ -0,0 +1,243 @@
+"""
+Product stock, name and price over plain HTTP.
+
+Rendering a /pn/... page in Playwright to read three facts costs a tab,
+scripts, layout and a few hundred KB of assets. The server-rendered HTML
+already carries them: a schema.org Product block (JSON-LD) and the Next.js
+state (__NEXT_DATA__, or the streamed self.__next_f chunks). A ProductProbe
+fetches that HTML with one pooled httpx.AsyncClient, carrying the browser
+session's cookies (and so its delivery store), and parses the JSON instead
+of the DOM.
+
+    probe = ProductProbe()
+    probe.use_browser(await context.cookies(), user_agent)
+    info = await probe.fetch(url)      # {"in_stock", "name", "price", "via"} or None
+    probe.verify(page_result, info)    # does HTTP agree with the page?
+
+The markup is not a contract, so the probe is only trusted after verify()
+has seen it agree with a browser check of the same product under the same
+cookies, and a page it can't parse returns None so the caller falls back to
+the browser (see StockRefresher in zepto_stock.py). verify() also learns
+whether prices come in rupees or paise.
+"""
+
+import html as html_lib
+import json
+import re
+
+import httpx
+
+from zepto_catalog import parse_pvid
+from zepto_session import zepto_cookies
+from zepto_util import print
+
+
+PROBE_TIMEOUT_SECONDS = 10.0
+PROBE_MAX_CONNECTIONS = 4
+
+JSON_LD = re.compile(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.S | re.I)
+NEXT_DATA = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S | re.I)
+NEXT_FLIGHT = re.compile(r'self\.__next_f\.push\(\[1,\s*("(?:[^"\\]|\\.)*")\]\)', re.S)
+
+# Stock flags seen in storefront state, and whether true means in stock
+STOCK_FLAGS = {"inStock": True, "isInStock": True, "available": True, "isAvailable": True,
+               "outOfStock": False, "isOutOfStock": False, "soldOut": False, "isSoldOut": False}
+QUANTITY_KEYS = ("availableQuantity", "inventory", "stockQuantity")
+PRICE_KEYS = ("discountedSellingPrice", "sellingPrice", "offerPrice", "price")
+NAME_KEYS = ("name", "productName", "title")
+# The same flags as they appear inside streamed (string-encoded) chunks
+FLIGHT_FLAG = re.compile(r'"(%s)"\s*:\s*(true|false)' % "|".join(STOCK_FLAGS))
+FLIGHT_QUANTITY = re.compile(r'"(?:%s)"\s*:\s*(\d+)' % "|".join(QUANTITY_KEYS))
+FLIGHT_PRICE = re.compile(r'"(?:%s)"\s*:\s*"?(\d+(?:\.\d+)?)' % "|".join(PRICE_KEYS))
+# How far after the pvid a streamed chunk is searched for that product's fields
+FLIGHT_WINDOW = 4000
+
+
+def _number(value) -> float:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_blocks(pattern: re.Pattern, html: str) -> list:
+    blocks = []
+    for raw in pattern.findall(html):
+        try:
+            blocks.append(json.loads(html_lib.unescape(raw.strip())))
+        except ValueError:
+            continue
+    return blocks
+
+
+def _walk(node):
+    """Every dict nested in node, depth first."""
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def _from_json_ld(html: str) -> dict:
+    for block in _json_blocks(JSON_LD, html):
+        for node in _walk(block):
+            if "Product" not in str(node.get("@type", "")):
+                continue
+            offers = node.get("offers") or {}
+            offer = offers[0] if isinstance(offers, list) and offers else offers
+            if not isinstance(offer, dict):
+                continue
+            availability = str(offer.get("availability", ""))
+            if "InStock" in availability:
+                in_stock = True
+            elif "OutOfStock" in availability or "SoldOut" in availability:
+                in_stock = False
+            else:
+                continue
+            return {"in_stock": in_stock, "name": node.get("name"), "price": _number(offer.get("price")),
+                    "via": "json-ld", "price_unit": "rupees"}
+    return None
+
+
+def _stock_of(node: dict) -> bool:
+    for key, means_in_stock in STOCK_FLAGS.items():
+        if isinstance(node.get(key), bool):
+            return node[key] if means_in_stock else not node[key]
+    for key in QUANTITY_KEYS:
+        if isinstance(node.get(key), (int, float)) and not isinstance(node.get(key), bool):
+            return node[key] > 0
+    return None
+
+
+def _from_state(html: str, pvid: str) -> dict:
+    """
+    The smallest record in __NEXT_DATA__ that carries a stock flag and
+    mentions pvid (the page also embeds recommended products).
+    """
+    if not pvid:
+        return None
+    best, best_size = None, None
+    for block in _json_blocks(NEXT_DATA, html):
+        for node in _walk(block):
+            in_stock = _stock_of(node)
+            if in_stock is None:
+                continue
+            text = json.dumps(node)
+            if pvid not in text or (best_size is not None and len(text) >= best_size):
+                continue
+            best_size = len(text)
+            best = {"in_stock": in_stock, "name": next((node[k] for k in NAME_KEYS if isinstance(node.get(k), str)), None),
+                    "price": next((_number(node[k]) for k in PRICE_KEYS if node.get(k) is not None), None),
+                    "via": "next-data"}
+    return best
+
+
+def _from_flight(html: str, pvid: str) -> dict:
+    """Stock flag (and price) following the pvid in the streamed React Server Component chunks."""
+    if not pvid:
+        return None
+    text = ""
+    for raw in NEXT_FLIGHT.findall(html):
+        try:
+            text += json.loads(raw)
+        except ValueError:
+            continue
+    start = text.find(pvid)
+    while start != -1:
+        window = text[start:start + FLIGHT_WINDOW]
+        flag, quantity = FLIGHT_FLAG.search(window), FLIGHT_QUANTITY.search(window)
+        if flag or quantity:
+            in_stock = (flag.group(2) == "true") == STOCK_FLAGS[flag.group(1)] if flag else int(quantity.group(1)) > 0
+            price = FLIGHT_PRICE.search(window)
+            return {"in_stock": in_stock, "name": None, "price": _number(price.group(1)) if price else None,
+                    "via": "next-flight"}
+        start = text.find(pvid, start + 1)
+    return None
+
+
+def parse_product_html(html: str, pvid: str = None) -> dict:
+    """
+    Stock, name and price from a product page's server-rendered JSON:
+    {"in_stock", "name", "price", "via"}, or None if no source has a stock
+    state. The store-specific page state wins over the JSON-LD block, which
+    is written for search engines. Prices are as the page states them; see
+    ProductProbe.verify.
+    """
+    found = _from_state(html, pvid) or _from_flight(html, pvid)
+    seo = _from_json_ld(html)
+    if found and seo:
+        found["name"] = found["name"] or seo["name"]
+    return found or seo
+
+
+class ProductProbe:
+    """Fetches product pages over one pooled HTTP client, with the browser session's cookies."""
+
+    def __init__(self, timeout: float = PROBE_TIMEOUT_SECONDS, max_connections: int = PROBE_MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.client = None
+        self.user_agent = None
+        self.verified = False
+        self.price_scale = None  # 1 for rupees, 0.01 for paise; None until verify() has compared prices
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"Accept": "text/html,application/xhtml+xml", "Accept-Language": "en-IN,en;q=0.9"},
+            )
+        return self.client
+
+    def use_browser(self, cookies: list[dict], user_agent: str = None) -> None:
+        """Take the session (and so the delivery store) of a browser context: its Zepto cookies and UA."""
+        client = self._client()
+        client.cookies.clear()
+        for cookie in zepto_cookies(cookies):
+            client.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                               path=cookie.get("path", "/"))
+        if user_agent:
+            self.user_agent = user_agent
+            client.headers["User-Agent"] = user_agent
+        self.verified = False
+
+    async def fetch(self, url: str) -> dict:
+        """The product's stock, name and price from its page HTML, or None if it can't be read."""
+        try:
+            response = await self._client().get(url)
+        except httpx.HTTPError as e:
+            print(f"⚠️ HTTP probe of {url} failed: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        result = parse_product_html(response.text, parse_pvid(url))
+        if result and result["price"] is not None and result.get("price_unit") != "rupees":
+            result["raw_price"] = result["price"]
+            result["price"] = round(result["price"] * self.price_scale, 2) if self.price_scale else None
+        return result
+
+    def verify(self, page_result: dict, http_result: dict) -> bool:
+        """
+        Compare an HTTP result with a browser check of the same product and
+        session; trust the probe only if the stock state agrees. Also learns
+        the price unit of the embedded state from the two prices.
+        """
+        self.verified = bool(http_result) and http_result["in_stock"] == page_result["in_stock"]
+        if not self.verified:
+            return False
+        page_price, http_price = page_result.get("price"), http_result.get("raw_price", http_result.get("price"))
+        if page_price and http_price and http_result.get("price_unit") != "rupees":
+            ratio = http_price / page_price
+            self.price_scale = 1.0 if abs(ratio - 1) < 0.01 else 0.01 if abs(ratio - 100) < 1 else None
+        return True
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
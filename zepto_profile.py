@@ -0,0 +1,512 @@
+"""
+Ownership of the persistent browser profile directories (zepto_firefox_data etc.).
+
+The MCP server, the API server and setup_firefox_login.py all open the same
+profile, and a profile opened by two browsers at once gets corrupted (or
+the second launch fails and the session is thrown away). A ProfileLease is
+an fcntl lock on a "<profile>.lease" file next to the profile: only the
+holder may launch a browser on it, and the kernel drops the lock when the
+holding process dies, so a lease can never go stale.
+
+The browser's own lock files (Firefox "lock"/".parentlock", Chromium
+"SingletonLock") are only removed once the process that created them is
+confirmed dead; while it is alive the lease waits (or fails fast) instead.
+
+The ProfileJanitor keeps a profile small: it prunes leftover backup
+directories, vacuums SQLite stores, trims caches and caches the profile's
+metadata so nothing has to walk it on every order.
+
+Configuration (environment variables):
+- ZEPTO_PROFILE_WAIT_SECONDS: how long to wait for a busy profile before
+  giving up (default 15, 0 = fail fast)
+- ZEPTO_PROFILE_KEEP_BACKUPS, ZEPTO_PROFILE_CACHE_MB,
+  ZEPTO_PROFILE_JANITOR_HOURS: see ProfileJanitor
+"""
+
+import asyncio
+import errno
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+from zepto_util import env_float, print
+
+
+DEFAULT_WAIT_SECONDS = 15.0
+POLL_INTERVAL = 0.1
+
+# Lock files browsers leave in a profile. Symlinks point at "<host>:+<pid>"
+# (Firefox) or "<host>-<pid>" (Chromium); Firefox also fcntl-locks .parentlock.
+SYMLINK_LOCKS = ("lock", "SingletonLock")
+POSIX_LOCKS = (".parentlock",)
+
+
+class ProfileBusyError(Exception):
+    """The profile is held by another live process."""
+
+
+def get_wait_seconds() -> float:
+    value = os.getenv("ZEPTO_PROFILE_WAIT_SECONDS", "").strip()
+    if not value:
+        return DEFAULT_WAIT_SECONDS
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        print(f"⚠️ Invalid ZEPTO_PROFILE_WAIT_SECONDS '{value}', using {DEFAULT_WAIT_SECONDS}")
+        return DEFAULT_WAIT_SECONDS
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+def _symlink_lock_pid(path: str) -> int:
+    """PID recorded in a browser's symlink lock, or None if unreadable."""
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return None
+    digits = target.rsplit("+", 1)[-1] if "+" in target else target.rsplit("-", 1)[-1]
+    return int(digits) if digits.isdigit() else None
+
+
+def _posix_lock_held(path: str) -> bool:
+    """True if another process holds a POSIX (fcntl) lock on path, as Firefox does on .parentlock."""
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError as e:
+        return e.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EACCES)
+    else:
+        fcntl.lockf(fd, fcntl.LOCK_UN)
+        return False
+    finally:
+        os.close(fd)
+
+
+def browser_lock_owner(profile_dir: str) -> int:
+    """
+    PID of a live browser still using profile_dir, or None.
+    Returns -1 when the profile is locked by a process whose PID is unknown.
+    """
+    for name in SYMLINK_LOCKS:
+        path = os.path.join(profile_dir, name)
+        if os.path.islink(path):
+            pid = _symlink_lock_pid(path)
+            if pid and pid_alive(pid):
+                return pid
+    for name in POSIX_LOCKS:
+        if _posix_lock_held(os.path.join(profile_dir, name)):
+            return -1
+    return None
+
+
+def clear_stale_browser_locks(profile_dir: str) -> list[str]:
+    """Remove lock files left by a browser that is no longer running. Returns what was removed."""
+    if browser_lock_owner(profile_dir) is not None:
+        return []
+    removed = []
+    for name in SYMLINK_LOCKS + POSIX_LOCKS:
+        path = os.path.join(profile_dir, name)
+        if os.path.lexists(path):
+            try:
+                os.remove(path)
+                removed.append(name)
+            except OSError:
+                pass
+    if removed:
+        print(f"🧹 Removed stale browser lock files from {os.path.basename(profile_dir)}: {', '.join(removed)}")
+    return removed
+
+
+class ProfileLease:
+    """
+    Exclusive right to launch a browser on one profile directory.
+
+        lease = ProfileLease(profile_dir)
+        await lease.acquire_async()      # or lease.acquire() from sync code
+        ... launch_persistent_context(profile_dir) ...
+        lease.release()                  # after the context is closed
+
+    Acquiring waits up to wait_seconds (ZEPTO_PROFILE_WAIT_SECONDS) for
+    another lease holder or a still-running browser to let go, then raises
+    ProfileBusyError naming the owner. Stale browser locks are cleared.
+    """
+
+    def __init__(self, profile_dir: str, wait_seconds: float = None):
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.lease_path = f"{self.profile_dir}.lease"
+        self.wait_seconds = get_wait_seconds() if wait_seconds is None else wait_seconds
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def owner(self) -> int:
+        """PID written by the current lease holder, if any."""
+        try:
+            with open(self.lease_path) as f:
+                value = f.read().split()[0]
+            return int(value)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _try_acquire(self) -> str:
+        """One non-blocking attempt. Returns None on success, else why the profile is busy."""
+        if self._fd is None:
+            fd = os.open(self.lease_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                os.close(fd)
+                if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EACCES):
+                    owner = self.owner()
+                    return f"leased by pid {owner}" if owner else "leased by another process"
+                raise
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()} {time.time():.0f}\n".encode())
+            self._fd = fd
+
+        # We own the lease; a browser from a previous holder may still be exiting
+        os.makedirs(self.profile_dir, exist_ok=True)
+        browser_pid = browser_lock_owner(self.profile_dir)
+        if browser_pid is not None:
+            return "still open in a browser" + (f" (pid {browser_pid})" if browser_pid > 0 else "")
+        clear_stale_browser_locks(self.profile_dir)
+        return None
+
+    def _busy_error(self, reason: str) -> ProfileBusyError:
+        return ProfileBusyError(
+            f"Browser profile {self.profile_dir} is busy ({reason}). "
+            f"Stop the other Zepto server or setup script using it, or raise ZEPTO_PROFILE_WAIT_SECONDS to wait longer."
+        )
+
+    def acquire(self, wait_seconds: float = None) -> "ProfileLease":
+        deadline = time.monotonic() + (self.wait_seconds if wait_seconds is None else wait_seconds)
+        announced = False
+        while True:
+            reason = self._try_acquire()
+            if reason is None:
+                return self
+            if time.monotonic() >= deadline:
+                self.release()
+                raise self._busy_error(reason)
+            if not announced:
+                print(f"⏳ Profile busy ({reason}), waiting...")
+                announced = True
+            time.sleep(POLL_INTERVAL)
+
+    async def acquire_async(self, wait_seconds: float = None) -> "ProfileLease":
+        """Like acquire(), but polls without blocking the event loop."""
+        deadline = time.monotonic() + (self.wait_seconds if wait_seconds is None else wait_seconds)
+        announced = False
+        while True:
+            reason = self._try_acquire()
+            if reason is None:
+                return self
+            if time.monotonic() >= deadline:
+                self.release()
+                raise self._busy_error(reason)
+            if not announced:
+                print(f"⏳ Profile busy ({reason}), waiting...")
+                announced = True
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ============================================================================
+# PROFILE JANITOR
+# ============================================================================
+
+DEFAULT_KEEP_BACKUPS = 1
+DEFAULT_CACHE_BUDGET_MB = 100.0
+DEFAULT_JANITOR_INTERVAL_HOURS = 24.0
+METADATA_MAX_AGE_SECONDS = 6 * 3600
+PROFILE_HISTORY_SIZE = 200
+
+# Disposable caches inside a profile (Firefox, then Chromium/WebKit layouts)
+CACHE_DIRS = (
+    "cache2", "startupCache", "thumbnails", "shader-cache", "jumpListCache",
+    os.path.join("Default", "Cache"), os.path.join("Default", "Code Cache"),
+    os.path.join("Default", "GPUCache"), "GrShaderCache", "ShaderCache", "WebKitCache",
+)
+
+# Where each engine keeps its cookie store
+COOKIE_FILES = ("cookies.sqlite", os.path.join("Default", "Cookies"), "Cookies")
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+def _is_sqlite(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+class ProfileJanitor:
+    """
+    Keeps a persistent profile small and cheap to inspect.
+
+    run() (or run_if_due() on a schedule) takes the profile's lease, so it
+    only ever touches a profile no browser has open, then:
+    - deletes "<profile>_backup_<ts>" directories beyond the newest few
+    - VACUUMs the profile's SQLite stores (cookies, history, storage)
+    - trims browser caches, oldest files first, down to a size budget
+    - rescans the profile and caches the result
+
+    Metadata (size, file count, cookie store) and a history of profile size
+    and launch time live in "<profile>.meta.json", so callers read
+    metadata() instead of walking the profile on every order.
+
+    Configuration: ZEPTO_PROFILE_KEEP_BACKUPS (default 1),
+    ZEPTO_PROFILE_CACHE_MB (default 100), ZEPTO_PROFILE_JANITOR_HOURS
+    (default 24, 0 disables scheduled runs).
+    """
+
+    def __init__(self, profile_dir: str, keep_backups: int = None, cache_budget_mb: float = None,
+                 interval_hours: float = None):
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.meta_path = f"{self.profile_dir}.meta.json"
+        self.keep_backups = int(keep_backups if keep_backups is not None
+                                else env_float("ZEPTO_PROFILE_KEEP_BACKUPS", DEFAULT_KEEP_BACKUPS))
+        self.cache_budget_mb = float(cache_budget_mb if cache_budget_mb is not None
+                                     else env_float("ZEPTO_PROFILE_CACHE_MB", DEFAULT_CACHE_BUDGET_MB))
+        self.interval_hours = float(interval_hours if interval_hours is not None
+                                    else env_float("ZEPTO_PROFILE_JANITOR_HOURS", DEFAULT_JANITOR_INTERVAL_HOURS))
+
+    # ------------------------------------------------------------------ state
+
+    def _load(self) -> dict:
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if isinstance(meta, dict):
+                meta.setdefault("history", [])
+                return meta
+        except (OSError, ValueError):
+            pass
+        return {"scan": None, "last_run": None, "last_run_result": None, "history": []}
+
+    def _save(self, meta: dict) -> None:
+        del meta["history"][:-PROFILE_HISTORY_SIZE]
+        tmp_path = f"{self.meta_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, self.meta_path)
+        except OSError as e:
+            print(f"⚠️ Could not save profile metadata: {e}")
+
+    # --------------------------------------------------------------- metadata
+
+    def scan(self) -> dict:
+        """Walk the profile once and cache size, file count and cookie store details."""
+        size = 0
+        file_count = 0
+        for root, _, files in os.walk(self.profile_dir):
+            for name in files:
+                try:
+                    size += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue
+                file_count += 1
+        cookie_file = next((f for f in COOKIE_FILES if os.path.exists(os.path.join(self.profile_dir, f))), None)
+        scan = {
+            "exists": os.path.isdir(self.profile_dir),
+            "file_count": file_count,
+            "size_mb": round(size / (1024 * 1024), 1),
+            "cookie_file": cookie_file,
+            "cookie_bytes": os.path.getsize(os.path.join(self.profile_dir, cookie_file)) if cookie_file else 0,
+            "scanned_at": time.time(),
+        }
+        meta = self._load()
+        meta["scan"] = scan
+        self._save(meta)
+        return scan
+
+    def metadata(self, max_age: float = METADATA_MAX_AGE_SECONDS) -> dict:
+        """Cached scan() result; rescans only when missing or older than max_age seconds."""
+        scan = self._load().get("scan")
+        if scan and time.time() - scan.get("scanned_at", 0) < max_age:
+            return scan
+        return self.scan()
+
+    def record_launch(self, launch_s: float) -> None:
+        """Append a launch time (with the last known profile size) to the history."""
+        meta = self._load()
+        scan = meta.get("scan") or {}
+        meta["history"].append({"at": time.time(), "launch_s": round(launch_s, 2), "size_mb": scan.get("size_mb")})
+        self._save(meta)
+
+    # ------------------------------------------------------------ maintenance
+
+    def prune_backups(self) -> list[str]:
+        """Delete old "<profile>_backup_<ts>" directories, keeping the newest keep_backups."""
+        parent = os.path.dirname(self.profile_dir)
+        prefix = f"{os.path.basename(self.profile_dir)}_backup_"
+        try:
+            backups = sorted(
+                (name for name in os.listdir(parent)
+                 if name.startswith(prefix) and os.path.isdir(os.path.join(parent, name))),
+                key=lambda name: os.path.getmtime(os.path.join(parent, name)),
+                reverse=True,
+            )
+        except OSError:
+            return []
+        removed = []
+        for name in backups[max(0, self.keep_backups):]:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+            removed.append(name)
+        return removed
+
+    def vacuum_sqlite(self) -> float:
+        """VACUUM every SQLite store in the profile. Returns MB reclaimed."""
+        reclaimed = 0
+        for root, dirs, files in os.walk(self.profile_dir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) not in self._cache_paths()]
+            for name in files:
+                if name.endswith(("-wal", "-shm", "-journal")):
+                    continue
+                path = os.path.join(root, name)
+                if not _is_sqlite(path):
+                    continue
+                before = self._file_set_size(path)
+                try:
+                    db = sqlite3.connect(path, timeout=1, isolation_level=None)
+                    try:
+                        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                        db.execute("VACUUM")
+                    finally:
+                        db.close()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not vacuum {os.path.relpath(path, self.profile_dir)}: {e}")
+                    continue
+                reclaimed += max(0, before - self._file_set_size(path))
+        return round(reclaimed / (1024 * 1024), 1)
+
+    @staticmethod
+    def _file_set_size(path: str) -> int:
+        return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+    def _cache_paths(self) -> set[str]:
+        return {os.path.join(self.profile_dir, d) for d in CACHE_DIRS}
+
+    def trim_caches(self) -> float:
+        """Delete cache files, oldest first, until all caches fit the budget. Returns MB freed."""
+        entries = []
+        for cache_dir in self._cache_paths():
+            for root, _, files in os.walk(cache_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.lstat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        budget = self.cache_budget_mb * 1024 * 1024
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= budget:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                pass
+        return round(freed / (1024 * 1024), 1)
+
+    def run(self) -> dict:
+        """Run every maintenance step if no browser holds the profile. Blocking; see run_async()."""
+        lease = ProfileLease(self.profile_dir, wait_seconds=0)
+        try:
+            lease.acquire()
+        except ProfileBusyError:
+            return {"skipped": "profile in use"}
+
+        start = time.perf_counter()
+        try:
+            before_mb = (self._load().get("scan") or {}).get("size_mb")
+            result = {
+                "backups_removed": self.prune_backups(),
+                "sqlite_reclaimed_mb": self.vacuum_sqlite() if os.path.isdir(self.profile_dir) else 0,
+                "cache_freed_mb": self.trim_caches(),
+            }
+            scan = self.scan()
+        finally:
+            lease.release()
+
+        result.update({"size_before_mb": before_mb, "size_after_mb": scan["size_mb"],
+                       "seconds": round(time.perf_counter() - start, 2)})
+        meta = self._load()
+        meta["last_run"] = time.time()
+        meta["last_run_result"] = result
+        meta["history"].append({"at": meta["last_run"], "size_mb": scan["size_mb"], "janitor": True})
+        self._save(meta)
+        print(f"🧹 Profile maintenance: {result['size_before_mb']} → {result['size_after_mb']} MB "
+              f"({len(result['backups_removed'])} backups removed, {result['sqlite_reclaimed_mb']} MB vacuumed, "
+              f"{result['cache_freed_mb']} MB cache trimmed) in {result['seconds']}s")
+        return result
+
+    def due(self) -> bool:
+        if not self.interval_hours:
+            return False
+        last_run = self._load().get("last_run") or 0
+        return time.time() - last_run >= self.interval_hours * 3600
+
+    async def run_async(self) -> dict:
+        return await asyncio.to_thread(self.run)
+
+    async def run_if_due(self) -> dict:
+        """Scheduled entry point: runs maintenance off the event loop when the interval has passed."""
+        if not self.due():
+            return None
+        try:
+            return await self.run_async()
+        except Exception as e:
+            print(f"⚠️ Profile maintenance failed: {e}")
+            return None
+
+    def report(self, limit: int = 50) -> dict:
+        """Cached metadata, the last maintenance result and recent size/launch-time history."""
+        meta = self._load()
+        launches = [h["launch_s"] for h in meta["history"] if h.get("launch_s") is not None]
+        return {
+            "profile": self.profile_dir,
+            "metadata": meta.get("scan"),
+            "last_run": meta.get("last_run"),
+            "last_run_result": meta.get("last_run_result"),
+            "avg_launch_s": round(sum(launches[-20:]) / len(launches[-20:]), 2) if launches else None,
+            "history": meta["history"][-limit:],
+        }
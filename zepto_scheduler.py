@@ -0,0 +1,129 @@
+"""
+Dependency-graph scheduler for the order flow.
+
+The order flow used to be one straight line: send the login OTP, wait for
+the human, then load every product page. A StepGraph lets each piece of work
+declare what it actually depends on, either another step or a gate (an
+outside event such as "login" opening when the OTP is accepted), and starts
+every step as soon as its dependencies are met. Work that doesn't need the
+OTP therefore runs while the human is still reading their phone.
+
+    graph = StepGraph("order")
+    graph.gate("login")
+    graph.add("product:1", lambda: prefetch(url1))
+    graph.add("cart", read_cart, deps=["login"])
+    graph.start()
+    ...
+    graph.open("login")                         # OTP accepted
+    info = await graph.result("product:1", timeout=3)
+
+Steps are plain async callables. A step that fails or times out yields None
+from result(), so callers always fall back to doing the work inline.
+"""
+
+import asyncio
+import time
+
+from zepto_util import print
+
+
+class StepGraph:
+    """A small DAG of async steps with external gates, run on the current event loop."""
+
+    def __init__(self, name: str = "flow"):
+        self.name = name
+        self.steps: dict[str, dict] = {}
+        self.gates: dict[str, asyncio.Event] = {}
+        self.gate_times: dict[str, float] = {}
+        self.started_at = None
+
+    def gate(self, name: str) -> None:
+        """Declare an external dependency that is satisfied by open(name)."""
+        self.gates.setdefault(name, asyncio.Event())
+
+    def add(self, name: str, fn, deps: list[str] = ()) -> None:
+        """Add a step. deps may name other steps or gates."""
+        if name in self.steps or name in self.gates:
+            raise ValueError(f"Duplicate step '{name}' in {self.name} graph")
+        self.steps[name] = {"fn": fn, "deps": list(deps), "task": None,
+                            "start": None, "end": None, "error": None}
+
+    def open(self, name: str) -> None:
+        """Satisfy a gate; steps waiting only on it start now."""
+        self.gate(name)
+        if not self.gates[name].is_set():
+            self.gate_times[name] = self._now()
+            self.gates[name].set()
+
+    def start(self) -> None:
+        """Start every step; each waits for its own dependencies."""
+        unknown = {d for s in self.steps.values() for d in s["deps"]} - set(self.steps) - set(self.gates)
+        if unknown:
+            raise ValueError(f"Unknown dependencies in {self.name} graph: {', '.join(sorted(unknown))}")
+        self.started_at = time.perf_counter()
+        for name, step in self.steps.items():
+            step["task"] = asyncio.create_task(self._run(name, step))
+
+    async def _run(self, name: str, step: dict):
+        for dep in step["deps"]:
+            if dep in self.gates:
+                await self.gates[dep].wait()
+            else:
+                await asyncio.shield(self.steps[dep]["task"])
+        step["start"] = self._now()
+        try:
+            return await step["fn"]()
+        except asyncio.CancelledError:
+            step["error"] = "cancelled"
+            raise
+        except Exception as e:
+            step["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"⚠️ Step {name} failed: {step['error']}")
+            return None
+        finally:
+            step["end"] = self._now()
+
+    def _now(self) -> float:
+        return round(time.perf_counter() - (self.started_at or time.perf_counter()), 2)
+
+    def done(self, name: str) -> bool:
+        task = self.steps.get(name, {}).get("task")
+        return bool(task and task.done())
+
+    async def result(self, name: str, timeout: float = None):
+        """Result of a step, waiting up to timeout seconds; None if it failed, timed out or doesn't exist."""
+        step = self.steps.get(name)
+        if not step or not step["task"]:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(step["task"]), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            return None
+        except Exception:
+            return None
+
+    def cancel(self) -> None:
+        for step in self.steps.values():
+            if step["task"] and not step["task"].done():
+                step["task"].cancel()
+
+    def timeline(self) -> list[dict]:
+        """Start/end (seconds since start()) of every step and gate, in start order."""
+        rows = [{"step": name, "start": s["start"], "end": s["end"], "deps": s["deps"], "error": s["error"]}
+                for name, s in self.steps.items()]
+        rows += [{"step": f"gate:{name}", "start": at, "end": at, "deps": [], "error": None}
+                 for name, at in self.gate_times.items()]
+        return sorted(rows, key=lambda r: (r["start"] is None, r["start"] or 0))
+
+    def summary(self) -> str:
+        """One line per step, for logs."""
+        lines = [f"📈 {self.name} timeline:"]
+        for row in self.timeline():
+            if row["start"] is None:
+                span = "not started"
+            elif row["end"] is None:
+                span = f"{row['start']:.2f}s → running"
+            else:
+                span = f"{row['start']:.2f}s → {row['end']:.2f}s"
+            lines.append(f"   {row['step']:<20} {span}{'  (' + row['error'] + ')' if row['error'] else ''}")
+        return "\n".join(lines)
@@ -0,0 +1,387 @@
+"""
+Keeps the saved Zepto login alive between orders.
+
+A lapsed session sends start_order down the slow path: phone number, a
+human-typed OTP, then submit_login. The SessionKeeper periodically loads a
+cheap authenticated page so Zepto refreshes its cookies, reads the cookie
+expiry times to predict when the session will die, and raises an alert
+(stderr, plus an optional webhook) before that happens or as soon as the
+session is found logged out.
+
+It either borrows an already open context (the API server's long-lived
+browser) or parks a short-lived headless persistent context on the profile.
+It only takes the profile when its lease is free, so it never disturbs an
+order.
+
+Configuration (environment variables):
+- ZEPTO_KEEPALIVE_MINUTES: refresh interval (default 360, 0 disables)
+- ZEPTO_KEEPALIVE_URL: page to load (default https://www.zeptonow.com/account)
+- ZEPTO_SESSION_ALERT_HOURS: alert when the session has less than this left (default 48)
+- ZEPTO_SESSION_ALERT_WEBHOOK: URL that receives alert JSON (e.g. an n8n webhook)
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from playwright.async_api import async_playwright
+
+from zepto_browser import (
+    BrowserLauncher, apply_storage_state, context_options, get_device_mode, handle_rss_mb, sel,
+)
+from zepto_profile import ProfileBusyError, ProfileLease
+from zepto_util import env_float, print
+
+
+DEFAULT_KEEPALIVE_MINUTES = 360.0
+DEFAULT_KEEPALIVE_URL = "https://www.zeptonow.com/account"
+DEFAULT_ALERT_HOURS = 48.0
+SESSION_STATE_FILE = ".zepto_session.json"
+KEEPALIVE_PAGE_TIMEOUT_MS = 20000
+
+# Cookies that look like they carry the login; if none match, every
+# persistent Zepto cookie is considered.
+AUTH_COOKIE_HINTS = ("token", "auth", "session", "sid", "user", "refresh", "login")
+
+# Don't repeat the same alert more often than this
+ALERT_REPEAT_SECONDS = 12 * 3600
+
+
+def zepto_cookies(cookies: list[dict]) -> list[dict]:
+    """Cookies set by Zepto that carry a value."""
+    return [c for c in cookies if "zepto" in c.get("domain", "").lower() and c.get("value")]
+
+
+def predict_session_expiry(cookies: list[dict]) -> float:
+    """
+    Unix time at which the login is expected to lapse: the earliest expiry
+    among the auth-looking Zepto cookies (session-only cookies are ignored).
+    Returns None when no persistent Zepto cookie exists.
+    """
+    persistent = [c for c in zepto_cookies(cookies) if c.get("expires", -1) > 0]
+    auth = [c for c in persistent if any(hint in c["name"].lower() for hint in AUTH_COOKIE_HINTS)]
+    candidates = auth or persistent
+    if not candidates:
+        return None
+    return min(c["expires"] for c in candidates)
+
+
+class SessionKeeper:
+    """
+    Periodically refreshes the Zepto session and predicts when it expires.
+
+        keeper = SessionKeeper(launcher, get_context=..., is_busy=...)
+        keeper.start()                 # background loop
+        await keeper.refresh()         # one refresh now
+        keeper.status()                # last check, expiry prediction, alerts
+
+    is_busy, if given, returns True while an order is running; the refresh
+    is then skipped because the order itself keeps the session fresh.
+    get_context, if given, returns an open context to borrow (or None).
+    Without one, a headless persistent context is parked on the profile for
+    the duration of the refresh.
+    """
+
+    def __init__(self, launcher: BrowserLauncher, get_context=None, is_busy=None, interval_minutes: float = None,
+                 alert_hours: float = None, webhook_url: str = None, state_path: str = None):
+        self.launcher = launcher
+        self.get_context = get_context
+        self.is_busy = is_busy
+        self.interval_minutes = (interval_minutes if interval_minutes is not None
+                                 else env_float("ZEPTO_KEEPALIVE_MINUTES", DEFAULT_KEEPALIVE_MINUTES))
+        self.alert_hours = alert_hours if alert_hours is not None else env_float("ZEPTO_SESSION_ALERT_HOURS", DEFAULT_ALERT_HOURS)
+        self.webhook_url = webhook_url if webhook_url is not None else os.getenv("ZEPTO_SESSION_ALERT_WEBHOOK", "")
+        self.url = os.getenv("ZEPTO_KEEPALIVE_URL", DEFAULT_KEEPALIVE_URL)
+        self.state_path = state_path or os.path.join(launcher.base_dir, SESSION_STATE_FILE)
+        self.state = self._load_state()
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------------ state
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if isinstance(state, dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"last_refresh": None, "logged_in": None, "expires_at": None, "last_alert": None,
+                "last_alert_at": None, "refreshes": 0}
+
+    def _save_state(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"⚠️ Could not save session state: {e}")
+
+    def hours_left(self) -> float:
+        expires_at = self.state.get("expires_at")
+        if not expires_at:
+            return None
+        return round((expires_at - time.time()) / 3600, 1)
+
+    def likely_logged_in(self) -> bool:
+        """Best guess without opening a browser: last check was logged in and cookies haven't expired."""
+        hours_left = self.hours_left()
+        return bool(self.state.get("logged_in")) and (hours_left is None or hours_left > 0)
+
+    def status(self) -> dict:
+        return {
+            "enabled": bool(self.interval_minutes),
+            "interval_minutes": self.interval_minutes,
+            "last_refresh": self.state.get("last_refresh"),
+            "logged_in": self.state.get("logged_in"),
+            "expires_at": self.state.get("expires_at"),
+            "hours_left": self.hours_left(),
+            "last_alert": self.state.get("last_alert"),
+            "refreshes": self.state.get("refreshes", 0),
+        }
+
+    def describe(self) -> str:
+        """One-line summary for status messages."""
+        if self.state.get("logged_in") is None:
+            return "session not checked yet"
+        if not self.state["logged_in"]:
+            return "⚠️ saved session is logged out"
+        hours_left = self.hours_left()
+        return f"session ok, expires in ~{hours_left / 24:.1f} days" if hours_left is not None else "session ok"
+
+    # ---------------------------------------------------------------- refresh
+
+    async def refresh(self, playwright=None) -> dict:
+        """Load the keep-alive page once, record login state and expiry, alert if needed."""
+        async with self._lock:
+            if self.is_busy and self.is_busy():
+                print("ℹ️ Session keep-alive skipped (browser busy with an order)")
+                return self.status()
+            context = self.get_context() if self.get_context else None
+            if context is not None:
+                result = await self._refresh_in(context)
+            else:
+                result = await self._refresh_parked(playwright)
+            if result is None:
+                return self.status()
+
+            logged_in, cookies = result
+            self.state.update({
+                "last_refresh": time.time(),
+                "logged_in": logged_in,
+                "expires_at": predict_session_expiry(cookies),
+                "refreshes": self.state.get("refreshes", 0) + 1,
+            })
+            self._save_state()
+            print(f"🔄 Session keep-alive: {self.describe()}")
+            await self._maybe_alert()
+            return self.status()
+
+    async def _refresh_in(self, context) -> tuple[bool, list]:
+        page = await context.new_page()
+        try:
+            return await self._load_and_check(page), await context.cookies()
+        finally:
+            await page.close()
+
+    async def _refresh_parked(self, playwright) -> tuple[bool, list]:
+        engine = self.launcher.engine or "firefox"
+        profile_dir = self.launcher.profile_dir(engine)
+        if not os.path.isdir(profile_dir):
+            return None
+        lease = ProfileLease(profile_dir, wait_seconds=0)
+        try:
+            lease.acquire()
+        except ProfileBusyError:
+            print("ℹ️ Session keep-alive skipped (profile in use by an order)")
+            return None
+
+        own_playwright = playwright is None
+        try:
+            if own_playwright:
+                playwright = await async_playwright().start()
+            context = await getattr(playwright, engine).launch_persistent_context(
+                user_data_dir=profile_dir, headless=True, **context_options(get_device_mode(), engine),
+            )
+            try:
+                page = context.pages[0] if context.pages else await context.new_page()
+                return await self._load_and_check(page), await context.cookies()
+            finally:
+                await context.close()
+        except Exception as e:
+            print(f"⚠️ Session keep-alive failed: {e}")
+            return None
+        finally:
+            if own_playwright and playwright:
+                await playwright.stop()
+            lease.release()
+
+    async def _load_and_check(self, page) -> bool:
+        await page.goto(self.url, wait_until="domcontentloaded", timeout=KEEPALIVE_PAGE_TIMEOUT_MS)
+        try:
+            login_btn = await page.query_selector(sel("login_button"))
+            return not (login_btn and await login_btn.is_visible())
+        except Exception:
+            return True
+
+    # ----------------------------------------------------------------- alerts
+
+    async def _maybe_alert(self) -> None:
+        hours_left = self.hours_left()
+        if not self.state.get("logged_in"):
+            kind, message = "logged_out", "Zepto session is logged out - run setup_firefox_login.py or the next order will need an OTP"
+        elif hours_left is not None and hours_left < self.alert_hours:
+            kind, message = "expiring", f"Zepto session expires in ~{hours_left:.0f}h - log in again to avoid the OTP path"
+        else:
+            self.state["last_alert"] = None
+            self._save_state()
+            return
+
+        last_at = self.state.get("last_alert_at") or 0
+        if self.state.get("last_alert") == kind and time.time() - last_at < ALERT_REPEAT_SECONDS:
+            return
+        self.state.update({"last_alert": kind, "last_alert_at": time.time()})
+        self._save_state()
+        print(f"🚨 {message}")
+        if self.webhook_url:
+            try:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    await client.post(self.webhook_url, json={"event": f"zepto_session_{kind}", "message": message,
+                                                              **self.status()})
+            except Exception as e:
+                print(f"⚠️ Session alert webhook failed: {e}")
+
+    # --------------------------------------------------------------- schedule
+
+    def start(self, playwright_provider=None) -> None:
+        """Start the background refresh loop (no-op if disabled or already running)."""
+        if not self.interval_minutes or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run_forever(playwright_provider))
+
+    async def _run_forever(self, playwright_provider) -> None:
+        interval = self.interval_minutes * 60
+        # First run as soon as the last refresh is older than the interval
+        since_last = time.time() - (self.state.get("last_refresh") or 0)
+        await asyncio.sleep(max(5.0, interval - since_last))
+        while True:
+            try:
+                await self.refresh(playwright_provider() if playwright_provider else None)
+            except Exception as e:
+                print(f"⚠️ Session keep-alive error: {e}")
+            await asyncio.sleep(interval)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# ============================================================================
+# PARKING IDLE SESSIONS
+# ============================================================================
+
+def get_park_idle_seconds() -> float:
+    """ZEPTO_PARK_IDLE_SECONDS: park after this long waiting on a human (0 = never, the default)."""
+    return max(0.0, env_float("ZEPTO_PARK_IDLE_SECONDS", 0.0))
+
+
+class SessionParker:
+    """
+    Frees the browser while an order waits on a human.
+
+    arm() starts an idle timer; when it fires, the page URL and the
+    context's storage state are snapshotted and the browser is closed.
+    revive() launches a new one through the BrowserLauncher, restores the
+    storage state and reopens the URL.
+
+    In-page JavaScript state does not survive parking. Callers must be able
+    to rebuild whatever form the human is answering (see submit_login in
+    the MCP server), so pages that can't be rebuilt (e.g. a bank's payment
+    OTP page) must never be parked.
+    """
+
+    def __init__(self, launcher: BrowserLauncher, idle_seconds: float = None):
+        self.launcher = launcher
+        self.idle_seconds = get_park_idle_seconds() if idle_seconds is None else idle_seconds
+        self.parked = None
+        self.events: list[dict] = []
+        self._timer = None
+        self._parking = False
+
+    def arm(self, park_callback) -> None:
+        """Call park_callback() (an async function) once the idle threshold passes, unless disarmed first."""
+        self.disarm()
+        if self.idle_seconds:
+            self._timer = asyncio.create_task(self._fire_after_idle(park_callback))
+
+    async def _fire_after_idle(self, park_callback) -> None:
+        await asyncio.sleep(self.idle_seconds)
+        self._parking = True
+        try:
+            await park_callback()
+        except Exception as e:
+            print(f"⚠️ Parking failed: {e}")
+        finally:
+            self._parking = False
+
+    def disarm(self) -> None:
+        """Cancel a pending idle timer (a park already under way is left to finish)."""
+        if self._timer and not self._timer.done() and not self._parking:
+            self._timer.cancel()
+        self._timer = None
+
+    async def settle(self) -> None:
+        """Disarm, first waiting for a park that is already under way so the caller sees a consistent state."""
+        timer = self._timer
+        if timer and not timer.done() and self._parking:
+            await asyncio.shield(timer)
+        self.disarm()
+
+    async def park(self, handle: dict, **extra) -> dict:
+        """Snapshot URL + storage state of handle, close its browser and remember the snapshot."""
+        rss_mb = handle_rss_mb(handle)
+        self.parked = {
+            "url": handle["page"].url,
+            "storage_state": await handle["context"].storage_state(),
+            "engine": handle.get("engine"),
+            "parked_at": time.time(),
+            "rss_mb": rss_mb,
+            **extra,
+        }
+        try:
+            await asyncio.wait_for(handle["browser"].close(), timeout=10)
+        except Exception:
+            pass
+        print(f"🅿️ Parked idle browser ({rss_mb} MB freed) at {self.parked['url']}")
+        return self.parked
+
+    async def revive(self, playwright, headless: bool = False, mode: str = None) -> dict:
+        """Relaunch the parked session and reopen its page. Returns a launcher handle."""
+        snapshot, self.parked = self.parked, None
+        start = time.perf_counter()
+        handle = await self.launcher.launch(playwright, headless=headless, mode=mode)
+        if not handle["persistent"]:
+            await apply_storage_state(handle["context"], snapshot["storage_state"])
+        await handle["page"].goto(snapshot["url"], wait_until="domcontentloaded")
+        elapsed = time.perf_counter() - start
+        self.events.append({"parked_s": round(time.time() - snapshot["parked_at"], 1),
+                            "rss_mb": snapshot["rss_mb"], "revive_s": round(elapsed, 2)})
+        del self.events[:-20]
+        print(f"🚗 Revived parked session in {elapsed:.1f}s")
+        return handle
+
+    def discard(self) -> None:
+        """Forget the parked session (order cancelled)."""
+        self.disarm()
+        self.parked = None
+
+    def describe(self) -> str:
+        if not self.parked:
+            return ""
+        idle = time.time() - self.parked["parked_at"]
+        return f"browser parked {idle:.0f}s ago to free memory - it reopens when the OTP arrives"
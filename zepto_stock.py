@@ -0,0 +1,428 @@
+"""
+Keeps the stock table warm for the products people actually order.
+
+An order that finds out only on the product page that something is out of
+stock has already paid for a browser launch, a login check and a page load.
+The StockRefresher periodically re-checks the hottest products (the ones
+ordered most, recent orders weighing more) for the delivery address they are
+usually ordered to, so orders can consult the stock table (see
+zepto_catalog/stock.py) before a browser is involved:
+
+    refresher = StockRefresher(launcher, get_context=..., is_busy=...)
+    refresher.note_order(urls, "Hsr Home")   # order history, drives the hot list
+    refresher.revalidate(pvids)             # stale entries: refresh soon
+    refresher.start()                        # background loop
+    await refresher.refresh()                # one pass now
+
+Each pass only checks products whose entry is no longer fresh, at most
+ZEPTO_STOCK_REFRESH_CONCURRENCY at a time and no faster than one page every
+ZEPTO_STOCK_REFRESH_SPACING_SECONDS. The first product of a pass is loaded
+in a side tab (images, media and fonts skipped) and also fetched over HTTP
+with the context's cookies (see zepto_probe.py); when the two agree, the
+rest of the pass reads the page HTML only, and any product the HTTP probe
+can't read falls back to a tab.
+Like the SessionKeeper it borrows an open context or parks a headless
+persistent context on the profile, never while an order runs, and stops
+mid-pass as soon as one starts.
+
+Stock is per dark store, and the page header decides which one: a pass
+records what it sees for the address the saved session currently delivers
+to. It never switches addresses, since that would change the user's session.
+
+Configuration (environment variables):
+- ZEPTO_STOCK_REFRESH_MINUTES: interval between passes (default 60, 0 disables)
+- ZEPTO_STOCK_REFRESH_ITEMS: how many hot products to keep checked (default 30)
+- ZEPTO_STOCK_REFRESH_CONCURRENCY: product pages loaded at once (default 2)
+- ZEPTO_STOCK_REFRESH_SPACING_SECONDS: minimum gap between page loads (default 2)
+- ZEPTO_STOCK_PROBE: "http" (default) or "browser" to always render the page
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+
+from playwright.async_api import async_playwright
+
+from zepto_browser import BrowserLauncher, context_options, get_device_mode, read_product_page, sel
+from zepto_catalog import StockCache, product_key, product_store, stock_cache
+from zepto_probe import ProductProbe
+from zepto_profile import ProfileBusyError, ProfileLease
+from zepto_util import env_float, print
+
+
+DEFAULT_REFRESH_MINUTES = 60.0
+DEFAULT_HOT_ITEMS = 30
+DEFAULT_CONCURRENCY = 2
+DEFAULT_SPACING_SECONDS = 2.0
+ORDER_HISTORY_FILE = ".zepto_orders.json"
+PROBE_PAGE_TIMEOUT_MS = 15000
+
+# An order counts half as much for the hot list after this many days
+POPULARITY_HALF_LIFE_DAYS = 30.0
+# How soon a revalidate() request runs a pass when nothing else is going on
+REVALIDATE_DELAY_SECONDS = 10.0
+# Resource types a stock probe doesn't need
+SKIPPED_RESOURCES = ("image", "media", "font")
+
+
+class OrderHistory:
+    """
+    How often, how recently and to which addresses each product was ordered,
+    saved to .zepto_orders.json. Both servers record into the same file, so
+    every record re-reads it first.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.products: dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                products = json.load(f).get("products", {})
+            if isinstance(products, dict):
+                self.products = products
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"products": self.products}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save order history: {e}")
+
+    def record(self, urls: list[str], address: str) -> None:
+        """Count one order of each product in urls, delivered to address."""
+        self._load()
+        now = time.time()
+        for url in urls:
+            pvid = product_key(url)
+            entry = self.products.setdefault(pvid, {"url": url, "orders": 0, "score": 0.0, "last": now,
+                                                    "addresses": {}})
+            entry["score"] = self._decayed(entry, now) + 1.0
+            entry.update({"url": url, "orders": entry["orders"] + 1, "last": now})
+            if address:
+                entry["addresses"][address] = entry["addresses"].get(address, 0) + 1
+        self._save()
+
+    @staticmethod
+    def _decayed(entry: dict, now: float) -> float:
+        age_days = max(0.0, now - entry["last"]) / 86400
+        return entry["score"] * math.pow(0.5, age_days / POPULARITY_HALF_LIFE_DAYS)
+
+    def hot(self, limit: int) -> list[dict]:
+        """The limit most popular products: [{"pvid", "url", "address", "orders", "score"}], hottest first."""
+        now = time.time()
+        ranked = sorted(self.products.items(), key=lambda pair: -self._decayed(pair[1], now))
+        return [{"pvid": pvid, "url": entry["url"], "orders": entry["orders"],
+                 "score": round(self._decayed(entry, now), 2),
+                 "address": max(entry["addresses"], key=entry["addresses"].get) if entry["addresses"] else None}
+                for pvid, entry in ranked[:limit]]
+
+
+class RateLimiter:
+    """Spaces calls at least spacing seconds apart, across every concurrent caller."""
+
+    def __init__(self, spacing: float):
+        self.spacing = spacing
+        self.next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_at = time.monotonic() + self.spacing
+
+
+async def _skip_heavy_resources(route) -> None:
+    if route.request.resource_type in SKIPPED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def probe_product_page(context, url: str) -> dict:
+    """
+    Load url in a lightweight side tab and read its stock state, name,
+    price and header address: {"in_stock", "name", "price", "address",
+    "user_agent", "via"}.
+    """
+    page = await context.new_page()
+    try:
+        await page.route("**/*", _skip_heavy_resources)
+        await page.goto(url, wait_until="domcontentloaded", timeout=PROBE_PAGE_TIMEOUT_MS)
+        try:
+            await page.wait_for_selector(sel("add_or_notify"), timeout=5000)
+        except Exception:
+            pass
+        if await page.query_selector(sel("add_or_notify")) is None:
+            raise RuntimeError("no Add To Cart or Notify Me button on the page")
+        in_stock = await page.query_selector(sel("notify_me")) is None
+        name = None
+        title = await page.query_selector("h1")
+        if title:
+            name = ((await title.text_content()) or "").strip() or None
+        info = await read_product_page(page)
+        try:
+            user_agent = await page.evaluate("navigator.userAgent")
+        except Exception:
+            user_agent = None
+        return {"in_stock": in_stock, "name": name, "price": info["price"], "address": info["address"],
+                "user_agent": user_agent, "via": "browser"}
+    finally:
+        await page.close()
+
+
+class StockRefresher:
+    """
+    Re-checks the stock of the most ordered products in the background.
+
+    is_busy and get_context work as for the SessionKeeper: no pass while an
+    order runs, and an open context is borrowed when there is one.
+    """
+
+    def __init__(self, launcher: BrowserLauncher, get_context=None, is_busy=None, cache: StockCache = None,
+                 interval_minutes: float = None, hot_items: int = None, concurrency: int = None,
+                 spacing_seconds: float = None, history_path: str = None):
+        self.launcher = launcher
+        self.get_context = get_context
+        self.is_busy = is_busy
+        self.cache = cache or stock_cache()
+        self.interval_minutes = (interval_minutes if interval_minutes is not None
+                                 else env_float("ZEPTO_STOCK_REFRESH_MINUTES", DEFAULT_REFRESH_MINUTES))
+        self.hot_items = int(hot_items if hot_items is not None
+                             else env_float("ZEPTO_STOCK_REFRESH_ITEMS", DEFAULT_HOT_ITEMS))
+        self.concurrency = max(1, int(concurrency if concurrency is not None
+                                      else env_float("ZEPTO_STOCK_REFRESH_CONCURRENCY", DEFAULT_CONCURRENCY)))
+        self.spacing = (spacing_seconds if spacing_seconds is not None
+                        else env_float("ZEPTO_STOCK_REFRESH_SPACING_SECONDS", DEFAULT_SPACING_SECONDS))
+        self.history = OrderHistory(history_path or os.path.join(launcher.base_dir, ORDER_HISTORY_FILE))
+        self.use_http = os.getenv("ZEPTO_STOCK_PROBE", "http").strip().lower() != "browser"
+        self.probe = ProductProbe()
+        self.pending: set[str] = set()
+        self.last_pass = {"at": None, "checked": 0, "in_stock": 0, "out_of_stock": 0, "failed": 0, "address": None,
+                          "via_http": 0}
+        self._task = None
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    # ---------------------------------------------------------------- history
+
+    def note_order(self, urls: list[str], address: str) -> None:
+        """Record an order's products; they join the hot list."""
+        try:
+            self.history.record(urls, address)
+        except Exception as e:
+            print(f"⚠️ Could not record order history: {e}")
+
+    def revalidate(self, pvids: list[str]) -> None:
+        """
+        Ask for these products (stale or unknown entries) to be checked on the
+        next pass, which comes soon. A product that was never ordered is
+        found by its catalog URL; one in neither is skipped.
+        """
+        self.pending.update(pvids)
+        self._wake.set()
+
+    def due(self) -> list[dict]:
+        """Products to check this pass: pending ones first, then the hot list, skipping fresh entries."""
+        hot = self.history.hot(self.hot_items) if self.hot_items > 0 else []
+        by_pvid = {item["pvid"]: item for item in hot}
+        known = self.history.products
+        urls = {pvid: known[pvid]["url"] if pvid in known else product_store().url(pvid) for pvid in self.pending}
+        ordered = [pvid for pvid in self.pending if urls[pvid]] + [item["pvid"] for item in hot]
+        due, seen = [], set()
+        for pvid in ordered:
+            if pvid in seen:
+                continue
+            seen.add(pvid)
+            item = by_pvid.get(pvid) or {"pvid": pvid, "url": urls[pvid], "address": None}
+            if self.cache.needs_refresh(pvid, item["address"]):
+                due.append(item)
+        return due
+
+    # ---------------------------------------------------------------- refresh
+
+    async def refresh(self, playwright=None) -> dict:
+        """One pass over the due products; returns status()."""
+        async with self._lock:
+            if self.is_busy and self.is_busy():
+                print("ℹ️ Stock refresh skipped (browser busy with an order)")
+                return self.status()
+            requested = set(self.pending)
+            items = self.due()
+            # Requests that are fresh by now (or have no URL) are done; the rest wait until checked
+            self.pending -= requested - {item["pvid"] for item in items}
+            if not items:
+                return self.status()
+            context = self.get_context() if self.get_context else None
+            if context is not None:
+                results = await self._check_all(context, items)
+            else:
+                results = await self._check_parked(playwright, items)
+            if results is None:
+                return self.status()  # No browser this time: the requests stay queued for the next pass
+
+            self.pending -= {item["pvid"] for item, r in zip(items, results) if r}
+            checked = [r for r in results if r]
+            self.last_pass = {
+                "at": time.time(),
+                "checked": len(checked),
+                "in_stock": sum(1 for r in checked if r["in_stock"] is True),
+                "out_of_stock": sum(1 for r in checked if r["in_stock"] is False),
+                "failed": sum(1 for r in results if r is False),
+                "address": next((r["address"] for r in checked if r["address"]), None),
+                "via_http": sum(1 for r in checked if r["via"] != "browser"),
+            }
+            print(f"🔄 Stock refresh: {self.describe()}")
+            return self.status()
+
+    async def _check_all(self, context, items: list[dict]) -> list:
+        limit = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.spacing)
+        first = await self._check(context, items[0], limit, limiter)
+        http_address = await self._verify_http(context, items[0], first) if self.use_http and first else None
+        rest = await asyncio.gather(*(self._check(context, item, limit, limiter, http_address)
+                                      for item in items[1:]))
+        return [first, *rest]
+
+    async def _verify_http(self, context, item: dict, page_result: dict) -> str:
+        """
+        Fetch the product just checked in a tab over HTTP, with this context's
+        session. Returns the delivery address to record HTTP results under if
+        the two agree, else None (the pass stays on the browser).
+        """
+        if not page_result["address"]:
+            return None
+        try:
+            self.probe.use_browser(await context.cookies(), page_result.get("user_agent"))
+            http_result = await self.probe.fetch(item["url"])
+        except Exception as e:
+            print(f"⚠️ HTTP stock probe unavailable: {e}")
+            return None
+        if not self.probe.verify(page_result, http_result):
+            seen = f"{http_result['via']} said in_stock={http_result['in_stock']}" if http_result else "unreadable"
+            print(f"ℹ️ HTTP stock probe not verified ({seen}, page said in_stock={page_result['in_stock']}) "
+                  f"- checking this pass in the browser")
+            return None
+        return page_result["address"]
+
+    async def _check(self, context, item: dict, limit: asyncio.Semaphore, limiter: RateLimiter,
+                     http_address: str = None):
+        """
+        Check one product and record it; None if skipped, False if it failed.
+        With http_address (a verified HTTP probe) the page HTML is fetched
+        instead of rendered, falling back to a tab if it can't be read.
+        """
+        async with limit:
+            if self.is_busy and self.is_busy():
+                return None  # An order started: leave the browser to it
+            await limiter.wait()
+            result = await self.probe.fetch(item["url"]) if http_address else None
+            if result:
+                result["address"] = http_address
+            else:
+                try:
+                    result = await probe_product_page(context, item["url"])
+                except Exception as e:
+                    print(f"⚠️ Stock refresh of {item['url']} failed: {e}")
+                    return False
+            self.cache.record(item["pvid"], result["address"], in_stock=result["in_stock"], name=result["name"],
+                              price=result["price"], source="refresh" if result["via"] == "browser" else "http")
+            return result
+
+    async def _check_parked(self, playwright, items: list[dict]) -> list:
+        engine = self.launcher.engine or "firefox"
+        profile_dir = self.launcher.profile_dir(engine)
+        if not os.path.isdir(profile_dir):
+            return None
+        lease = ProfileLease(profile_dir, wait_seconds=0)
+        try:
+            lease.acquire()
+        except ProfileBusyError:
+            print("ℹ️ Stock refresh skipped (profile in use by an order)")
+            return None
+
+        own_playwright = playwright is None
+        try:
+            if own_playwright:
+                playwright = await async_playwright().start()
+            context = await getattr(playwright, engine).launch_persistent_context(
+                user_data_dir=profile_dir, headless=True, **context_options(get_device_mode(), engine),
+            )
+            try:
+                return await self._check_all(context, items)
+            finally:
+                await context.close()
+        except Exception as e:
+            print(f"⚠️ Stock refresh failed: {e}")
+            return None
+        finally:
+            if own_playwright and playwright:
+                await playwright.stop()
+            lease.release()
+
+    # ----------------------------------------------------------------- status
+
+    def status(self) -> dict:
+        return {
+            "enabled": bool(self.interval_minutes),
+            "interval_minutes": self.interval_minutes,
+            "hot_items": self.history.hot(self.hot_items) if self.hot_items > 0 else [],
+            "last_pass": self.last_pass,
+            "probe": "http" if self.use_http else "browser",
+            "http_verified": self.probe.verified,
+        }
+
+    def describe(self) -> str:
+        """One-line summary of the last pass."""
+        last = self.last_pass
+        if not last["at"]:
+            return "no stock refresh yet"
+        where = f" at {last['address']}" if last["address"] else ""
+        failed = f", {last['failed']} failed" if last["failed"] else ""
+        via = f" ({last['via_http']} over HTTP)" if last.get("via_http") else ""
+        return f"{last['checked']} product(s) checked{where}{via}: {last['out_of_stock']} out of stock{failed}"
+
+    # --------------------------------------------------------------- schedule
+
+    def start(self, playwright_provider=None) -> None:
+        """Start the background refresh loop (no-op if disabled or already running)."""
+        if not self.interval_minutes or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run_forever(playwright_provider))
+
+    async def _run_forever(self, playwright_provider) -> None:
+        interval = self.interval_minutes * 60
+        # First pass as soon as the last one (by either server) is older than the interval
+        last = max((e["checked_at"] for e in self.cache.entries.values() if e.get("source") in ("refresh", "http")),
+                   default=0)
+        timeout = max(REVALIDATE_DELAY_SECONDS, interval - (time.time() - last))
+        while True:
+            # Sleep until the interval passes or revalidate() asks for a pass
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+                await asyncio.sleep(REVALIDATE_DELAY_SECONDS)  # Let a starting order take the browser first
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.refresh(playwright_provider() if playwright_provider else None)
+            except Exception as e:
+                print(f"⚠️ Stock refresh error: {e}")
+            timeout = interval
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.probe.close()
+        self.cache.flush()  # Records from the last second or two
@@ -0,0 +1,32 @@
+"""
+Helpers shared by the modules the servers import.
+
+Everything those modules do may run inside the MCP stdio server, where
+stdout carries JSON-RPC, so they import this print (the builtin, but
+writing to stderr by default) instead of redefining it each time:
+
+    from zepto_util import env_float, print
+"""
+
+import builtins
+import os
+import sys
+
+_original_print = builtins.print
+
+
+def print(*args, **kwargs):
+    kwargs.setdefault('file', sys.stderr)
+    _original_print(*args, **kwargs)
+
+
+def env_float(name: str, default: float) -> float:
+    """Float value of environment variable name, or default if it is unset or invalid (with a warning)."""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ Invalid {name} '{value}', using {default}")
+        return default